@@ -7,17 +7,18 @@
 import os
 import sys
 import json
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, Dict
 from urllib.parse import urlparse
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel, ConfigDict, ValidationError
 from dotenv import load_dotenv
-import requests
 
 BASE_DIR = Path(__file__).resolve().parent
 SRC_DIR = BASE_DIR / "src"
@@ -25,64 +26,125 @@ if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 from novel_analyzer.config_loader import load_llm_config
-from novel_analyzer.content_processor import prepare_content
-from novel_analyzer.llm_client import LLMClient, LLMRuntime, LLMClientError
-from novel_analyzer.prompts import render
-from novel_analyzer import llm_dumps
-from novel_analyzer.schemas import (
-    MetaOutput,
-    CoreOutput,
-    ScenesOutput,
-    ThunderOutput,
-    LewdElementsOutput,
-    Character,
-    Relationship,
-)
-from novel_analyzer.validators import (
-    validate_core_consistency,
-    validate_scenes_consistency,
-    validate_thunder_consistency,
-    validate_lewd_elements_consistency,
+from novel_analyzer.llm_client import CircuitOpenError, LLMClient, LLMRuntime, LLMClientError
+from novel_analyzer import (
+    capabilities,
+    circuit_breaker,
+    cleanup,
+    hedging,
+    http_pool,
+    incremental,
+    jobs,
+    llm_cache,
+    llm_dumps,
+    pipeline,
+    providers,
+    rate_limiter,
+    single_flight,
 )
+from novel_analyzer.mapped_text import NovelText
+from novel_analyzer.novel_store import NovelSession, NovelStore, content_id
+from novel_analyzer.upload import UploadTooLargeError, spool_upload
+from novel_analyzer.pipeline import ConsistencyError
+from novel_analyzer.schemas import CoreOutput, Character, Relationship
 
 load_dotenv()
 
+LLM_CFG = load_llm_config(BASE_DIR)
+http_pool.configure(LLM_CFG.defaults.http)
+NOVEL_STORE = NovelStore(LLM_CFG.novel_store)
+JOB_RUNNER: jobs.JobRunner | None = None
+
+
+async def _warm_llm_connection() -> None:
+    api_url = os.getenv("API_BASE_URL", "").strip()
+    api_key = os.getenv("API_KEY", "").strip()
+    if not api_url or not api_key:
+        return
+    try:
+        url = _validate_api_url(api_url)
+    except HTTPException:
+        return
+    await http_pool.warm(url, headers={"Authorization": f"Bearer {api_key}"})
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global JOB_RUNNER
+    warmup = None
+    if LLM_CFG.defaults.http.warm_on_startup:
+        warmup = asyncio.create_task(_warm_llm_connection())
+    job_store = jobs.get_store(LLM_CFG.jobs)
+    if job_store is not None:
+        # 客户端在任务开始时才创建：.env 未配置时任务记为失败，而不是阻止服务启动
+        JOB_RUNNER = jobs.JobRunner(job_store, LLM_CFG, lambda: _llm_client())
+        JOB_RUNNER.start()
+    yield
+    if JOB_RUNNER is not None:
+        await JOB_RUNNER.stop()
+        JOB_RUNNER = None
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await http_pool.aclose_all()
+    http_pool.close_all()
+
+
 app = FastAPI(
     title="小说分析器",
     description="基于LLM的小说分析工具 - 多角色、多关系、性癖分析",
     version="4.0.0",
+    lifespan=lifespan,
 )
 
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-LLM_CFG = load_llm_config(BASE_DIR)
+
+class NovelUploadRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    content: str
 
 
 class AnalyzeContentRequest(BaseModel):
     model_config = ConfigDict(extra="forbid")
-    content: str
+    content: str | None = None
+    novel_id: str | None = None
+    bypass_cache: bool = False
 
 
 class AnalyzeScenesRequest(BaseModel):
     model_config = ConfigDict(extra="forbid")
-    content: str
-    characters: list[Dict[str, Any]]
-    relationships: list[Dict[str, Any]]
+    content: str | None = None
+    novel_id: str | None = None
+    bypass_cache: bool = False
+    characters: list[Dict[str, Any]] | None = None
+    relationships: list[Dict[str, Any]] | None = None
+
+
+class JobSubmitRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    content: str | None = None
+    novel_id: str | None = None
+    sections: list[str] | None = None
+    bypass_cache: bool = False
 
 
 class AnalyzeThunderzonesRequest(BaseModel):
     model_config = ConfigDict(extra="forbid")
-    content: str
-    characters: list[Dict[str, Any]]
-    relationships: list[Dict[str, Any]]
+    content: str | None = None
+    novel_id: str | None = None
+    bypass_cache: bool = False
+    characters: list[Dict[str, Any]] | None = None
+    relationships: list[Dict[str, Any]] | None = None
 
 
 class AnalyzeLewdElementsRequest(BaseModel):
     model_config = ConfigDict(extra="forbid")
-    content: str
-    characters: list[Dict[str, Any]]
-    relationships: list[Dict[str, Any]]
+    content: str | None = None
+    novel_id: str | None = None
+    bypass_cache: bool = False
+    characters: list[Dict[str, Any]] | None = None
+    relationships: list[Dict[str, Any]] | None = None
 
 
 def _validate_api_url(api_url: str) -> str:
@@ -104,14 +166,31 @@ def _get_llm_runtime() -> LLMRuntime:
 
 
 def _llm_client() -> LLMClient:
-    return LLMClient(_get_llm_runtime(), LLM_CFG)
+    # 进程内共享的 provider 池：在途请求数与健康状态跨请求累计
+    try:
+        pool = providers.get_pool(LLM_CFG)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return LLMClient(pool, LLM_CFG)
+
+
+SECTION_LABELS = {
+    "meta": "Meta",
+    "core": "Core",
+    "scenes": "Scenes",
+    "thunder": "Thunder",
+    "lewd_elements": "LewdElements",
+}
+
+
+def _errors_detail(section: str, errors: list[str]) -> str:
+    return f"{section} 校验失败:\n" + "\n".join(f"- {e}" for e in errors)
 
 
 def _raise_errors(section: str, errors: list[str]) -> None:
     if not errors:
         return
-    detail = f"{section} 校验失败:\n" + "\n".join(f"- {e}" for e in errors)
-    raise HTTPException(status_code=422, detail=detail)
+    raise HTTPException(status_code=422, detail=_errors_detail(section, errors))
 
 
 def _raise_pydantic_error(section: str, e: ValidationError) -> None:
@@ -128,11 +207,101 @@ def _raise_pydantic_error(section: str, e: ValidationError) -> None:
     raise HTTPException(status_code=422, detail=f"{section} 输入校验失败:\n" + "\n".join(lines))
 
 
-def _raise_llm_error(section: str, e: LLMClientError) -> None:
+def _llm_error_detail(section: str, e: LLMClientError) -> str:
     detail = f"{section} 调用失败: {e}"
     if llm_dumps.enabled() and e.raw_response:
         detail += f"\n\n原始响应(截断):\n{e.raw_response[:2000]}"
-    raise HTTPException(status_code=422, detail=detail)
+    return detail
+
+
+def _raise_llm_error(section: str, e: LLMClientError) -> None:
+    if isinstance(e, CircuitOpenError):
+        raise HTTPException(
+            status_code=503,
+            detail=_llm_error_detail(section, e),
+            headers={"Retry-After": str(int(e.retry_after) + 1)},
+        )
+    raise HTTPException(status_code=422, detail=_llm_error_detail(section, e))
+
+
+def _parse_core_context(
+    label: str,
+    raw_characters: list[Dict[str, Any]],
+    raw_relationships: list[Dict[str, Any]],
+) -> tuple[list[Character], list[Relationship]]:
+    try:
+        characters = [Character.model_validate(c) for c in raw_characters]
+        relationships = [Relationship.model_validate(r) for r in raw_relationships]
+    except ValidationError as e:
+        _raise_pydantic_error(f"{label} 输入", e)
+
+    names = {c.name for c in characters}
+    rel_errors: list[str] = []
+    for idx, r in enumerate(relationships):
+        if r.from_ not in names:
+            rel_errors.append(f"relationships[{idx}].from 不在角色表: {r.from_}")
+        if r.to not in names:
+            rel_errors.append(f"relationships[{idx}].to 不在角色表: {r.to}")
+    _raise_errors(f"{label} 输入关系", rel_errors)
+    return characters, relationships
+
+
+def _resolve_novel(content: str | None, novel_id: str | None) -> tuple[NovelText, NovelSession | None]:
+    if content is not None and novel_id:
+        raise HTTPException(status_code=422, detail="content 与 novel_id 只能二选一")
+    if novel_id:
+        session = NOVEL_STORE.get(novel_id.strip())
+        if session is None:
+            raise HTTPException(status_code=404, detail="novel 不存在或已过期，请重新上传（POST /api/novels）")
+        return session.content, session
+    if content is None:
+        raise HTTPException(status_code=422, detail="缺少 content 或 novel_id")
+    return content, None
+
+
+def _dependent_context(
+    label: str,
+    raw_characters: list[Dict[str, Any]] | None,
+    raw_relationships: list[Dict[str, Any]] | None,
+    session: NovelSession | None,
+) -> tuple[list[Character], list[Relationship]]:
+    if raw_characters is not None or raw_relationships is not None:
+        return _parse_core_context(label, raw_characters or [], raw_relationships or [])
+    if session is not None and session.core is not None:
+        # 会话中的 core 结果已通过 schema + 一致性校验，无需重复校验
+        return session.core.characters, session.core.relationships
+    raise HTTPException(status_code=422, detail=f"{label} 缺少 characters/relationships（或先对该 novel_id 运行 core）")
+
+
+async def _run_section(
+    section: str,
+    content: NovelText,
+    *,
+    session: NovelSession | None = None,
+    characters: list[Character] | None = None,
+    relationships: list[Relationship] | None = None,
+    bypass_cache: bool = False,
+) -> dict[str, Any]:
+    client = _llm_client()
+    label = SECTION_LABELS[section]
+    try:
+        out = await incremental.run_section(
+            client,
+            LLM_CFG,
+            section,
+            content,
+            novel_id=session.novel_id if session is not None else None,
+            characters=characters,
+            relationships=relationships,
+            bypass_cache=bypass_cache,
+        )
+    except LLMClientError as e:
+        _raise_llm_error(label, e)
+    except ConsistencyError as e:
+        _raise_errors(label, e.errors)
+    if session is not None and isinstance(out, CoreOutput):
+        NOVEL_STORE.set_core(session.novel_id, out)
+    return {"analysis": pipeline.dump_output(section, out)}
 
 
 @app.middleware("http")
@@ -156,6 +325,7 @@ def get_server_config():
         "model": os.getenv("MODEL_NAME", ""),
         "repair_enabled": bool(getattr(LLM_CFG.repair, "enabled", False)),
         "repair_max_attempts": int(getattr(LLM_CFG.repair, "max_attempts", 0)),
+        "llm_cache_enabled": bool(LLM_CFG.cache.enabled),
         "llm_dump_enabled": bool(llm_dumps.enabled()),
         "llm_dump_dir": str(llm_dumps.dump_dir()),
     }
@@ -192,8 +362,25 @@ def clear_llm_dumps():
     return {"deleted": deleted}
 
 
+@app.get("/api/debug/stats")
+def debug_stats():
+    return {
+        "http_pool": http_pool.stats(),
+        "novel_store": NOVEL_STORE.stats(),
+        "llm_cache": llm_cache.stats(),
+        "capabilities": capabilities.get_registry(LLM_CFG.capabilities).snapshot(),
+        "rate_limiter": rate_limiter.stats(),
+        "circuit_breaker": circuit_breaker.stats(),
+        "hedging": hedging.stats(),
+        "incremental": incremental.stats(),
+        "jobs": jobs.stats(),
+        "providers": providers.stats(),
+        "single_flight": single_flight.stats(),
+    }
+
+
 @app.get("/api/test-connection")
-def test_connection():
+async def test_connection():
     """测试 API 连接 + Function Calling 支持"""
     runtime = _get_llm_runtime()
 
@@ -223,19 +410,32 @@ def test_connection():
         "tools": [tool],
         "tool_choice": {"type": "function", "function": {"name": tool_name}},
     }
+    legacy_payload = {
+        "model": runtime.model,
+        "messages": [{"role": "user", "content": "Call the function ping."}],
+        "temperature": 0,
+        "stream": False,
+        "functions": [tool["function"]],
+        "function_call": {"name": tool_name},
+    }
+
+    registry = capabilities.get_registry(LLM_CFG.capabilities)
+    protocol = registry.get(runtime.api_url, runtime.model, capabilities.PROTOCOL) or "tools"
 
     try:
-        res = requests.post(url, headers=headers, json=payload, timeout=30)
-        if res.status_code == 400 and ("tools" in (res.text or "") or "tool_choice" in (res.text or "")):
-            legacy_payload = {
-                "model": runtime.model,
-                "messages": [{"role": "user", "content": "Call the function ping."}],
-                "temperature": 0,
-                "stream": False,
-                "functions": [tool["function"]],
-                "function_call": {"name": tool_name},
-            }
-            res = requests.post(url, headers=headers, json=legacy_payload, timeout=30)
+        if protocol == "legacy":
+            res = await http_pool.apost(url, headers=headers, json=legacy_payload, timeout=30)
+            if res.status_code == 400:
+                registry.forget(runtime.api_url, runtime.model, capabilities.PROTOCOL)
+                protocol = "tools"
+                res = await http_pool.apost(url, headers=headers, json=payload, timeout=30)
+        else:
+            res = await http_pool.apost(url, headers=headers, json=payload, timeout=30)
+        if protocol == "tools" and res.status_code == 400 and (
+            "tools" in (res.text or "") or "tool_choice" in (res.text or "")
+        ):
+            protocol = "legacy"
+            res = await http_pool.apost(url, headers=headers, json=legacy_payload, timeout=30)
 
         if res.status_code != 200:
             raise HTTPException(status_code=res.status_code, detail=f"API错误: {res.text}")
@@ -258,179 +458,263 @@ def test_connection():
         if not isinstance(args, dict) or args.get("ok") is not True:
             raise HTTPException(status_code=400, detail="服务端/模型未按 function calling 返回 tool arguments")
 
-        return {"status": "success", "message": "连接成功（Function Calling 正常）"}
+        registry.set(runtime.api_url, runtime.model, capabilities.PROTOCOL, protocol)
+        return {"status": "success", "message": "连接成功（Function Calling 正常）", "protocol": protocol}
 
-    except requests.exceptions.Timeout:
+    except http_pool.Timeout:
         raise HTTPException(status_code=408, detail="请求超时")
-    except requests.exceptions.RequestException as e:
+    except http_pool.RequestError as e:
         raise HTTPException(status_code=500, detail=f"连接失败: {str(e)}")
 
 
-@app.post("/api/analyze/meta")
-def analyze_meta(req: AnalyzeContentRequest):
-    """分析小说基础信息 + 剧情总结"""
-    client = _llm_client()
+@app.post("/api/novels")
+def upload_novel(req: NovelUploadRequest):
+    """上传小说文本一次（按 SHA-256 去重），后续分析以 novel_id 引用"""
+    session = NOVEL_STORE.put(req.content)
+    return {"novel_id": session.novel_id, "chars": session.chars, **_cleanup_report(session)}
 
-    sec = LLM_CFG.sections["meta"]
-    content = prepare_content(req.content, LLM_CFG, section="meta")
-    prompt = render(sec.prompt_template, tool_name=sec.tool_name, content=content)
 
-    try:
-        out = client.call_section(section="meta", prompt=prompt, output_model=MetaOutput)
-    except LLMClientError as e:
-        _raise_llm_error("Meta", e)
+def _cleanup_report(session: NovelSession) -> dict[str, Any]:
+    """预清洗节省的字数/token（结果按内容哈希缓存，分析时直接复用）"""
+    cp = LLM_CFG.content_processing
+    _, report = cleanup.clean_content(session.content, cp.cleanup, cp.token_budget)
+    return {"cleanup": report.as_dict()} if report is not None else {}
 
-    return {"analysis": out.model_dump()}
 
+@app.post("/api/novels/upload")
+async def upload_novel_file(file: UploadFile = File(...), encoding: str = Form("auto")):
+    """multipart 上传原始 .txt：服务端按块识别编码（BOM/UTF-8/GB18030/UTF-16）并转成 UTF-8，返回 novel_id 与大小"""
+    store_cfg = LLM_CFG.novel_store
+    try:
+        spooled = await spool_upload(
+            file.read,
+            mode=encoding,
+            spool_max_bytes=max(0, store_cfg.upload_spool_mb) * 1024 * 1024,
+            max_bytes=max(0, store_cfg.max_upload_mb) * 1024 * 1024,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        await file.close()
 
-@app.post("/api/analyze/core")
-def analyze_core(req: AnalyzeContentRequest):
-    """分析角色 + 关系 + 淫荡指数"""
-    client = _llm_client()
+    try:
+        session = await asyncio.to_thread(NOVEL_STORE.put_file, spooled.file, novel_id=spooled.sha256)
+    finally:
+        spooled.close()
+    report = await asyncio.to_thread(_cleanup_report, session)
+    return {
+        **report,
+        "novel_id": spooled.sha256,
+        "chars": spooled.chars,
+        "bytes": spooled.size_bytes,
+        "source_bytes": spooled.source_bytes,
+        "encoding": spooled.encoding,
+    }
 
-    sec = LLM_CFG.sections["core"]
-    content = prepare_content(req.content, LLM_CFG, section="core")
-    prompt = render(sec.prompt_template, tool_name=sec.tool_name, content=content)
 
-    try:
-        out = client.call_section(section="core", prompt=prompt, output_model=CoreOutput)
-    except LLMClientError as e:
-        _raise_llm_error("Core", e)
+@app.post("/api/analyze/meta")
+async def analyze_meta(req: AnalyzeContentRequest):
+    """分析小说基础信息 + 剧情总结"""
+    content, session = _resolve_novel(req.content, req.novel_id)
+    return await _run_section("meta", content, session=session, bypass_cache=req.bypass_cache)
 
-    errors = validate_core_consistency(out)
-    _raise_errors("Core", errors)
 
-    return {"analysis": out.model_dump(by_alias=True)}
+@app.post("/api/analyze/core")
+async def analyze_core(req: AnalyzeContentRequest):
+    """分析角色 + 关系 + 淫荡指数"""
+    content, session = _resolve_novel(req.content, req.novel_id)
+    return await _run_section("core", content, session=session, bypass_cache=req.bypass_cache)
 
 
 @app.post("/api/analyze/scenes")
-def analyze_scenes(req: AnalyzeScenesRequest):
+async def analyze_scenes(req: AnalyzeScenesRequest):
     """分析首次场景 + 统计 + 关系发展"""
-    client = _llm_client()
-
-    try:
-        characters = [Character.model_validate(c) for c in req.characters]
-        relationships = [Relationship.model_validate(r) for r in req.relationships]
-    except ValidationError as e:
-        _raise_pydantic_error("Scenes 输入", e)
-
-    names = {c.name for c in characters}
-    rel_errors: list[str] = []
-    for idx, r in enumerate(relationships):
-        if r.from_ not in names:
-            rel_errors.append(f"relationships[{idx}].from 不在角色表: {r.from_}")
-        if r.to not in names:
-            rel_errors.append(f"relationships[{idx}].to 不在角色表: {r.to}")
-    _raise_errors("Scenes 输入关系", rel_errors)
-
-    allowed_names_json = json.dumps(sorted(names), ensure_ascii=False)
-    relationships_json = json.dumps([r.model_dump(by_alias=True) for r in relationships], ensure_ascii=False)
-
-    sec = LLM_CFG.sections["scenes"]
-    content = prepare_content(req.content, LLM_CFG, section="scenes")
-    prompt = render(
-        sec.prompt_template,
-        tool_name=sec.tool_name,
-        allowed_names_json=allowed_names_json,
-        relationships_json=relationships_json,
-        content=content,
+    content, session = _resolve_novel(req.content, req.novel_id)
+    characters, relationships = _dependent_context("Scenes", req.characters, req.relationships, session)
+    return await _run_section(
+        "scenes",
+        content,
+        session=session,
+        characters=characters,
+        relationships=relationships,
+        bypass_cache=req.bypass_cache,
     )
 
-    try:
-        out = client.call_section(section="scenes", prompt=prompt, output_model=ScenesOutput)
-    except LLMClientError as e:
-        _raise_llm_error("Scenes", e)
-
-    errors = validate_scenes_consistency(out, names)
-    _raise_errors("Scenes", errors)
-
-    return {"analysis": out.model_dump()}
-
 
 @app.post("/api/analyze/thunderzones")
-def analyze_thunderzones(req: AnalyzeThunderzonesRequest):
+async def analyze_thunderzones(req: AnalyzeThunderzonesRequest):
     """分析雷点"""
-    client = _llm_client()
-
-    try:
-        characters = [Character.model_validate(c) for c in req.characters]
-        relationships = [Relationship.model_validate(r) for r in req.relationships]
-    except ValidationError as e:
-        _raise_pydantic_error("Thunder 输入", e)
-
-    names = {c.name for c in characters}
-    rel_errors: list[str] = []
-    for idx, r in enumerate(relationships):
-        if r.from_ not in names:
-            rel_errors.append(f"relationships[{idx}].from 不在角色表: {r.from_}")
-        if r.to not in names:
-            rel_errors.append(f"relationships[{idx}].to 不在角色表: {r.to}")
-    _raise_errors("Thunder 输入关系", rel_errors)
-
-    allowed_names_json = json.dumps(sorted(names), ensure_ascii=False)
-    relationships_json = json.dumps([r.model_dump(by_alias=True) for r in relationships], ensure_ascii=False)
-
-    sec = LLM_CFG.sections["thunder"]
-    content = prepare_content(req.content, LLM_CFG, section="thunder")
-    prompt = render(
-        sec.prompt_template,
-        tool_name=sec.tool_name,
-        allowed_names_json=allowed_names_json,
-        relationships_json=relationships_json,
-        content=content,
+    content, session = _resolve_novel(req.content, req.novel_id)
+    characters, relationships = _dependent_context("Thunder", req.characters, req.relationships, session)
+    return await _run_section(
+        "thunder",
+        content,
+        session=session,
+        characters=characters,
+        relationships=relationships,
+        bypass_cache=req.bypass_cache,
     )
 
-    try:
-        out = client.call_section(section="thunder", prompt=prompt, output_model=ThunderOutput)
-    except LLMClientError as e:
-        _raise_llm_error("Thunder", e)
-
-    errors = validate_thunder_consistency(out, names)
-    _raise_errors("Thunder", errors)
-
-    return {"analysis": out.model_dump()}
-
 
 @app.post("/api/analyze/lewd-elements")
-def analyze_lewd_elements(req: AnalyzeLewdElementsRequest):
+async def analyze_lewd_elements(req: AnalyzeLewdElementsRequest):
     """分析涩情元素（非雷点标签）"""
-    client = _llm_client()
-
-    try:
-        characters = [Character.model_validate(c) for c in req.characters]
-        relationships = [Relationship.model_validate(r) for r in req.relationships]
-    except ValidationError as e:
-        _raise_pydantic_error("LewdElements 输入", e)
-
-    names = {c.name for c in characters}
-    rel_errors: list[str] = []
-    for idx, r in enumerate(relationships):
-        if r.from_ not in names:
-            rel_errors.append(f"relationships[{idx}].from 不在角色表: {r.from_}")
-        if r.to not in names:
-            rel_errors.append(f"relationships[{idx}].to 不在角色表: {r.to}")
-    _raise_errors("LewdElements 输入关系", rel_errors)
-
-    allowed_names_json = json.dumps(sorted(names), ensure_ascii=False)
-
-    sec = LLM_CFG.sections["lewd_elements"]
-    content = prepare_content(req.content, LLM_CFG, section="lewd_elements")
-    prompt = render(
-        sec.prompt_template,
-        tool_name=sec.tool_name,
-        allowed_names_json=allowed_names_json,
-        content=content,
+    content, session = _resolve_novel(req.content, req.novel_id)
+    characters, relationships = _dependent_context("LewdElements", req.characters, req.relationships, session)
+    return await _run_section(
+        "lewd_elements",
+        content,
+        session=session,
+        characters=characters,
+        relationships=relationships,
+        bypass_cache=req.bypass_cache,
     )
 
+
+async def _stream_full_analysis(
+    client: LLMClient,
+    content: NovelText,
+    session: NovelSession | None,
+    *,
+    bypass_cache: bool = False,
+):
+    """meta 与 core 并行；core 校验通过后并行扇出 scenes/thunder/lewd_elements，逐个 section 以 NDJSON 推送。"""
+    queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    async def run_one(
+        section: str,
+        *,
+        characters: list[Character] | None = None,
+        relationships: list[Relationship] | None = None,
+    ):
+        label = SECTION_LABELS[section]
+
+        def on_progress(p: dict[str, Any]) -> None:
+            queue.put_nowait(
+                {"section": section, "status": "progress", "bytes": p["bytes"], "tokens": p["tokens"]}
+            )
+
+        try:
+            out = await incremental.run_section(
+                client,
+                LLM_CFG,
+                section,
+                content,
+                novel_id=session.novel_id if session is not None else None,
+                characters=characters,
+                relationships=relationships,
+                bypass_cache=bypass_cache,
+                on_progress=on_progress,
+            )
+        except LLMClientError as e:
+            await queue.put({"section": section, "status": "error", "detail": _llm_error_detail(label, e)})
+            return None
+        except ConsistencyError as e:
+            await queue.put({"section": section, "status": "error", "detail": _errors_detail(label, e.errors)})
+            return None
+        except Exception as e:
+            await queue.put({"section": section, "status": "error", "detail": f"{label} 内部错误: {e}"})
+            return None
+        if session is not None and isinstance(out, CoreOutput):
+            NOVEL_STORE.set_core(session.novel_id, out)
+        await queue.put({"section": section, "status": "ok", "analysis": pipeline.dump_output(section, out)})
+        return out
+
+    async def run_core_and_dependents() -> None:
+        core = await run_one("core")
+        if not isinstance(core, CoreOutput):
+            for section in pipeline.DEPENDENT_SECTIONS:
+                await queue.put({"section": section, "status": "skipped", "detail": "core 未通过校验，跳过"})
+            return
+        await asyncio.gather(
+            *(
+                run_one(section, characters=core.characters, relationships=core.relationships)
+                for section in pipeline.DEPENDENT_SECTIONS
+            )
+        )
+
+    tasks = [asyncio.create_task(run_one("meta")), asyncio.create_task(run_core_and_dependents())]
+    runner = asyncio.gather(*tasks)
+    runner.add_done_callback(lambda _f: queue.put_nowait({"event": "done"}))
     try:
-        out = client.call_section(section="lewd_elements", prompt=prompt, output_model=LewdElementsOutput)
-    except LLMClientError as e:
-        _raise_llm_error("LewdElements", e)
+        while True:
+            item = await queue.get()
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+            if item.get("event") == "done":
+                break
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+
+@app.post("/api/analyze/full")
+async def analyze_full(req: AnalyzeContentRequest):
+    """整本分析：服务端按 section 依赖并发执行，结果以 NDJSON 流式返回"""
+    content, session = _resolve_novel(req.content, req.novel_id)
+    client = _llm_client()
+    return StreamingResponse(
+        _stream_full_analysis(client, content, session, bypass_cache=req.bypass_cache),
+        media_type="application/x-ndjson",
+    )
 
-    errors = validate_lewd_elements_consistency(out, names)
-    _raise_errors("LewdElements", errors)
 
-    return {"analysis": out.model_dump()}
+def _job_runner() -> jobs.JobRunner:
+    if JOB_RUNNER is None:
+        raise HTTPException(status_code=503, detail="任务队列未启用（config/llm.yaml 中 jobs.enabled）")
+    return JOB_RUNNER
+
+
+@app.post("/api/jobs")
+async def submit_job(req: JobSubmitRequest):
+    """提交整本分析任务：服务端排队执行，每完成一个 section 即落盘，服务重启后从断点继续"""
+    runner = _job_runner()
+    sections = tuple(dict.fromkeys(req.sections or pipeline.SECTION_OUTPUTS))
+    unknown = [s for s in sections if s not in pipeline.SECTION_OUTPUTS]
+    if unknown or not sections:
+        raise HTTPException(status_code=422, detail=f"未知 section：{', '.join(unknown) or '(空)'}")
+    content, session = _resolve_novel(req.content, req.novel_id)
+    store = jobs.get_store(LLM_CFG.jobs)
+
+    def submit() -> dict[str, Any]:
+        # 全文 sha256 与正文落盘都是整本书的 I/O，在线程里完成
+        novel_id = session.novel_id if session is not None else content_id(content)
+        return store.submit(content, novel_id=novel_id, sections=sections, bypass_cache=req.bypass_cache)
+
+    job = await asyncio.to_thread(submit)
+    runner.notify()
+    return job
+
+
+@app.get("/api/jobs")
+async def list_jobs(status: str | None = None, limit: int = 50):
+    """最近的任务（不含结果）；可按 status 过滤"""
+    _job_runner()
+    if status is not None and status not in jobs.STATUSES:
+        raise HTTPException(status_code=422, detail=f"未知 status：{status}（可选 {', '.join(jobs.STATUSES)}）")
+    store = jobs.get_store(LLM_CFG.jobs)
+    return {"jobs": await asyncio.to_thread(store.list_jobs, status=status, limit=min(max(1, limit), 500))}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """轮询任务：状态、已完成的 section 与各 section 结果/错误"""
+    _job_runner()
+    job = await asyncio.to_thread(jobs.get_store(LLM_CFG.jobs).get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """取消排队中或运行中的任务；已完成的 section 结果保留"""
+    job = await _job_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
 
 
 if __name__ == "__main__":
@@ -1,11 +1,31 @@
 """Internal package for backend LLM + validation logic."""
 
 __all__ = [
+    "batch",
+    "capabilities",
+    "chapters",
+    "circuit_breaker",
+    "cleanup",
     "config_loader",
     "content_processor",
+    "hedging",
+    "http_pool",
+    "incremental",
+    "jobs",
+    "llm_cache",
     "llm_client",
+    "mapped_text",
+    "merge",
+    "novel_store",
     "observability",
+    "pipeline",
     "prompts",
+    "providers",
+    "rate_limiter",
+    "salience",
     "schemas",
+    "single_flight",
+    "tokens",
+    "upload",
     "validators",
 ]
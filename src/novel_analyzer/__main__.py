@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from . import batch, http_pool, providers
+from .config_loader import load_llm_config
+from .llm_client import LLMClient
+from .upload import MODES
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _parse_sections(value: str) -> tuple[str, ...]:
+    sections = tuple(dict.fromkeys(s.strip() for s in value.split(",") if s.strip()))
+    unknown = [s for s in sections if s not in batch.SECTIONS]
+    if unknown or not sections:
+        raise argparse.ArgumentTypeError(f"未知 section：{', '.join(unknown) or '(空)'}（可选 {', '.join(batch.SECTIONS)}）")
+    return sections
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m novel_analyzer", description="小说分析器命令行")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("batch", help="无界面批量分析目录下的小说")
+    p.add_argument("dir", type=Path, help="小说目录（递归匹配 --glob）")
+    p.add_argument("--out", type=Path, default=None, help="JSONL 结果文件（默认 <dir>/analysis.jsonl，追加写入）")
+    p.add_argument("--manifest", type=Path, default=None, help="断点续跑清单（默认与 --out 同名的 .manifest.jsonl）")
+    p.add_argument("--concurrency", type=int, default=4, help="同时分析的小说数（每本最多 3 个 section 并发），默认 4")
+    p.add_argument("--sections", type=_parse_sections, default=batch.SECTIONS, help="逗号分隔，默认全部")
+    p.add_argument("--glob", default="**/*.txt", help="文件匹配模式，默认 **/*.txt")
+    p.add_argument("--encoding", choices=MODES, default="auto", help="文本编码，默认自动识别")
+    p.add_argument("--limit", type=int, default=0, help="本次最多处理的文件数（0 表示不限）")
+    p.add_argument("--bypass-cache", action="store_true", help="忽略本地缓存与增量结果，强制重新调用")
+    return parser
+
+
+async def _run_batch(args: argparse.Namespace) -> dict:
+    cfg = load_llm_config(REPO_ROOT)
+    try:
+        client = LLMClient(providers.get_pool(cfg), cfg)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    out = args.out or args.dir / "analysis.jsonl"
+    try:
+        return await batch.run_batch(
+            client,
+            cfg,
+            args.dir,
+            out_path=out,
+            manifest_path=args.manifest or out.with_name(out.stem + ".manifest.jsonl"),
+            concurrency=args.concurrency,
+            sections=args.sections,
+            pattern=args.glob,
+            encoding=args.encoding,
+            bypass_cache=args.bypass_cache,
+            limit=args.limit,
+        )
+    finally:
+        await http_pool.aclose_all()
+        http_pool.close_all()
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    load_dotenv(REPO_ROOT / ".env")
+    if not args.dir.is_dir():
+        print(f"目录不存在：{args.dir}", file=sys.stderr)
+        return 2
+    summary = asyncio.run(_run_batch(args))
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
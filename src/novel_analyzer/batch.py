@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, TextIO
+
+from . import incremental, pipeline, rate_limiter
+from .config_loader import LLMConfig
+from .llm_client import LLMClient, LLMClientError
+from .mapped_text import NovelText
+from .novel_store import NovelSession, NovelStore
+from .pipeline import ConsistencyError
+from .schemas import CoreOutput
+from .upload import IncrementalSpooler
+
+
+SECTIONS = ("meta", "core", *pipeline.DEPENDENT_SECTIONS)
+_READ_CHUNK = 1 << 20
+
+
+@dataclass
+class NovelResult:
+    path: str
+    status: str
+    novel_id: str = ""
+    encoding: str = ""
+    chars: int = 0
+    sections: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+
+def discover(root: Path, pattern: str = "**/*.txt") -> list[Path]:
+    """Novel files under root in a stable order, so resumed runs walk the same sequence."""
+    return sorted(p for p in root.glob(pattern) if p.is_file())
+
+
+def _file_key(path: Path) -> dict[str, int]:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_manifest(path: Path) -> dict[str, dict[str, Any]]:
+    """Latest manifest entry per relative path; a torn last line from a crashed run is ignored."""
+    entries: dict[str, dict[str, Any]] = {}
+    if not path.exists():
+        return entries
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get("path"), str):
+                entries[entry["path"]] = entry
+    return entries
+
+
+def is_finished(entry: dict[str, Any] | None, key: dict[str, int], sections: tuple[str, ...]) -> bool:
+    """Skip a file only if it is unchanged since a fully successful run that covered the requested sections."""
+    if entry is None or entry.get("status") != "ok":
+        return False
+    if entry.get("size") != key["size"] or entry.get("mtime_ns") != key["mtime_ns"]:
+        return False
+    return set(sections) <= set(entry.get("sections") or ())
+
+
+def _read_novel(path: Path, store: NovelStore, encoding: str, cfg: LLMConfig) -> tuple[NovelSession, str]:
+    # 与上传接口同一套编码识别；storage: mmap 时正文落盘映射，不整本驻留内存
+    spooler = IncrementalSpooler(
+        mode=encoding,
+        spool_max_bytes=max(0, int(cfg.novel_store.upload_spool_mb)) * 1024 * 1024,
+        max_bytes=max(0, int(cfg.novel_store.max_upload_mb)) * 1024 * 1024,
+    )
+    try:
+        with path.open("rb") as f:
+            for data in iter(lambda: f.read(_READ_CHUNK), b""):
+                spooler.feed(data)
+        spooled = spooler.finish()
+    except BaseException:
+        spooler.close()
+        raise
+    try:
+        return store.put_file(spooled.file, novel_id=spooled.sha256), spooled.encoding
+    finally:
+        spooled.close()
+
+
+SectionCallback = Callable[[str, Optional[dict[str, Any]], Optional[str]], Awaitable[None]]
+
+
+async def analyze_novel(
+    client: LLMClient,
+    cfg: LLMConfig,
+    content: NovelText,
+    *,
+    novel_id: str,
+    sections: tuple[str, ...] = SECTIONS,
+    bypass_cache: bool = False,
+    completed: dict[str, Any] | None = None,
+    on_section: SectionCallback | None = None,
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Same schedule as /api/analyze/full: meta alongside core, then the dependent sections in parallel.
+
+    Sections already in `completed` (dumped outputs, e.g. from a checkpoint) are reused instead of
+    re-run; a stored core still feeds the dependents. on_section(section, output, error) is awaited as
+    each section finishes.
+    """
+    completed = completed or {}
+    outputs: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+
+    async def run_one(section: str, core: CoreOutput | None = None):
+        if section in completed:
+            outputs[section] = completed[section]
+            return pipeline.SECTION_OUTPUTS[section].model_validate(completed[section])
+        try:
+            out = await incremental.run_section(
+                client,
+                cfg,
+                section,
+                content,
+                novel_id=novel_id,
+                characters=core.characters if core is not None else None,
+                relationships=core.relationships if core is not None else None,
+                bypass_cache=bypass_cache,
+            )
+        except LLMClientError as e:
+            errors[section] = f"{section} 调用失败: {e}"
+        except ConsistencyError as e:
+            errors[section] = f"{section} 一致性校验失败: " + "; ".join(e.errors)
+        except Exception as e:
+            errors[section] = f"{section} 内部错误: {e}"
+        else:
+            outputs[section] = pipeline.dump_output(section, out)
+        if on_section is not None:
+            await on_section(section, outputs.get(section), errors.get(section))
+        return out if section in outputs else None
+
+    async def run_core_and_dependents() -> None:
+        dependents = [s for s in pipeline.DEPENDENT_SECTIONS if s in sections]
+        if "core" not in sections and not dependents:
+            return
+        core = await run_one("core")
+        if not isinstance(core, CoreOutput):
+            for section in dependents:
+                errors[section] = "core 未通过校验，跳过"
+                if on_section is not None:
+                    await on_section(section, None, errors[section])
+            return
+        await asyncio.gather(*(run_one(section, core) for section in dependents))
+
+    jobs = [run_core_and_dependents()]
+    if "meta" in sections:
+        jobs.append(run_one("meta"))
+    await asyncio.gather(*jobs)
+    # 依赖 section 需要 core 的结果，即使没单独请求 core 也会运行，但只输出请求的部分
+    return {s: outputs[s] for s in sections if s in outputs}, {s: errors[s] for s in sections if s in errors}
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{secs:02d}s" if minutes else f"{secs}s"
+
+
+class Progress:
+    """Throughput and ETA over the files processed in this run (skipped files do not count)."""
+
+    def __init__(self, total: int, *, clock: Callable[[], float] = time.monotonic):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.chars = 0
+        self._clock = clock
+        self._started = clock()
+
+    def record(self, result: NovelResult) -> None:
+        self.done += 1
+        self.chars += result.chars
+        if result.status != "ok":
+            self.failed += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed = max(1e-9, self._clock() - self._started)
+        per_second = self.done / elapsed
+        remaining = self.total - self.done
+        return {
+            "done": self.done,
+            "total": self.total,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 1),
+            "novels_per_minute": round(per_second * 60, 2),
+            "chars_per_second": round(self.chars / elapsed),
+            "eta_seconds": round(remaining / per_second, 1) if per_second > 0 else None,
+        }
+
+    def line(self) -> str:
+        s = self.snapshot()
+        eta = _format_duration(s["eta_seconds"]) if s["eta_seconds"] is not None else "?"
+        return (
+            f"[{s['done']}/{s['total']}] 失败 {s['failed']} · {s['novels_per_minute']} 本/分钟"
+            f" · {s['chars_per_second']} 字/秒 · 已用 {_format_duration(s['elapsed_seconds'])} · 预计剩余 {eta}"
+        )
+
+
+def _append_jsonl(f: TextIO, obj: dict[str, Any]) -> None:
+    f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+async def run_batch(
+    client: LLMClient,
+    cfg: LLMConfig,
+    root: Path,
+    *,
+    out_path: Path,
+    manifest_path: Path,
+    concurrency: int = 4,
+    sections: tuple[str, ...] = SECTIONS,
+    pattern: str = "**/*.txt",
+    encoding: str = "auto",
+    bypass_cache: bool = False,
+    limit: int = 0,
+    log: TextIO = sys.stderr,
+) -> dict[str, Any]:
+    """Analyse every novel under root, appending one JSONL result per file and a manifest entry after it.
+
+    Files already finished in the manifest (unchanged size/mtime, all requested sections ok) are skipped,
+    so a crashed or interrupted run can simply be restarted. At most `concurrency` novels are in flight;
+    each runs up to three sections at once, and every LLM call still passes through the shared
+    defaults.rate_limit buckets, so concurrency can be raised until the limiter is what paces the run.
+    """
+    manifest = load_manifest(manifest_path)
+    pending: list[tuple[Path, str, dict[str, int]]] = []
+    skipped = 0
+    for path in discover(root, pattern):
+        rel = path.relative_to(root).as_posix()
+        key = _file_key(path)
+        if is_finished(manifest.get(rel), key, sections):
+            skipped += 1
+            continue
+        pending.append((path, rel, key))
+    if limit > 0:
+        pending = pending[:limit]
+
+    store = NovelStore(cfg.novel_store)
+    progress = Progress(len(pending))
+    print(f"共 {len(pending) + skipped} 个文件，跳过已完成 {skipped} 个，待处理 {len(pending)} 个", file=log)
+
+    queue: asyncio.Queue[tuple[Path, str, dict[str, int]]] = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("a", encoding="utf-8") as out_f, manifest_path.open("a", encoding="utf-8") as manifest_f:
+
+        async def process(path: Path, rel: str) -> NovelResult:
+            started = time.monotonic()
+            try:
+                session, detected = await asyncio.to_thread(_read_novel, path, store, encoding, cfg)
+            except (OSError, ValueError) as e:
+                return NovelResult(path=rel, status="error", errors={"read": f"读取失败: {e}"})
+            outputs, errors = await analyze_novel(
+                client, cfg, session.content, novel_id=session.novel_id, sections=sections, bypass_cache=bypass_cache
+            )
+            return NovelResult(
+                path=rel,
+                status="ok" if not errors else ("partial" if outputs else "error"),
+                novel_id=session.novel_id,
+                encoding=detected,
+                chars=session.chars,
+                sections=outputs,
+                errors=errors,
+                elapsed_seconds=round(time.monotonic() - started, 3),
+            )
+
+        async def worker() -> None:
+            while True:
+                try:
+                    path, rel, key = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await process(path, rel)
+                # 先写结果再写 manifest：中途崩溃最多重跑一本，不会漏记
+                _append_jsonl(out_f, asdict(result))
+                _append_jsonl(
+                    manifest_f,
+                    {
+                        "path": rel,
+                        **key,
+                        "novel_id": result.novel_id,
+                        "status": result.status,
+                        "sections": sorted(result.sections),
+                        "finished_at": time.time(),
+                    },
+                )
+                progress.record(result)
+                print(f"{progress.line()} · {rel} {result.status}", file=log)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, int(concurrency)))))
+
+    summary = {**progress.snapshot(), "skipped": skipped, "rate_limit": rate_limiter.stats()}
+    print(f"完成：{progress.line()}", file=log)
+    return summary
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .config_loader import CapabilitiesConfig
+
+
+PROTOCOL = "protocol"  # "tools" | "legacy"
+STREAM = "stream"  # bool
+
+
+def _key(api_url: str, model: str) -> str:
+    return f"{api_url.rstrip('/')}|{model}"
+
+
+class CapabilityRegistry:
+    """What each (api_url, model) pair is known to support, persisted to JSON and expired after a TTL.
+
+    get() only reads memory. set()/forget() rewrite the file (atomically) when a value actually changes,
+    so async callers should run them off the event loop.
+    """
+
+    def __init__(self, cfg: CapabilitiesConfig):
+        self._cfg = cfg
+        self._lock = threading.Lock()
+        self._path = Path(cfg.path) if cfg.path else None
+        self._data: dict[str, dict[str, dict[str, Any]]] = self._load()
+
+    def get(self, api_url: str, model: str, name: str) -> Any | None:
+        with self._lock:
+            entry = (self._data.get(_key(api_url, model)) or {}).get(name)
+            if not isinstance(entry, dict):
+                return None
+            if self._is_expired(entry):
+                # 过期项只从内存移除；文件里的旧值重新加载时同样按 TTL 判为过期
+                self._data[_key(api_url, model)].pop(name, None)
+                return None
+            return entry.get("value")
+
+    def set(self, api_url: str, model: str, name: str, value: Any) -> None:
+        with self._lock:
+            caps = self._data.setdefault(_key(api_url, model), {})
+            current = caps.get(name)
+            if isinstance(current, dict) and current.get("value") == value and not self._is_expired(current):
+                return
+            caps[name] = {"value": value, "updated_at": time.time()}
+            self._save()
+
+    def forget(self, api_url: str, model: str, name: str) -> None:
+        with self._lock:
+            caps = self._data.get(_key(api_url, model))
+            if caps and caps.pop(name, None) is not None:
+                self._save()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {
+                key: {name: entry.get("value") for name, entry in caps.items() if not self._is_expired(entry)}
+                for key, caps in self._data.items()
+            }
+
+    def _is_expired(self, entry: dict[str, Any]) -> bool:
+        ttl = float(self._cfg.ttl_seconds)
+        if ttl <= 0:
+            return False
+        try:
+            return time.time() - float(entry.get("updated_at") or 0) > ttl
+        except Exception:
+            return True
+
+    def _load(self) -> dict[str, dict[str, dict[str, Any]]]:
+        if self._path is None or not self._path.exists():
+            return {}
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {k: v for k, v in data.items() if isinstance(v, dict)}
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+        tmp = None
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            # 每次写唯一的临时文件再 os.replace：并发写入或中途崩溃都不会留下半个 JSON
+            fd, tmp = tempfile.mkstemp(dir=str(self._path.parent), prefix=".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self._path)
+        except Exception:
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+
+_instances_lock = threading.Lock()
+_instances: dict[str, CapabilityRegistry] = {}
+
+
+def get_registry(cfg: CapabilitiesConfig) -> CapabilityRegistry:
+    with _instances_lock:
+        registry = _instances.get(cfg.path)
+        if registry is None:
+            registry = CapabilityRegistry(cfg)
+            _instances[cfg.path] = registry
+        return registry
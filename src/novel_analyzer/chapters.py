@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from .mapped_text import NovelText, text_blocks
+
+
+# 与前端 detectChapterCount 相同的两类标题：优先中文“第X章”，没有时再看 “Chapter N”
+_CN_HEADING_RE = re.compile(r"^[ \t　]*第\s*([0-9]{1,5}|[一二三四五六七八九十百千两〇零]{1,12})\s*章[^\n]*", re.M)
+_EN_HEADING_RE = re.compile(r"^[ \t　]*chapter\s+([0-9]{1,5})\b[^\n]*", re.M | re.I)
+
+
+@dataclass(frozen=True)
+class Chapter:
+    title: str
+    start: int
+    end: int
+    label: str = ""
+
+
+def build_chapter_index(text: NovelText) -> list[Chapter]:
+    """Segment text into chapters with one regex pass; text before the first heading becomes an untitled preface."""
+    for pattern in (_CN_HEADING_RE, _EN_HEADING_RE):
+        headings = [
+            (base + m.start(), m.group().strip(), m.group(1))
+            for base, block in text_blocks(text)
+            for m in pattern.finditer(block)
+        ]
+        if headings:
+            break
+    else:
+        return []
+
+    chapters: list[Chapter] = []
+    # 只看前 4096 字判断是否有序言，避免把整段序言读成字符串
+    if headings[0][0] > 4096 or text[: headings[0][0]].strip():
+        chapters.append(Chapter(title="", start=0, end=headings[0][0]))
+    for i, (start, title, label) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        chapters.append(Chapter(title=title, start=start, end=end, label=label))
+    return chapters
+
+
+def is_heading_line(line: str) -> bool:
+    return bool(_CN_HEADING_RE.match(line) or _EN_HEADING_RE.match(line))
+
+
+def chapter_count(chapters: list[Chapter]) -> int:
+    """Numbered headings, with back-to-back repeats (上/下 parts of one chapter) counted once.
+
+    Numbers are not deduplicated across the book: multi-volume novels restart at 第1章 in every volume.
+    """
+    labels = [c.label for c in chapters if c.label]
+    return sum(1 for i, label in enumerate(labels) if i == 0 or label != labels[i - 1])
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from . import observability
+from .config_loader import CircuitBreakerConfig, RetryPolicy
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over the HTTP attempts made to one (api_url, model).
+
+    Failures are timeouts, transport errors and 5xx responses; everything else counts as
+    the upstream being alive (a 4xx is the request's fault, a 429 is the rate limiter's job).
+    """
+
+    def __init__(self, key: str, cfg: CircuitBreakerConfig):
+        self._key = key
+        self._cfg = cfg
+        self._lock = threading.Lock()
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._last_probe_at = 0.0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance(time.monotonic())
+            return self._state
+
+    def allow(self) -> float | None:
+        """None if a request may go out now, otherwise the seconds until the breaker will let one through."""
+        now = time.monotonic()
+        with self._lock:
+            self._advance(now)
+            if self._state == CLOSED:
+                return None
+            if self._state == HALF_OPEN:
+                # 探测请求若被取消而未回报结果，超过 open_seconds 后允许重新探测
+                if self._probes >= int(self._cfg.half_open_max_calls) and now - self._last_probe_at > self._cfg.open_seconds:
+                    self._probes = 0
+                if self._probes < int(self._cfg.half_open_max_calls):
+                    self._probes += 1
+                    self._last_probe_at = now
+                    return None
+                self.rejected += 1
+                return max(0.0, float(self._cfg.open_seconds))
+            self.rejected += 1
+            return max(0.0, self._opened_at + float(self._cfg.open_seconds) - now)
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._advance(now)
+            if self._state == HALF_OPEN:
+                if ok:
+                    self._outcomes.clear()
+                    self._transition(CLOSED, now, failure_rate=0.0)
+                else:
+                    self._transition(OPEN, now, failure_rate=1.0)
+                return
+
+            self._outcomes.append((now, ok))
+            self._prune(now)
+            if self._state != CLOSED:
+                return
+            total = len(self._outcomes)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            rate = failures / total if total else 0.0
+            if total >= int(self._cfg.min_requests) and rate >= float(self._cfg.failure_rate_threshold):
+                self._transition(OPEN, now, failure_rate=rate)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._advance(now)
+            self._prune(now)
+            total = len(self._outcomes)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            return {
+                "state": self._state,
+                "window_requests": total,
+                "window_failures": failures,
+                "rejected": self.rejected,
+            }
+
+    def _advance(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= float(self._cfg.open_seconds):
+            self._transition(HALF_OPEN, now, failure_rate=None)
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - float(self._cfg.window_seconds)
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _transition(self, state: str, now: float, *, failure_rate: float | None) -> None:
+        previous = self._state
+        if previous == state:
+            return
+        self._state = state
+        if state == OPEN:
+            self._opened_at = now
+        if state == HALF_OPEN:
+            self._probes = 0
+        observability.circuit_state(
+            upstream=self._key,
+            previous=previous,
+            state=state,
+            failure_rate=failure_rate,
+        )
+
+
+class RetryBudget:
+    """Allow retries only while they stay under ratio x first attempts seen in the sliding window."""
+
+    def __init__(self, retry: RetryPolicy):
+        self._ratio = float(retry.budget_ratio)
+        self._min_retries = int(retry.budget_min_retries)
+        self._window = float(retry.budget_window_seconds)
+        self._lock = threading.Lock()
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self.denied = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            allowed = max(self._min_retries, int(self._ratio * len(self._requests)))
+            if len(self._retries) >= allowed:
+                self.denied += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                "window_requests": len(self._requests),
+                "window_retries": len(self._retries),
+                "denied": self.denied,
+            }
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self._window
+        for q in (self._requests, self._retries):
+            while q and q[0] < cutoff:
+                q.popleft()
+
+
+_instances_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+_budgets: dict[str, RetryBudget] = {}
+
+
+def get_breaker(key: str, cfg: CircuitBreakerConfig) -> CircuitBreaker | None:
+    if not cfg.enabled:
+        return None
+    with _instances_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, cfg)
+            _breakers[key] = breaker
+        return breaker
+
+
+def get_budget(key: str, retry: RetryPolicy) -> RetryBudget | None:
+    if retry.budget_ratio <= 0:
+        return None
+    with _instances_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = RetryBudget(retry)
+            _budgets[key] = budget
+        return budget
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    with _instances_lock:
+        breakers = list(_breakers.items())
+        budgets = list(_budgets.items())
+    out: dict[str, dict[str, Any]] = {key: {"breaker": b.stats()} for key, b in breakers}
+    for key, budget in budgets:
+        out.setdefault(key, {})["retry_budget"] = budget.stats()
+    return out
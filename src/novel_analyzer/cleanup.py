@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator
+
+from . import observability
+from .chapters import is_heading_line
+from .config_loader import CleanupConfig, TokenBudgetConfig
+from .mapped_text import MappedText, NovelText, text_blocks
+from .tokens import estimate_tokens_from_sizes
+
+
+# 零宽字符直接删除；全角字母/数字 → 半角（中文标点保持原样）。
+# 用正则只改命中的片段：对整块做 str.translate(dict) 在中文文本上慢一个数量级
+_ZERO_WIDTH_RE = re.compile("[\u200b-\u200d\ufeff]+")
+_FULLWIDTH_ALNUM_RE = re.compile("[０-９Ａ-Ｚａ-ｚ]+")
+_FULLWIDTH_ALNUM = str.maketrans(
+    "０１２３４５６７８９ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ",
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz",
+)
+_SPACE_RUN_RE = re.compile(r"[ \t\r\u3000\u00a0]+")
+_PUNCT_RUN_RE = re.compile(r"([。，、；：！？!?,;~～=＊*·])\1{2,}")
+_LONG_PUNCT_RUN_RE = re.compile(r"([…—])\1{2,}")
+_DIALOGUE_OPENERS = ("“", "「", "『", '"', "‘")
+
+
+@dataclass(frozen=True)
+class CleanupReport:
+    original_chars: int
+    cleaned_chars: int
+    dropped_lines: int
+    boilerplate_lines: int
+    saved_tokens: int
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _normalize_block(block: str, cfg: CleanupConfig) -> str:
+    block = _SPACE_RUN_RE.sub(" ", _ZERO_WIDTH_RE.sub("", block))
+    if cfg.normalize_punctuation:
+        block = _FULLWIDTH_ALNUM_RE.sub(lambda m: m.group().translate(_FULLWIDTH_ALNUM), block)
+        block = _PUNCT_RUN_RE.sub(r"\1", block)
+        block = _LONG_PUNCT_RUN_RE.sub(r"\1\1", block)
+    return block
+
+
+def _lines(text: NovelText, cfg: CleanupConfig) -> Iterator[list[str]]:
+    """Normalized lines per block; a line cut by a block boundary is carried into the next block."""
+    carry = ""
+    for _, block in text_blocks(text):
+        lines = _normalize_block(block, cfg).split("\n")
+        lines[0] = carry + lines[0]
+        carry = lines.pop()
+        yield lines
+    if carry:
+        yield [carry]
+
+
+def _boilerplate_hashes(text: NovelText, cfg: CleanupConfig) -> set[int]:
+    """Pass 1: hashes of short lines repeated at least min_repeats times across the novel."""
+    lo, hi = int(cfg.min_line_chars), int(cfg.max_line_chars)
+    counts: Counter[int] = Counter()
+    for lines in _lines(text, cfg):
+        stripped = (line.strip() for line in lines)
+        # 对白即使重复也是正文；章节标题留到第二遍只对命中的行检查
+        counts.update(hash(line) for line in stripped if lo <= len(line) <= hi and not line.startswith(_DIALOGUE_OPENERS))
+    threshold = max(2, int(cfg.min_repeats))
+    return {h for h, n in counts.items() if n >= threshold}
+
+
+def _cleaned_blocks(text: NovelText, cfg: CleanupConfig, stats: dict[str, int]) -> Iterator[str]:
+    """Pass 2: drop boilerplate/pattern lines, trim padding and cap blank-line runs, block by block."""
+    repeated = _boilerplate_hashes(text, cfg)
+    patterns = re.compile("|".join(f"(?:{p})" for p in cfg.drop_patterns)) if cfg.drop_patterns else None
+    max_blank = max(0, int(cfg.max_blank_lines))
+    blank_run = 0
+    dropped_hashes: set[int] = set()
+    at_start = True
+    for lines in _lines(text, cfg):
+        out: list[str] = []
+        for raw in lines:
+            line = raw.strip()
+            if not line:
+                blank_run += 1
+                continue
+            h = hash(line)
+            if (h in repeated and not is_heading_line(line)) or (patterns is not None and patterns.search(line)):
+                stats["dropped_lines"] += 1
+                dropped_hashes.add(h)
+                continue
+            if not at_start:
+                # 上一段落结束 + 至多 max_blank 个空行
+                out.append("\n" * (1 + min(blank_run, max_blank)))
+            out.append(line)
+            blank_run = 0
+            at_start = False
+        if out:
+            yield "".join(out)
+    stats["boilerplate_lines"] = len(dropped_hashes)
+
+
+def _source_bytes(text: NovelText) -> int:
+    return text.size_bytes if isinstance(text, MappedText) else len(text.encode("utf-8"))
+
+
+def _clean(text: NovelText, cfg: CleanupConfig, token_cfg: TokenBudgetConfig) -> tuple[NovelText, CleanupReport]:
+    stats = {"dropped_lines": 0, "boilerplate_lines": 0}
+    if isinstance(text, MappedText):
+        # 清洗结果同样落盘并映射，避免整本书变成一个 str
+        fd, path = tempfile.mkstemp(prefix="cleaned.", suffix=".txt")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for piece in _cleaned_blocks(text, cfg, stats):
+                    f.write(piece.encode("utf-8"))
+            cleaned: NovelText = MappedText(path, delete=True)
+        except BaseException:
+            os.unlink(path)
+            raise
+    else:
+        cleaned = "".join(_cleaned_blocks(text, cfg, stats))
+
+    saved = estimate_tokens_from_sizes(len(text), _source_bytes(text), token_cfg) - estimate_tokens_from_sizes(
+        len(cleaned), _source_bytes(cleaned), token_cfg
+    )
+    report = CleanupReport(
+        original_chars=len(text),
+        cleaned_chars=len(cleaned),
+        dropped_lines=stats["dropped_lines"],
+        boilerplate_lines=stats["boilerplate_lines"],
+        saved_tokens=max(0, saved),
+    )
+    observability.cleanup(**report.as_dict())
+    return cleaned, report
+
+
+class _CleanupCache:
+    """Content hash -> (cleaned text, report), so the five sections and the upload response clean a novel once."""
+
+    def __init__(self, max_items: int = 4):
+        self._max_items = max_items
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple, tuple[NovelText, CleanupReport]] = OrderedDict()
+
+    def get(self, text: NovelText, cfg: CleanupConfig, token_cfg: TokenBudgetConfig) -> tuple[NovelText, CleanupReport]:
+        digest = text.sha256 if isinstance(text, MappedText) else hashlib.sha256(text.encode("utf-8")).hexdigest()
+        key = (digest, isinstance(text, MappedText), cfg, token_cfg.cjk_tokens_per_char, token_cfg.ascii_chars_per_token)
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+                return hit
+        entry = _clean(text, cfg, token_cfg)
+        with self._lock:
+            entry = self._items.setdefault(key, entry)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+        return entry
+
+
+_CACHE = _CleanupCache()
+
+
+def clean_content(text: NovelText, cfg: CleanupConfig, token_cfg: TokenBudgetConfig) -> tuple[NovelText, CleanupReport | None]:
+    """Boilerplate-stripped, whitespace/punctuation-normalized text plus a savings report (None when disabled)."""
+    if not cfg.enabled or not len(text):
+        return text, None
+    return _CACHE.get(text, cfg, token_cfg)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
@@ -18,12 +19,121 @@ class RetryPolicy:
     base_wait_seconds: float
     max_wait_seconds: float
     retryable_status_codes: tuple[int, ...]
+    jitter: str = "none"
+    budget_ratio: float = 0.0
+    budget_min_retries: int = 3
+    budget_window_seconds: float = 60.0
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry_seconds: float = 60.0
+    http2: bool = False
+    warm_on_startup: bool = True
+
+
+@dataclass(frozen=True)
+class StreamingConfig:
+    enabled: bool = False
+    connect_timeout_seconds: float = 15.0
+    idle_timeout_seconds: float = 60.0
+    progress_interval_seconds: float = 0.5
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+
+
+@dataclass(frozen=True)
+class CircuitBreakerConfig:
+    enabled: bool = False
+    window_seconds: float = 60.0
+    min_requests: int = 5
+    failure_rate_threshold: float = 0.5
+    open_seconds: float = 30.0
+    half_open_max_calls: int = 1
+
+
+@dataclass(frozen=True)
+class HedgingConfig:
+    enabled: bool = False
+    sections: tuple[str, ...] = ()
+    percentile: float = 0.95
+    min_samples: int = 20
+    min_delay_seconds: float = 5.0
+    max_extra_ratio: float = 0.1
+    window: int = 200
+
+
+@dataclass(frozen=True)
+class SingleFlightConfig:
+    enabled: bool = True
 
 
 @dataclass(frozen=True)
 class DefaultsConfig:
     timeout_seconds: int
     retry: RetryPolicy
+    http: HttpPoolConfig = field(default_factory=HttpPoolConfig)
+    streaming: StreamingConfig = field(default_factory=StreamingConfig)
+    rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
+    circuit_breaker: CircuitBreakerConfig = field(default_factory=CircuitBreakerConfig)
+    hedging: HedgingConfig = field(default_factory=HedgingConfig)
+    single_flight: SingleFlightConfig = field(default_factory=SingleFlightConfig)
+
+
+@dataclass(frozen=True)
+class ChunkingConfig:
+    enabled: bool = False
+    chunk_chars: int = 0
+    max_chunks: int = 32
+    concurrency: int = 4
+    sections: tuple[str, ...] = ("core", "scenes", "thunder", "lewd_elements")
+
+
+@dataclass(frozen=True)
+class TokenBudgetConfig:
+    enabled: bool = False
+    default_context_tokens: int = 0
+    context_tokens: dict[str, int] = field(default_factory=dict)
+    reserve_output_tokens: int = 4096
+    cjk_tokens_per_char: float = 1.0
+    ascii_chars_per_token: float = 4.0
+
+
+@dataclass(frozen=True)
+class SalienceConfig:
+    lexicon: tuple[str, ...] = ()
+    window_chars: int = 2000
+    lexicon_weight: float = 2.0
+    name_weight: float = 1.0
+    max_names: int = 20
+    min_name_count: int = 3
+
+
+@dataclass(frozen=True)
+class CleanupConfig:
+    enabled: bool = False
+    min_repeats: int = 5
+    min_line_chars: int = 4
+    max_line_chars: int = 60
+    max_blank_lines: int = 1
+    normalize_punctuation: bool = True
+    drop_patterns: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class ContentProfileConfig:
+    """Per-section content_processing overrides; None keeps the shared value."""
+
+    max_chars: int | None = None
+    strategy: str | None = None
+    boundary_search_window: int | None = None
+    truncation_marker_template: str | None = None
 
 
 @dataclass(frozen=True)
@@ -33,6 +143,72 @@ class ContentProcessingConfig:
     boundary_aware: bool
     boundary_search_window: int
     truncation_marker_template: str
+    chunking: ChunkingConfig = field(default_factory=ChunkingConfig)
+    chapter_min_chars: int = 300
+    token_budget: TokenBudgetConfig = field(default_factory=TokenBudgetConfig)
+    salience: SalienceConfig = field(default_factory=SalienceConfig)
+    sections: dict[str, ContentProfileConfig] = field(default_factory=dict)
+    cleanup: CleanupConfig = field(default_factory=CleanupConfig)
+
+
+@dataclass(frozen=True)
+class NovelStoreConfig:
+    max_items: int = 16
+    max_memory_mb: int = 512
+    ttl_seconds: int = 6 * 3600
+    max_upload_mb: int = 512
+    upload_spool_mb: int = 16
+    storage: str = "memory"
+    dir: str = ""
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool = False
+    path: str = "llm_cache/llm_cache.sqlite3"
+    max_entries: int = 5000
+    max_mb: int = 256
+    ttl_seconds: int = 30 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class IncrementalConfig:
+    enabled: bool = False
+    path: str = "llm_cache/analyses.sqlite3"
+    max_entries: int = 500
+    segment_chars: int = 20000
+
+
+@dataclass(frozen=True)
+class JobsConfig:
+    enabled: bool = False
+    path: str = "llm_cache/jobs.sqlite3"
+    dir: str = "llm_cache/jobs"
+    workers: int = 2
+    max_finished: int = 1000
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    name: str
+    env_prefix: str = ""
+    model: str | None = None
+    weight: float = 1.0
+    max_concurrency: int = 0
+    rate_limit: RateLimitConfig | None = None
+
+
+@dataclass(frozen=True)
+class ProvidersConfig:
+    pool: tuple[ProviderConfig, ...] = (ProviderConfig(name="primary"),)
+    failure_threshold: int = 3
+    cooldown_seconds: float = 30.0
+
+
+@dataclass(frozen=True)
+class CapabilitiesConfig:
+    path: str = ""
+    ttl_seconds: int = 7 * 24 * 3600
 
 
 @dataclass(frozen=True)
@@ -43,12 +219,20 @@ class RepairConfig:
     bad_output_max_chars: int
 
 
+@dataclass(frozen=True)
+class RouteTarget:
+    provider: str
+    model: str | None = None
+
+
 @dataclass(frozen=True)
 class SectionConfig:
     temperature: float
     tool_name: str
     description: str
     prompt_template: str
+    model: str | None = None
+    route: tuple[RouteTarget, ...] = ()
 
 
 @dataclass(frozen=True)
@@ -64,6 +248,15 @@ class LLMConfig:
     repair: RepairConfig
     sections: dict[str, SectionConfig]
     repair_template: RepairTemplateConfig
+    novel_store: NovelStoreConfig = field(default_factory=NovelStoreConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    capabilities: CapabilitiesConfig = field(default_factory=CapabilitiesConfig)
+    incremental: IncrementalConfig = field(default_factory=IncrementalConfig)
+    jobs: JobsConfig = field(default_factory=JobsConfig)
+    providers: ProvidersConfig = field(default_factory=ProvidersConfig)
+
+
+_SECTION_NAMES = ("meta", "core", "scenes", "thunder", "lewd_elements")
 
 
 def _require_dict(obj: Any, ctx: str) -> dict[str, Any]:
@@ -119,6 +312,69 @@ def _env_int(name: str) -> int | None:
         return None
 
 
+def _parse_rate_limit(raw: Any, ctx: str) -> RateLimitConfig:
+    raw = _require_dict(raw or {}, ctx)
+    return RateLimitConfig(
+        requests_per_minute=_require_int(raw.get("requests_per_minute", 0), f"{ctx}.requests_per_minute"),
+        tokens_per_minute=_require_int(raw.get("tokens_per_minute", 0), f"{ctx}.tokens_per_minute"),
+    )
+
+
+def _parse_providers(raw: dict[str, Any]) -> ProvidersConfig:
+    pool_raw = raw.get("pool")
+    if pool_raw is None:
+        pool = ProvidersConfig().pool
+    elif isinstance(pool_raw, list) and pool_raw:
+        items: list[ProviderConfig] = []
+        for i, item in enumerate(pool_raw):
+            ctx = f"providers.pool[{i}]"
+            item = _require_dict(item, ctx)
+            name = _require_str(item.get("name"), f"{ctx}.name").strip()
+            if any(p.name == name for p in items):
+                raise ValueError(f"配置解析失败：{ctx}.name 重复（{name}）")
+            weight = _require_float(item.get("weight", 1.0), f"{ctx}.weight")
+            if weight <= 0:
+                raise ValueError(f"配置解析失败：{ctx}.weight 必须大于 0")
+            items.append(
+                ProviderConfig(
+                    name=name,
+                    env_prefix=str(item.get("env_prefix") or "").strip(),
+                    model=str(item["model"]).strip() if item.get("model") else None,
+                    weight=weight,
+                    max_concurrency=_require_int(item.get("max_concurrency", 0), f"{ctx}.max_concurrency"),
+                    rate_limit=_parse_rate_limit(item["rate_limit"], f"{ctx}.rate_limit") if "rate_limit" in item else None,
+                )
+            )
+        pool = tuple(items)
+    else:
+        raise ValueError("配置解析失败：providers.pool 必须是非空数组")
+    return ProvidersConfig(
+        pool=pool,
+        failure_threshold=_require_int(raw.get("failure_threshold", 3), "providers.failure_threshold"),
+        cooldown_seconds=_require_float(raw.get("cooldown_seconds", 30), "providers.cooldown_seconds"),
+    )
+
+
+def _parse_route(raw: Any, providers_cfg: ProvidersConfig, ctx: str) -> tuple[RouteTarget, ...]:
+    """Ordered provider chain: each item is a provider name or {provider, model}."""
+    if raw is None:
+        return ()
+    if not isinstance(raw, list):
+        raise ValueError(f"配置解析失败：{ctx} 必须是数组")
+    known = {p.name for p in providers_cfg.pool}
+    targets: list[RouteTarget] = []
+    for i, item in enumerate(raw):
+        if isinstance(item, str):
+            item = {"provider": item}
+        item = _require_dict(item, f"{ctx}[{i}]")
+        name = _require_str(item.get("provider"), f"{ctx}[{i}].provider").strip()
+        if name not in known:
+            raise ValueError(f"配置解析失败：{ctx}[{i}].provider 未在 providers.pool 中定义（{name}）")
+        model = item.get("model")
+        targets.append(RouteTarget(provider=name, model=_require_str(model, f"{ctx}[{i}].model").strip() if model is not None else None))
+    return tuple(targets)
+
+
 def load_llm_config(repo_root: Path) -> LLMConfig:
     config_path = (repo_root / CONFIG_REL_PATH).resolve()
     if not config_path.exists():
@@ -144,6 +400,96 @@ def load_llm_config(repo_root: Path) -> LLMConfig:
         raise ValueError("配置解析失败：defaults.retry.retryable_status_codes 必须是非空数组")
     retryable_status_codes = tuple(int(x) for x in status_codes_raw)
 
+    jitter = str(retry_raw.get("jitter") or "none").strip().lower()
+    if jitter not in {"none", "full"}:
+        raise ValueError("配置解析失败：defaults.retry.jitter 仅支持 none|full")
+    budget_ratio = _require_float(retry_raw.get("budget_ratio", 0), "defaults.retry.budget_ratio")
+    budget_min_retries = _require_int(retry_raw.get("budget_min_retries", 3), "defaults.retry.budget_min_retries")
+    budget_window_seconds = _require_float(
+        retry_raw.get("budget_window_seconds", 60),
+        "defaults.retry.budget_window_seconds",
+    )
+
+    http_raw = _require_dict(defaults_raw.get("http") or {}, "defaults.http")
+    http_cfg = HttpPoolConfig(
+        max_connections=_require_int(http_raw.get("max_connections", 20), "defaults.http.max_connections"),
+        max_keepalive_connections=_require_int(
+            http_raw.get("max_keepalive_connections", 10),
+            "defaults.http.max_keepalive_connections",
+        ),
+        keepalive_expiry_seconds=_require_float(
+            http_raw.get("keepalive_expiry_seconds", 60),
+            "defaults.http.keepalive_expiry_seconds",
+        ),
+        http2=bool(http_raw.get("http2", False)),
+        warm_on_startup=bool(http_raw.get("warm_on_startup", True)),
+    )
+
+    streaming_raw = _require_dict(defaults_raw.get("streaming") or {}, "defaults.streaming")
+    streaming_cfg = StreamingConfig(
+        enabled=bool(streaming_raw.get("enabled", False)),
+        connect_timeout_seconds=_require_float(
+            streaming_raw.get("connect_timeout_seconds", 15),
+            "defaults.streaming.connect_timeout_seconds",
+        ),
+        idle_timeout_seconds=_require_float(
+            streaming_raw.get("idle_timeout_seconds", 60),
+            "defaults.streaming.idle_timeout_seconds",
+        ),
+        progress_interval_seconds=_require_float(
+            streaming_raw.get("progress_interval_seconds", 0.5),
+            "defaults.streaming.progress_interval_seconds",
+        ),
+    )
+
+    rate_raw = _require_dict(defaults_raw.get("rate_limit") or {}, "defaults.rate_limit")
+    rate_cfg = RateLimitConfig(
+        requests_per_minute=_require_int(
+            rate_raw.get("requests_per_minute", 0),
+            "defaults.rate_limit.requests_per_minute",
+        ),
+        tokens_per_minute=_require_int(
+            rate_raw.get("tokens_per_minute", 0),
+            "defaults.rate_limit.tokens_per_minute",
+        ),
+    )
+
+    cb_raw = _require_dict(defaults_raw.get("circuit_breaker") or {}, "defaults.circuit_breaker")
+    cb_cfg = CircuitBreakerConfig(
+        enabled=bool(cb_raw.get("enabled", False)),
+        window_seconds=_require_float(cb_raw.get("window_seconds", 60), "defaults.circuit_breaker.window_seconds"),
+        min_requests=_require_int(cb_raw.get("min_requests", 5), "defaults.circuit_breaker.min_requests"),
+        failure_rate_threshold=_require_float(
+            cb_raw.get("failure_rate_threshold", 0.5),
+            "defaults.circuit_breaker.failure_rate_threshold",
+        ),
+        open_seconds=_require_float(cb_raw.get("open_seconds", 30), "defaults.circuit_breaker.open_seconds"),
+        half_open_max_calls=_require_int(
+            cb_raw.get("half_open_max_calls", 1),
+            "defaults.circuit_breaker.half_open_max_calls",
+        ),
+    )
+
+    hedge_raw = _require_dict(defaults_raw.get("hedging") or {}, "defaults.hedging")
+    hedge_sections_raw = hedge_raw.get("sections") or []
+    if not isinstance(hedge_sections_raw, list):
+        raise ValueError("配置解析失败：defaults.hedging.sections 必须是数组")
+    percentile = _require_float(hedge_raw.get("percentile", 0.95), "defaults.hedging.percentile")
+    if not 0 < percentile <= 1:
+        raise ValueError("配置解析失败：defaults.hedging.percentile 必须在 (0, 1] 之间")
+    hedge_cfg = HedgingConfig(
+        enabled=bool(hedge_raw.get("enabled", False)),
+        sections=tuple(str(x).strip() for x in hedge_sections_raw if str(x).strip()),
+        percentile=percentile,
+        min_samples=_require_int(hedge_raw.get("min_samples", 20), "defaults.hedging.min_samples"),
+        min_delay_seconds=_require_float(hedge_raw.get("min_delay_seconds", 5), "defaults.hedging.min_delay_seconds"),
+        max_extra_ratio=_require_float(hedge_raw.get("max_extra_ratio", 0.1), "defaults.hedging.max_extra_ratio"),
+        window=_require_int(hedge_raw.get("window", 200), "defaults.hedging.window"),
+    )
+
+    sf_raw = _require_dict(defaults_raw.get("single_flight") or {}, "defaults.single_flight")
+    single_flight_cfg = SingleFlightConfig(enabled=bool(sf_raw.get("enabled", True)))
+
     defaults_cfg = DefaultsConfig(
         timeout_seconds=timeout_seconds,
         retry=RetryPolicy(
@@ -152,10 +498,116 @@ def load_llm_config(repo_root: Path) -> LLMConfig:
             base_wait_seconds=base_wait_seconds,
             max_wait_seconds=max_wait_seconds,
             retryable_status_codes=retryable_status_codes,
+            jitter=jitter,
+            budget_ratio=budget_ratio,
+            budget_min_retries=budget_min_retries,
+            budget_window_seconds=budget_window_seconds,
         ),
+        http=http_cfg,
+        streaming=streaming_cfg,
+        rate_limit=rate_cfg,
+        circuit_breaker=cb_cfg,
+        hedging=hedge_cfg,
+        single_flight=single_flight_cfg,
     )
 
     cp_raw = _require_dict(root.get("content_processing"), "content_processing")
+    chunk_raw = _require_dict(cp_raw.get("chunking") or {}, "content_processing.chunking")
+    chunk_sections_raw = chunk_raw.get("sections")
+    if chunk_sections_raw is None:
+        chunk_sections = ChunkingConfig().sections
+    elif isinstance(chunk_sections_raw, list):
+        chunk_sections = tuple(str(x).strip() for x in chunk_sections_raw if str(x).strip())
+    else:
+        raise ValueError("配置解析失败：content_processing.chunking.sections 必须是数组")
+    chunk_cfg = ChunkingConfig(
+        enabled=bool(chunk_raw.get("enabled", False)),
+        chunk_chars=_require_int(chunk_raw.get("chunk_chars", 0), "content_processing.chunking.chunk_chars"),
+        max_chunks=_require_int(chunk_raw.get("max_chunks", 32), "content_processing.chunking.max_chunks"),
+        concurrency=_require_int(chunk_raw.get("concurrency", 4), "content_processing.chunking.concurrency"),
+        sections=chunk_sections,
+    )
+    tb_raw = _require_dict(cp_raw.get("token_budget") or {}, "content_processing.token_budget")
+    ctx_raw = _require_dict(tb_raw.get("context_tokens") or {}, "content_processing.token_budget.context_tokens")
+    tb_cfg = TokenBudgetConfig(
+        enabled=bool(tb_raw.get("enabled", False)),
+        default_context_tokens=_require_int(
+            tb_raw.get("default_context_tokens", 0),
+            "content_processing.token_budget.default_context_tokens",
+        ),
+        context_tokens={
+            str(k): _require_int(v, f"content_processing.token_budget.context_tokens.{k}") for k, v in ctx_raw.items()
+        },
+        reserve_output_tokens=_require_int(
+            tb_raw.get("reserve_output_tokens", 4096),
+            "content_processing.token_budget.reserve_output_tokens",
+        ),
+        cjk_tokens_per_char=_require_float(
+            tb_raw.get("cjk_tokens_per_char", 1.0),
+            "content_processing.token_budget.cjk_tokens_per_char",
+        ),
+        ascii_chars_per_token=_require_float(
+            tb_raw.get("ascii_chars_per_token", 4.0),
+            "content_processing.token_budget.ascii_chars_per_token",
+        ),
+    )
+
+    sal_raw = _require_dict(cp_raw.get("salience") or {}, "content_processing.salience")
+    lexicon_raw = sal_raw.get("lexicon") or []
+    if not isinstance(lexicon_raw, list):
+        raise ValueError("配置解析失败：content_processing.salience.lexicon 必须是数组")
+    sal_cfg = SalienceConfig(
+        lexicon=tuple(str(x).strip() for x in lexicon_raw if str(x).strip()),
+        window_chars=_require_int(sal_raw.get("window_chars", 2000), "content_processing.salience.window_chars"),
+        lexicon_weight=_require_float(sal_raw.get("lexicon_weight", 2.0), "content_processing.salience.lexicon_weight"),
+        name_weight=_require_float(sal_raw.get("name_weight", 1.0), "content_processing.salience.name_weight"),
+        max_names=_require_int(sal_raw.get("max_names", 20), "content_processing.salience.max_names"),
+        min_name_count=_require_int(sal_raw.get("min_name_count", 3), "content_processing.salience.min_name_count"),
+    )
+
+    clean_raw = _require_dict(cp_raw.get("cleanup") or {}, "content_processing.cleanup")
+    drop_patterns = clean_raw.get("drop_patterns") or []
+    if not isinstance(drop_patterns, list):
+        raise ValueError("配置解析失败：content_processing.cleanup.drop_patterns 必须是数组")
+    for pattern in drop_patterns:
+        try:
+            re.compile(str(pattern))
+        except re.error as e:
+            raise ValueError(f"配置解析失败：content_processing.cleanup.drop_patterns 含无效正则 {pattern!r}: {e}")
+    cleanup_cfg = CleanupConfig(
+        enabled=bool(clean_raw.get("enabled", False)),
+        min_repeats=_require_int(clean_raw.get("min_repeats", 5), "content_processing.cleanup.min_repeats"),
+        min_line_chars=_require_int(clean_raw.get("min_line_chars", 4), "content_processing.cleanup.min_line_chars"),
+        max_line_chars=_require_int(clean_raw.get("max_line_chars", 60), "content_processing.cleanup.max_line_chars"),
+        max_blank_lines=_require_int(clean_raw.get("max_blank_lines", 1), "content_processing.cleanup.max_blank_lines"),
+        normalize_punctuation=bool(clean_raw.get("normalize_punctuation", True)),
+        drop_patterns=tuple(str(p) for p in drop_patterns),
+    )
+
+    profiles_raw = _require_dict(cp_raw.get("sections") or {}, "content_processing.sections")
+    profiles: dict[str, ContentProfileConfig] = {}
+    for name, prof_raw in profiles_raw.items():
+        ctx = f"content_processing.sections.{name}"
+        if name not in _SECTION_NAMES:
+            raise ValueError(f"配置解析失败：{ctx} 不是已知 section（{', '.join(_SECTION_NAMES)}）")
+        prof_raw = _require_dict(prof_raw or {}, ctx)
+        profiles[str(name)] = ContentProfileConfig(
+            max_chars=_require_int(prof_raw["max_chars"], f"{ctx}.max_chars") if "max_chars" in prof_raw else None,
+            strategy=(
+                _require_str(prof_raw["strategy"], f"{ctx}.strategy").strip().lower() if "strategy" in prof_raw else None
+            ),
+            boundary_search_window=(
+                _require_int(prof_raw["boundary_search_window"], f"{ctx}.boundary_search_window")
+                if "boundary_search_window" in prof_raw
+                else None
+            ),
+            truncation_marker_template=(
+                _require_str(prof_raw["truncation_marker_template"], f"{ctx}.truncation_marker_template")
+                if "truncation_marker_template" in prof_raw
+                else None
+            ),
+        )
+
     cp_cfg = ContentProcessingConfig(
         max_chars=_require_int(cp_raw.get("max_chars"), "content_processing.max_chars"),
         strategy=_require_str(cp_raw.get("strategy"), "content_processing.strategy").strip().lower(),
@@ -168,8 +620,82 @@ def load_llm_config(repo_root: Path) -> LLMConfig:
             cp_raw.get("truncation_marker_template"),
             "content_processing.truncation_marker_template",
         ),
+        chunking=chunk_cfg,
+        chapter_min_chars=_require_int(cp_raw.get("chapter_min_chars", 300), "content_processing.chapter_min_chars"),
+        token_budget=tb_cfg,
+        salience=sal_cfg,
+        sections=profiles,
+        cleanup=cleanup_cfg,
+    )
+
+    store_raw = _require_dict(root.get("novel_store") or {}, "novel_store")
+    store_storage = str(store_raw.get("storage") or "memory").strip().lower()
+    if store_storage not in {"memory", "mmap"}:
+        raise ValueError("配置解析失败：novel_store.storage 只能是 memory 或 mmap")
+    store_dir = str(store_raw.get("dir") or "").strip()
+    if store_dir and not Path(store_dir).expanduser().is_absolute():
+        store_dir = str(repo_root.resolve() / store_dir)
+    store_cfg = NovelStoreConfig(
+        max_items=_require_int(store_raw.get("max_items", 16), "novel_store.max_items"),
+        max_memory_mb=_require_int(store_raw.get("max_memory_mb", 512), "novel_store.max_memory_mb"),
+        ttl_seconds=_require_int(store_raw.get("ttl_seconds", 6 * 3600), "novel_store.ttl_seconds"),
+        max_upload_mb=_require_int(store_raw.get("max_upload_mb", 512), "novel_store.max_upload_mb"),
+        upload_spool_mb=_require_int(store_raw.get("upload_spool_mb", 16), "novel_store.upload_spool_mb"),
+        storage=store_storage,
+        dir=store_dir,
+    )
+
+    cache_raw = _require_dict(root.get("cache") or {}, "cache")
+    cache_enabled = bool(cache_raw.get("enabled", False))
+    env_cache_enabled = _env_bool("LLM_CACHE_ENABLED")
+    if env_cache_enabled is not None:
+        cache_enabled = env_cache_enabled
+    cache_path = Path(str(cache_raw.get("path") or "llm_cache/llm_cache.sqlite3")).expanduser()
+    if not cache_path.is_absolute():
+        cache_path = repo_root.resolve() / cache_path
+    cache_cfg = CacheConfig(
+        enabled=cache_enabled,
+        path=str(cache_path),
+        max_entries=_require_int(cache_raw.get("max_entries", 5000), "cache.max_entries"),
+        max_mb=_require_int(cache_raw.get("max_mb", 256), "cache.max_mb"),
+        ttl_seconds=_require_int(cache_raw.get("ttl_seconds", 30 * 24 * 3600), "cache.ttl_seconds"),
     )
 
+    caps_raw = _require_dict(root.get("capabilities") or {}, "capabilities")
+    caps_path = str(caps_raw.get("path") or "").strip()
+    if caps_path and not Path(caps_path).expanduser().is_absolute():
+        caps_path = str(repo_root.resolve() / caps_path)
+    caps_cfg = CapabilitiesConfig(
+        path=caps_path,
+        ttl_seconds=_require_int(caps_raw.get("ttl_seconds", 7 * 24 * 3600), "capabilities.ttl_seconds"),
+    )
+
+    inc_raw = _require_dict(root.get("incremental") or {}, "incremental")
+    inc_path = Path(str(inc_raw.get("path") or "llm_cache/analyses.sqlite3")).expanduser()
+    if not inc_path.is_absolute():
+        inc_path = repo_root.resolve() / inc_path
+    inc_cfg = IncrementalConfig(
+        enabled=bool(inc_raw.get("enabled", False)),
+        path=str(inc_path),
+        max_entries=_require_int(inc_raw.get("max_entries", 500), "incremental.max_entries"),
+        segment_chars=_require_int(inc_raw.get("segment_chars", 20000), "incremental.segment_chars"),
+    )
+
+    jobs_raw = _require_dict(root.get("jobs") or {}, "jobs")
+    jobs_paths = {}
+    for key, default in (("path", "llm_cache/jobs.sqlite3"), ("dir", "llm_cache/jobs")):
+        p = Path(str(jobs_raw.get(key) or default)).expanduser()
+        jobs_paths[key] = str(p if p.is_absolute() else repo_root.resolve() / p)
+    jobs_cfg = JobsConfig(
+        enabled=bool(jobs_raw.get("enabled", False)),
+        path=jobs_paths["path"],
+        dir=jobs_paths["dir"],
+        workers=_require_int(jobs_raw.get("workers", 2), "jobs.workers"),
+        max_finished=_require_int(jobs_raw.get("max_finished", 1000), "jobs.max_finished"),
+    )
+
+    providers_cfg = _parse_providers(_require_dict(root.get("providers") or {}, "providers"))
+
     repair_raw = _require_dict(root.get("repair"), "repair")
     repair_enabled = bool(repair_raw.get("enabled", True))
     env_enabled = _env_bool("LLM_REPAIR_ENABLED")
@@ -199,7 +725,7 @@ def load_llm_config(repo_root: Path) -> LLMConfig:
         prompt_template=_read_text(config_dir / repair_prompt_file, "repair prompt_file"),
     )
 
-    required_sections = ["meta", "core", "scenes", "thunder", "lewd_elements"]
+    required_sections = list(_SECTION_NAMES)
 
     sections: dict[str, SectionConfig] = {}
     for name in required_sections:
@@ -210,6 +736,8 @@ def load_llm_config(repo_root: Path) -> LLMConfig:
             tool_name=_require_str(sec_raw.get("tool_name"), f"sections.{name}.tool_name"),
             description=_require_str(sec_raw.get("description"), f"sections.{name}.description"),
             prompt_template=_read_text(config_dir / prompt_file, f"sections.{name}.prompt_file"),
+            model=_require_str(sec_raw["model"], f"sections.{name}.model").strip() if sec_raw.get("model") is not None else None,
+            route=_parse_route(sec_raw.get("route"), providers_cfg, f"sections.{name}.route"),
         )
 
     return LLMConfig(
@@ -218,4 +746,10 @@ def load_llm_config(repo_root: Path) -> LLMConfig:
         repair=repair_cfg,
         sections=sections,
         repair_template=repair_template,
+        novel_store=store_cfg,
+        cache=cache_cfg,
+        capabilities=caps_cfg,
+        incremental=inc_cfg,
+        jobs=jobs_cfg,
+        providers=providers_cfg,
     )
@@ -1,14 +1,83 @@
 from __future__ import annotations
 
-from .config_loader import LLMConfig
+import hashlib
+import operator
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from itertools import accumulate, compress, islice, repeat
+from typing import Iterable
+
+from .chapters import Chapter, build_chapter_index
+from .config_loader import ContentProcessingConfig, LLMConfig, TokenBudgetConfig
+from .mapped_text import MappedText, NovelText, as_str, text_blocks
 from . import observability
 from .prompts import render
+from .salience import select_windows
+from .tokens import estimate_tokens, estimate_tokens_from_sizes
 
 
 _BOUNDARIES = ["\n\n", "\n", "。", "！", "？", ".", "!", "?"]
 
 
-def _find_last_boundary(text: str, start: int, end: int) -> int | None:
+def _char_offsets(text: str, ch: str) -> array:
+    """Offsets of every ch in text; split + accumulate keep the per-occurrence work inside C."""
+    parts = text.split(ch)
+    if len(parts) == 1:
+        return array("q")
+    ends = accumulate(map(operator.add, map(len, parts[:-1]), repeat(1)))
+    return array("q", map(operator.sub, ends, repeat(1)))
+
+
+class BoundaryIndex:
+    """Sorted start offsets of every _BOUNDARIES occurrence, built once per document.
+
+    Answers the same questions as str.rfind/str.find per boundary, via bisect.
+    """
+
+    def __init__(self, text: NovelText):
+        self.length = len(text)
+        single = {b: array("q") for b in _BOUNDARIES if len(b) == 1}
+        for base, block in text_blocks(text):
+            for b, offsets in single.items():
+                found = _char_offsets(block, b)
+                offsets.extend(map(operator.add, found, repeat(base)) if base else found)
+        newlines = single["\n"]
+        # "\n\n" 可重叠匹配（与 str.find 一致）：换行后紧跟换行的位置
+        adjacent = map(operator.eq, islice(newlines, 1, None), map(operator.add, newlines, repeat(1)))
+        double = array("q", compress(newlines, adjacent))
+        self._offsets: list[tuple[int, array]] = [
+            (len(b), double if b == "\n\n" else single[b]) for b in _BOUNDARIES
+        ]
+
+    def last_cut(self, start: int, end: int) -> int | None:
+        best: int | None = None
+        for size, offsets in self._offsets:
+            i = bisect_right(offsets, end - size) - 1
+            if i < 0 or offsets[i] < start:
+                continue
+            cut = offsets[i] + size
+            if best is None or cut > best:
+                best = cut
+        return best
+
+    def first_cut(self, start: int, end: int) -> int | None:
+        best: int | None = None
+        for size, offsets in self._offsets:
+            i = bisect_left(offsets, start)
+            if i >= len(offsets) or offsets[i] + size > end:
+                continue
+            cut = offsets[i]
+            if best is None or cut < best:
+                best = cut
+        return best
+
+
+def _find_last_boundary(text: str, start: int, end: int, index: BoundaryIndex | None = None) -> int | None:
+    if index is not None:
+        return index.last_cut(start, end)
     best: int | None = None
     for b in _BOUNDARIES:
         idx = text.rfind(b, start, end)
@@ -20,7 +89,9 @@ def _find_last_boundary(text: str, start: int, end: int) -> int | None:
     return best
 
 
-def _find_first_boundary(text: str, start: int, end: int) -> int | None:
+def _find_first_boundary(text: str, start: int, end: int, index: BoundaryIndex | None = None) -> int | None:
+    if index is not None:
+        return index.first_cut(start, end)
     best: int | None = None
     for b in _BOUNDARIES:
         idx = text.find(b, start, end)
@@ -32,36 +103,272 @@ def _find_first_boundary(text: str, start: int, end: int) -> int | None:
     return best
 
 
-def _cut_head(text: str, desired: int, window: int) -> int:
+def _cut_head(text: NovelText, desired: int, window: int, index: BoundaryIndex | None = None) -> int:
     if desired <= 0:
         return 0
     if desired >= len(text):
         return len(text)
     start = max(0, desired - window)
     end = min(len(text), desired + 1)
-    boundary = _find_last_boundary(text, start, end)
+    boundary = _find_last_boundary(text, start, end, index)
     return boundary if boundary is not None and boundary > 0 else desired
 
 
-def _cut_tail(text: str, desired_start: int, window: int) -> int:
+def _cut_tail(text: NovelText, desired_start: int, window: int, index: BoundaryIndex | None = None) -> int:
     if desired_start <= 0:
         return 0
     if desired_start >= len(text):
         return len(text)
     start = max(0, desired_start)
     end = min(len(text), desired_start + window)
-    boundary = _find_first_boundary(text, start, end)
+    boundary = _find_first_boundary(text, start, end, index)
     return boundary if boundary is not None else desired_start
 
 
-def prepare_content(content: str, cfg: LLMConfig, *, section: str) -> str:
+class _Document:
+    """Everything derived from one text: boundary index, chapter table and prepared outputs."""
+
+    def __init__(self, text: NovelText):
+        self.index = BoundaryIndex(text)
+        self.prepared: dict[tuple, str] = {}
+        self._text = text
+        self._chapters: list[Chapter] | None = None
+        self._tokens: dict[tuple[float, float], int] = {}
+        self.windows: dict[tuple, int] = {}
+
+    @property
+    def chapters(self) -> list[Chapter]:
+        if self._chapters is None:
+            self._chapters = build_chapter_index(self._text)
+        return self._chapters
+
+    def tokens(self, cfg: TokenBudgetConfig) -> int:
+        key = (cfg.cjk_tokens_per_char, cfg.ascii_chars_per_token)
+        if key not in self._tokens:
+            if isinstance(self._text, MappedText):
+                self._tokens[key] = estimate_tokens_from_sizes(len(self._text), self._text.size_bytes, cfg)
+            else:
+                self._tokens[key] = estimate_tokens(self._text, cfg)
+        return self._tokens[key]
+
+
+class _DocumentCache:
+    """Keyed by content hash, so the five sections scan and slice a novel once."""
+
+    def __init__(self, max_items: int = 4):
+        self._max_items = max_items
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, _Document] = OrderedDict()
+
+    def entry(self, text: NovelText) -> _Document:
+        key = text.sha256 if isinstance(text, MappedText) else hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            doc = self._items.get(key)
+            if doc is not None:
+                self._items.move_to_end(key)
+                return doc
+        doc = _Document(text)
+        with self._lock:
+            doc = self._items.setdefault(key, doc)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+        return doc
+
+
+_DOCUMENTS = _DocumentCache()
+
+
+def boundary_index(text: NovelText) -> BoundaryIndex:
+    return _DOCUMENTS.entry(text).index
+
+
+def chapter_index(text: NovelText) -> list[Chapter]:
+    """(title, start, end) table for text, built once per document."""
+    return _DOCUMENTS.entry(text).chapters
+
+
+_CHAPTER_SEPARATOR = "\n\n……\n\n"
+
+
+def _chapter_spans(chapters: list[Chapter], budget: int, *, min_chars: int, stratified: bool) -> list[tuple[int, int]]:
+    """Spread budget evenly across chapters, grouping consecutive chapters when there are too many.
+
+    per_chapter_head keeps the opening of the first chapter in each group. chapter_stratified keeps
+    the heading of the group's middle chapter plus a window from the middle of its body, so the
+    sample follows the plot through the book rather than only chapter openings.
+    """
+    pieces_per_group = 2 if stratified else 1
+    overhead = len(_CHAPTER_SEPARATOR) * pieces_per_group
+    groups = max(1, min(len(chapters), budget // (min_chars + overhead)))
+    share = max(0, budget // groups - overhead)
+
+    spans: list[tuple[int, int]] = []
+    for g in range(groups):
+        lo = g * len(chapters) // groups
+        hi = max(lo + 1, (g + 1) * len(chapters) // groups)
+        if not stratified:
+            chapter = chapters[lo]
+            spans.append((chapter.start, min(chapter.end, chapter.start + share)))
+            continue
+        chapter = chapters[(lo + hi - 1) // 2]
+        title_len = min(len(chapter.title), share // 4)
+        body = share - title_len
+        mid = chapter.start + title_len + max(0, (chapter.end - chapter.start - title_len - body) // 2)
+        spans.append((chapter.start, chapter.start + title_len))
+        spans.append((mid, min(chapter.end, mid + body)))
+    return spans
+
+
+def split_chunks(text: NovelText, chunk_chars: int, window: int, *, boundary_aware: bool = True) -> list[tuple[int, int]]:
+    """Cover the whole text with consecutive (start, end) spans of at most chunk_chars, cut at sentence boundaries."""
+    if chunk_chars <= 0 or len(text) <= chunk_chars:
+        return [(0, len(text))] if text else []
+    index = boundary_index(text) if boundary_aware else None
+    spans: list[tuple[int, int]] = []
+    pos = 0
+    while pos < len(text):
+        desired = pos + chunk_chars
+        end = _cut_head(text, desired, min(window, chunk_chars // 2), index) if boundary_aware else min(desired, len(text))
+        if end <= pos:
+            end = min(desired, len(text))
+        spans.append((pos, end))
+        pos = end
+    return spans
+
+
+def section_content_config(cfg: LLMConfig, section: str) -> ContentProcessingConfig:
+    """content_processing with section's profile (content_processing.sections.<section>) applied."""
     cp = cfg.content_processing
-    max_chars = int(cp.max_chars)
-    if max_chars <= 0:
-        return content
+    profile = cp.sections.get(section)
+    if profile is None:
+        return cp
+    overrides = {k: v for k, v in asdict(profile).items() if v is not None}
+    return replace(cp, **overrides) if overrides else cp
+
+
+def prepare_content(
+    content: NovelText,
+    cfg: LLMConfig,
+    *,
+    section: str,
+    token_budget: int | None = None,
+    names: Iterable[str] = (),
+    cache_document: bool = True,
+) -> str:
+    """Sample content down to the section's configured budget.
+
+    token_budget (estimated tokens left for the novel text once the prompt template, tool schema and
+    reserved output are subtracted) replaces content_processing.max_chars when given. names are known
+    character names; the salience strategy scores windows by them instead of guessing candidates.
+    content may be a MappedText; then only the selected slices are decoded into the returned str.
+    cache_document=False skips the shared document cache (one-off texts such as chunk slices would
+    otherwise evict the whole novels the other sections reuse).
+    """
+    cp = section_content_config(cfg, section)
+    doc = _DOCUMENTS.entry(content) if cache_document else _Document(content)
+    strategy = (cp.strategy or "head_middle_tail").strip().lower()
+    name_key = tuple(sorted({n for n in names if n}))
+
+    if token_budget is not None:
+        total = doc.tokens(cp.token_budget)
+        if total <= token_budget:
+            return as_str(content)
+        # 按全文 token 密度换算字数，再用实际估算值收敛（局部密度可能高于均值）
+        max_chars = int(len(content) * max(0, token_budget) / total)
+        out, windows = _prepare(content, cp, doc, strategy=strategy, max_chars=max_chars, names=name_key)
+        for _ in range(3):
+            used = estimate_tokens(out, cp.token_budget)
+            if used <= token_budget or max_chars <= 0:
+                break
+            max_chars = int(max_chars * token_budget / used * 0.98)
+            out, windows = _prepare(content, cp, doc, strategy=strategy, max_chars=max_chars, names=name_key)
+    else:
+        max_chars = int(cp.max_chars)
+        if max_chars <= 0 or len(content) <= max_chars:
+            return as_str(content)
+        out, windows = _prepare(content, cp, doc, strategy=strategy, max_chars=max_chars, names=name_key)
+
+    observability.truncation(
+        section=section,
+        original_chars=len(content),
+        kept_chars=len(out),
+        strategy=strategy,
+        windows=windows,
+    )
+    return out
+
+
+def _prepare(
+    content: NovelText,
+    cp: ContentProcessingConfig,
+    doc: _Document,
+    *,
+    strategy: str,
+    max_chars: int,
+    names: tuple[str, ...],
+) -> tuple[str, int | None]:
     if len(content) <= max_chars:
-        return content
+        return as_str(content), None
+    if max_chars <= 0:
+        return "", None
+    key = (
+        strategy,
+        max_chars,
+        bool(cp.boundary_aware),
+        int(cp.boundary_search_window),
+        int(cp.chapter_min_chars),
+        cp.truncation_marker_template,
+        names if strategy == "salience" else (),
+    )
+    out = doc.prepared.get(key)
+    if out is None:
+        sampled = _salience_sample(content, cp, doc, max_chars=max_chars, names=names) if strategy == "salience" else None
+        if sampled is not None:
+            out, doc.windows[key] = sampled
+        else:
+            out = _truncate(content, cp, strategy=strategy, doc=doc, max_chars=max_chars)
+        doc.prepared[key] = out
+    return out, doc.windows.get(key)
+
 
+def _salience_sample(
+    content: NovelText,
+    cp: ContentProcessingConfig,
+    doc: _Document,
+    *,
+    max_chars: int,
+    names: tuple[str, ...],
+) -> tuple[str, int] | None:
+    """Top-k salient windows joined by truncation markers; None when nothing scores (falls back to head_middle_tail)."""
+    marker = render(cp.truncation_marker_template, original_chars=len(content), kept_chars=max_chars)
+    window_chars = min(int(cp.salience.window_chars), max_chars - 2 * len(marker))
+    if window_chars <= 0:
+        return None
+    count = max(1, (max_chars - len(marker)) // (window_chars + len(marker)))
+    spans = select_windows(content, window_chars=window_chars, count=count, cfg=cp.salience, names=names)
+    if not spans:
+        return None
+
+    window = max(0, int(cp.boundary_search_window))
+    parts: list[str] = []
+    cursor = 0
+    for start, end in spans:
+        if cp.boundary_aware:
+            cut_start = _cut_tail(content, start, window, doc.index)
+            cut_end = _cut_head(content, end, window, doc.index)
+            if cut_end > cut_start:
+                start, end = cut_start, cut_end
+        if start > cursor:
+            parts.append(marker)
+        parts.append(content[start:end])
+        cursor = end
+    if cursor < len(content):
+        parts.append(marker)
+    return "".join(parts)[:max_chars], len(spans)
+
+
+def _truncate(content: NovelText, cp: ContentProcessingConfig, *, strategy: str, doc: _Document, max_chars: int) -> str:
     marker = render(
         cp.truncation_marker_template,
         original_chars=len(content),
@@ -70,50 +377,55 @@ def prepare_content(content: str, cfg: LLMConfig, *, section: str) -> str:
     marker_len = len(marker)
     window = max(0, int(cp.boundary_search_window))
     boundary_aware = bool(cp.boundary_aware)
-    strategy = (cp.strategy or "head_middle_tail").strip().lower()
+    index = doc.index if boundary_aware else None
 
     def cut_head_slice(n: int) -> str:
         end = n
         if boundary_aware:
-            end = _cut_head(content, n, window)
+            end = _cut_head(content, n, window, index)
         return content[:end]
 
     def cut_tail_slice(n: int) -> str:
         start = max(0, len(content) - n)
         if boundary_aware:
-            start = _cut_tail(content, start, window)
+            start = _cut_tail(content, start, window, index)
         return content[start:]
 
     if strategy in {"head", "start"}:
         head_len = max_chars - marker_len
-        out = cut_head_slice(max(0, head_len)) + marker
-        out = out[:max_chars]
-        observability.truncation(section=section, original_chars=len(content), kept_chars=len(out), strategy=strategy)
-        return out
+        return (cut_head_slice(max(0, head_len)) + marker)[:max_chars]
 
     if strategy in {"tail", "end"}:
         tail_len = max_chars - marker_len
-        out = marker + cut_tail_slice(max(0, tail_len))
-        out = out[-max_chars:]
-        observability.truncation(section=section, original_chars=len(content), kept_chars=len(out), strategy=strategy)
-        return out
+        return (marker + cut_tail_slice(max(0, tail_len)))[-max_chars:]
 
     if strategy in {"head_tail", "start_end"}:
         available = max_chars - marker_len
         head_len = max(0, available // 2)
         tail_len = max(0, available - head_len)
-        out = cut_head_slice(head_len) + marker + cut_tail_slice(tail_len)
-        out = out[:max_chars]
-        observability.truncation(section=section, original_chars=len(content), kept_chars=len(out), strategy=strategy)
-        return out
+        return (cut_head_slice(head_len) + marker + cut_tail_slice(tail_len))[:max_chars]
+
+    if strategy in {"per_chapter_head", "chapter_stratified"} and len(doc.chapters) > 1:
+        spans = _chapter_spans(
+            doc.chapters,
+            max(0, max_chars - marker_len),
+            min_chars=max(1, int(cp.chapter_min_chars)),
+            stratified=strategy == "chapter_stratified",
+        )
+        pieces: list[str] = []
+        for start, end in spans:
+            if boundary_aware:
+                end = max(start, _cut_head(content, end, window, index))
+            piece = content[start:end].strip("\n")
+            if piece:
+                pieces.append(piece)
+        return (marker + _CHAPTER_SEPARATOR.join(pieces))[:max_chars]
 
-    if strategy in {"head_middle_tail"}:
+    if strategy in {"head_middle_tail", "per_chapter_head", "chapter_stratified", "salience"}:
         available = max_chars - 2 * marker_len
         if available <= 0:
             out = cut_head_slice(max_chars)
-            out = out[:max_chars]
-            observability.truncation(section=section, original_chars=len(content), kept_chars=len(out), strategy=strategy)
-            return out
+            return out[:max_chars]
 
         head_len = max(0, available // 3)
         mid_len = max(0, available // 3)
@@ -124,21 +436,15 @@ def prepare_content(content: str, cfg: LLMConfig, *, section: str) -> str:
         mid_start = max(0, (len(content) // 2) - (mid_len // 2))
         mid_end = min(len(content), mid_start + mid_len)
         if boundary_aware:
-            mid_start = _cut_tail(content, mid_start, window)
-            mid_end = _cut_head(content, mid_end, window)
+            mid_start = _cut_tail(content, mid_start, window, index)
+            mid_end = _cut_head(content, mid_end, window, index)
             if mid_end < mid_start:
                 mid_end = mid_start
         middle = content[mid_start:mid_end]
 
         tail = cut_tail_slice(tail_len)
 
-        out = head + marker + middle + marker + tail
-        out = out[:max_chars]
-        observability.truncation(section=section, original_chars=len(content), kept_chars=len(out), strategy=strategy)
-        return out
+        return (head + marker + middle + marker + tail)[:max_chars]
 
     head_len = max_chars - marker_len
-    out = cut_head_slice(max(0, head_len)) + marker
-    out = out[:max_chars]
-    observability.truncation(section=section, original_chars=len(content), kept_chars=len(out), strategy=strategy)
-    return out
+    return (cut_head_slice(max(0, head_len)) + marker)[:max_chars]
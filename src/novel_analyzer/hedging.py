@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from typing import Any
+
+from .config_loader import HedgingConfig
+
+
+class SectionHedger:
+    """Recent latency distribution and hedge accounting for one section."""
+
+    def __init__(self, cfg: HedgingConfig):
+        self._cfg = cfg
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=max(1, int(cfg.window)))
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.denied = 0
+
+    def delay(self) -> float | None:
+        """Seconds to wait for the primary before hedging; None until enough samples exist."""
+        with self._lock:
+            self.calls += 1
+            if len(self._latencies) < int(self._cfg.min_samples):
+                return None
+            ordered = sorted(self._latencies)
+        idx = min(len(ordered) - 1, max(0, math.ceil(float(self._cfg.percentile) * len(ordered)) - 1))
+        return max(float(self._cfg.min_delay_seconds), ordered[idx])
+
+    def try_hedge(self) -> bool:
+        """Spend one hedge if the section stays within max_extra_ratio of its calls."""
+        with self._lock:
+            if self.hedged + 1 > float(self._cfg.max_extra_ratio) * self.calls:
+                self.denied += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(float(seconds))
+
+    def record_winner(self, *, hedge: bool) -> None:
+        with self._lock:
+            if hedge:
+                self.hedge_wins += 1
+            else:
+                self.primary_wins += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "calls": self.calls,
+                "samples": len(ordered),
+                "p50_seconds": round(ordered[len(ordered) // 2], 3) if ordered else None,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "primary_wins": self.primary_wins,
+                "denied": self.denied,
+            }
+
+
+_instances_lock = threading.Lock()
+_instances: dict[str, SectionHedger] = {}
+
+
+def get_hedger(section: str, cfg: HedgingConfig) -> SectionHedger | None:
+    if not cfg.enabled or (cfg.sections and section not in cfg.sections):
+        return None
+    with _instances_lock:
+        hedger = _instances.get(section)
+        if hedger is None:
+            hedger = SectionHedger(cfg)
+            _instances[section] = hedger
+        return hedger
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    with _instances_lock:
+        items = list(_instances.items())
+    return {section: hedger.stats() for section, hedger in items}
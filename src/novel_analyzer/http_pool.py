@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config_loader import HttpPoolConfig
+
+
+Timeout = httpx.TimeoutException
+RequestError = httpx.HTTPError
+
+
+_lock = threading.Lock()
+_cfg = HttpPoolConfig()
+_pools: dict[str, "_Pool"] = {}
+_async_pools: dict[str, "_AsyncPool"] = {}
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _limits(cfg: HttpPoolConfig) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max(1, int(cfg.max_connections)),
+        max_keepalive_connections=max(0, int(cfg.max_keepalive_connections)),
+        keepalive_expiry=max(0.0, float(cfg.keepalive_expiry_seconds)),
+    )
+
+
+class _PoolBase:
+    mode = ""
+
+    def __init__(self, origin: str, cfg: HttpPoolConfig):
+        self.origin = origin
+        self.http2 = bool(cfg.http2) and _h2_available()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def _on_trace(self, event_name: str) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def stats(self) -> dict[str, Any]:
+        # httpx 不公开连接列表，这里只做只读探测；取不到时退化为 None。
+        connections = getattr(getattr(self._transport, "_pool", None), "connections", None)
+        open_count: int | None = None
+        idle_count: int | None = None
+        if isinstance(connections, list):
+            open_count = len(connections)
+            idle_count = sum(1 for c in connections if c.is_idle())
+
+        with self._lock:
+            requests_total = self.requests
+            opened = self.connections_opened
+        return {
+            "origin": self.origin,
+            "mode": self.mode,
+            "http2": self.http2,
+            "open": open_count,
+            "idle": idle_count,
+            "requests": requests_total,
+            "connections_opened": opened,
+            "reused": max(0, requests_total - opened),
+        }
+
+
+class _Pool(_PoolBase):
+    """One keep-alive connection pool per upstream origin (i.e. per LLMRuntime.api_url)."""
+
+    mode = "sync"
+
+    def __init__(self, origin: str, cfg: HttpPoolConfig):
+        super().__init__(origin, cfg)
+        self._transport = httpx.HTTPTransport(limits=_limits(cfg), http2=self.http2)
+        self.client = httpx.Client(transport=self._transport)
+
+    def trace(self, event_name: str, info: dict[str, Any]) -> None:
+        self._on_trace(event_name)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class _AsyncPool(_PoolBase):
+    """Async counterpart of _Pool; bound to the event loop that created it."""
+
+    mode = "async"
+
+    def __init__(self, origin: str, cfg: HttpPoolConfig, loop: asyncio.AbstractEventLoop):
+        super().__init__(origin, cfg)
+        self.loop = loop
+        self._transport = httpx.AsyncHTTPTransport(limits=_limits(cfg), http2=self.http2)
+        self.client = httpx.AsyncClient(transport=self._transport)
+
+    async def trace(self, event_name: str, info: dict[str, Any]) -> None:
+        self._on_trace(event_name)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def discard(self) -> None:
+        """Release a pool whose event loop is gone or belongs to another thread.
+
+        A live loop closes the client itself; otherwise the keep-alive sockets are closed directly,
+        since awaiting aclose() on a dead loop is impossible.
+        """
+        if self.loop.is_running() and not self.loop.is_closed():
+            try:
+                asyncio.run_coroutine_threadsafe(self.aclose(), self.loop)
+                return
+            except RuntimeError:
+                pass
+        for conn in list(getattr(getattr(self._transport, "_pool", None), "connections", None) or ()):
+            stream = getattr(getattr(conn, "_connection", None), "_network_stream", None)
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            # asyncio 只暴露 TransportSocket 包装（不能 close），关闭其底层 socket
+            sock = getattr(sock, "_sock", sock)
+            if sock is not None:
+                try:
+                    sock.close()
+                except (OSError, AttributeError):
+                    continue
+
+
+def configure(cfg: HttpPoolConfig) -> None:
+    global _cfg
+    with _lock:
+        _cfg = cfg
+
+
+def _get_pool(url: str) -> _Pool:
+    origin = _origin(url)
+    with _lock:
+        pool = _pools.get(origin)
+        if pool is None:
+            pool = _Pool(origin, _cfg)
+            _pools[origin] = pool
+        return pool
+
+
+def _get_async_pool(url: str) -> _AsyncPool:
+    origin = _origin(url)
+    loop = asyncio.get_running_loop()
+    stale: _AsyncPool | None = None
+    with _lock:
+        pool = _async_pools.get(origin)
+        # AsyncClient 不能跨事件循环复用；循环变化（测试/CLI 多次 asyncio.run）时重建，旧连接随之关闭。
+        if pool is None or pool.loop is not loop:
+            stale = pool
+            pool = _AsyncPool(origin, _cfg, loop)
+            _async_pools[origin] = pool
+    if stale is not None:
+        stale.discard()
+    return pool
+
+
+def post(url: str, *, headers: dict[str, str], json: Any, timeout: float) -> httpx.Response:
+    pool = _get_pool(url)
+    pool.count_request()
+    return pool.client.post(url, headers=headers, json=json, timeout=timeout, extensions={"trace": pool.trace})
+
+
+async def apost(url: str, *, headers: dict[str, str], json: Any, timeout: float) -> httpx.Response:
+    pool = _get_async_pool(url)
+    pool.count_request()
+    return await pool.client.post(url, headers=headers, json=json, timeout=timeout, extensions={"trace": pool.trace})
+
+
+def stream_timeout(*, connect_seconds: float, idle_seconds: float) -> httpx.Timeout:
+    """Streaming calls bound the gap between chunks (read) instead of the whole response."""
+    return httpx.Timeout(connect=connect_seconds, read=idle_seconds, write=connect_seconds, pool=connect_seconds)
+
+
+def _is_event_stream(res: httpx.Response) -> bool:
+    return "text/event-stream" in (res.headers.get("content-type") or "").lower()
+
+
+def post_stream(
+    url: str,
+    *,
+    headers: dict[str, str],
+    json: Any,
+    timeout: httpx.Timeout,
+    on_line: Callable[[str], None],
+) -> tuple[int, str | None, httpx.Headers]:
+    """POST and feed SSE lines to on_line.
+
+    Returns (status_code, body, headers): body is None when a 200 event stream was consumed
+    line by line, otherwise the full response text (errors, or providers that ignore stream=true).
+    """
+    pool = _get_pool(url)
+    pool.count_request()
+    with pool.client.stream(
+        "POST", url, headers=headers, json=json, timeout=timeout, extensions={"trace": pool.trace}
+    ) as res:
+        if res.status_code != 200 or not _is_event_stream(res):
+            res.read()
+            return res.status_code, res.text, res.headers
+        for line in res.iter_lines():
+            on_line(line)
+        return res.status_code, None, res.headers
+
+
+async def apost_stream(
+    url: str,
+    *,
+    headers: dict[str, str],
+    json: Any,
+    timeout: httpx.Timeout,
+    on_line: Callable[[str], None],
+) -> tuple[int, str | None, httpx.Headers]:
+    pool = _get_async_pool(url)
+    pool.count_request()
+    async with pool.client.stream(
+        "POST", url, headers=headers, json=json, timeout=timeout, extensions={"trace": pool.trace}
+    ) as res:
+        if res.status_code != 200 or not _is_event_stream(res):
+            await res.aread()
+            return res.status_code, res.text, res.headers
+        async for line in res.aiter_lines():
+            on_line(line)
+        return res.status_code, None, res.headers
+
+
+async def warm(api_url: str, *, headers: dict[str, str], timeout: float = 10) -> bool:
+    """Open (TCP+TLS) one keep-alive connection to api_url ahead of the first real call."""
+    pool = _get_async_pool(api_url)
+    pool.count_request()
+    try:
+        await pool.client.get(
+            f"{api_url.rstrip('/')}/models",
+            headers=headers,
+            timeout=timeout,
+            extensions={"trace": pool.trace},
+        )
+    except httpx.HTTPError:
+        return False
+    return True
+
+
+def stats() -> list[dict[str, Any]]:
+    with _lock:
+        pools: list[_PoolBase] = [*_pools.values(), *_async_pools.values()]
+    return [p.stats() for p in pools]
+
+
+def close_all() -> None:
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        try:
+            p.close()
+        except Exception:
+            continue
+
+
+async def aclose_all() -> None:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        pools = [p for p in _async_pools.values() if p.loop is loop]
+        for p in pools:
+            _async_pools.pop(p.origin, None)
+    for p in pools:
+        try:
+            await p.aclose()
+        except Exception:
+            continue
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from . import observability, pipeline
+from .chapters import chapter_count
+from .config_loader import IncrementalConfig, LLMConfig
+from .content_processor import chapter_index
+from .llm_client import LLMClient, ProgressCallback
+from .mapped_text import NovelText
+from .merge import merge_outputs
+from .schemas import Character, MetaOutput, Relationship
+
+
+@dataclass(frozen=True)
+class Segment:
+    fingerprint: str
+    end: int
+
+
+@dataclass(frozen=True)
+class Baseline:
+    novel_id: str
+    delta_start: int
+    matched_segments: int
+    outputs: dict[str, dict[str, Any]]
+
+
+def segment_index(text: NovelText, segment_chars: int) -> list[Segment]:
+    """Fingerprint per chapter (or per fixed-size span when no headings are found), in text order."""
+    chapters = chapter_index(text)
+    if len(chapters) > 1:
+        spans = [(c.start, c.end) for c in chapters]
+    else:
+        step = max(1, int(segment_chars))
+        spans = [(i, min(len(text), i + step)) for i in range(0, len(text), step)]
+    return [
+        Segment(fingerprint=hashlib.sha256(text[start:end].encode("utf-8")).hexdigest()[:32], end=end)
+        for start, end in spans
+    ]
+
+
+def _matching_prefix(stored: list[str], current: list[Segment]) -> int:
+    n = 0
+    for fp, seg in zip(stored, current):
+        if fp != seg.fingerprint:
+            break
+        n += 1
+    return n
+
+
+class AnalysisStore:
+    """SQLite record of each analysed novel: segment fingerprints plus the latest output per section."""
+
+    def __init__(self, cfg: IncrementalConfig):
+        self._cfg = cfg
+        self._lock = threading.Lock()
+        path = Path(cfg.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            " novel_id TEXT PRIMARY KEY,"
+            " head TEXT NOT NULL,"
+            " segments TEXT NOT NULL,"
+            " outputs TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_head ON analyses(head)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_updated_at ON analyses(updated_at)")
+        self._conn.commit()
+        self.incremental_runs = 0
+        self.full_runs = 0
+
+    def find_baseline(self, novel_id: str, segments: list[Segment]) -> Baseline | None:
+        """The stored novel this text extends the furthest.
+
+        Every stored segment must reappear in order, except that the stored last chapter may have grown
+        (serials are often uploaded mid-chapter); that chapter is then analysed again as part of the delta.
+        """
+        if len(segments) < 2:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT novel_id, segments, outputs FROM analyses WHERE head = ? AND novel_id != ?",
+                (segments[0].fingerprint, novel_id),
+            ).fetchall()
+        best: Baseline | None = None
+        for other_id, raw_segments, raw_outputs in rows:
+            stored = json.loads(raw_segments)
+            matched = _matching_prefix(stored, segments)
+            if matched < max(1, len(stored) - 1) or matched >= len(segments):
+                continue
+            if best is not None and matched <= best.matched_segments:
+                continue
+            outputs = json.loads(raw_outputs)
+            if outputs:
+                best = Baseline(
+                    novel_id=other_id,
+                    delta_start=segments[matched - 1].end,
+                    matched_segments=matched,
+                    outputs=outputs,
+                )
+        return best
+
+    def record(self, novel_id: str, segments: list[Segment], section: str, output: dict[str, Any]) -> None:
+        now = time.time()
+        fingerprints = json.dumps([s.fingerprint for s in segments])
+        with self._lock:
+            row = self._conn.execute("SELECT outputs FROM analyses WHERE novel_id = ?", (novel_id,)).fetchone()
+            outputs = json.loads(row[0]) if row is not None else {}
+            outputs[section] = output
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (novel_id, head, segments, outputs, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (novel_id, segments[0].fingerprint if segments else "", fingerprints, json.dumps(outputs, ensure_ascii=False), now),
+            )
+            max_entries = int(self._cfg.max_entries)
+            if max_entries > 0:
+                self._conn.execute(
+                    "DELETE FROM analyses WHERE novel_id NOT IN"
+                    " (SELECT novel_id FROM analyses ORDER BY updated_at DESC LIMIT ?)",
+                    (max_entries,),
+                )
+            self._conn.commit()
+
+    def count_run(self, *, incremental: bool) -> None:
+        with self._lock:
+            if incremental:
+                self.incremental_runs += 1
+            else:
+                self.full_runs += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()
+            return {
+                "path": self._cfg.path,
+                "entries": int(entries),
+                "incremental_runs": self.incremental_runs,
+                "full_runs": self.full_runs,
+            }
+
+
+_instances_lock = threading.Lock()
+_instances: dict[str, AnalysisStore] = {}
+_segments_lock = threading.Lock()
+_segments: OrderedDict[tuple[str, int], list[Segment]] = OrderedDict()
+
+
+def get_store(cfg: IncrementalConfig) -> AnalysisStore | None:
+    if not cfg.enabled:
+        return None
+    with _instances_lock:
+        store = _instances.get(cfg.path)
+        if store is None:
+            store = AnalysisStore(cfg)
+            _instances[cfg.path] = store
+        return store
+
+
+def stats() -> list[dict[str, Any]]:
+    with _instances_lock:
+        stores = list(_instances.values())
+    return [s.stats() for s in stores]
+
+
+def _cached_segments(novel_id: str, text: NovelText, segment_chars: int) -> list[Segment]:
+    key = (novel_id, int(segment_chars))
+    with _segments_lock:
+        hit = _segments.get(key)
+        if hit is not None:
+            _segments.move_to_end(key)
+            return hit
+    segments = segment_index(text, segment_chars)
+    with _segments_lock:
+        _segments[key] = segments
+        while len(_segments) > 8:
+            _segments.popitem(last=False)
+    return segments
+
+
+def _meta_delta_content(previous: MetaOutput, delta: str) -> str:
+    # meta 只看新增章节，但摘要需要覆盖全书：把上次的摘要作为前情一并交给模型
+    return f"【前情摘要（已分析章节）】\n{previous.summary}\n\n【新增章节】\n{delta}"
+
+
+def _merge(section: str, previous: BaseModel, new: BaseModel, content: NovelText) -> BaseModel:
+    if isinstance(previous, MetaOutput) and isinstance(new, MetaOutput):
+        info = new.novel_info.model_copy(
+            update={
+                "world_setting": previous.novel_info.world_setting or new.novel_info.world_setting,
+                "world_tags": list(dict.fromkeys([*previous.novel_info.world_tags, *new.novel_info.world_tags])),
+                "chapter_count": chapter_count(chapter_index(content)) or new.novel_info.chapter_count,
+            }
+        )
+        return new.model_copy(update={"novel_info": info})
+    return merge_outputs(section, [previous, new])
+
+
+async def run_section(
+    client: LLMClient,
+    cfg: LLMConfig,
+    section: str,
+    content: NovelText,
+    *,
+    novel_id: str | None,
+    characters: list[Character] | None = None,
+    relationships: list[Relationship] | None = None,
+    bypass_cache: bool = False,
+    on_progress: ProgressCallback | None = None,
+) -> BaseModel:
+    """pipeline.run_section, but only over the appended chapters when novel_id extends an analysed novel.
+
+    The delta output is merged into the stored one (characters by name, relationships/scenes/thunderzones
+    by key; meta re-summarised from the previous summary plus the delta) and recorded for novel_id, so
+    the next instalment builds on this one. bypass_cache forces a full analysis.
+    """
+    store = get_store(cfg.incremental)
+    if store is None or not novel_id:
+        return await pipeline.run_section(
+            client,
+            cfg,
+            section,
+            content,
+            characters=characters,
+            relationships=relationships,
+            bypass_cache=bypass_cache,
+            on_progress=on_progress,
+        )
+
+    # 指纹计算要扫全文，SQLite 读写会阻塞：都放到线程里，不占用事件循环
+    segments = await asyncio.to_thread(_cached_segments, novel_id, content, cfg.incremental.segment_chars)
+    baseline = None if bypass_cache else await asyncio.to_thread(store.find_baseline, novel_id, segments)
+    stored = baseline.outputs.get(section) if baseline is not None else None
+    output_model = pipeline.SECTION_OUTPUTS[section]
+    previous = output_model.model_validate(stored) if stored is not None else None
+
+    if previous is None or baseline is None:
+        out = await pipeline.run_section(
+            client,
+            cfg,
+            section,
+            content,
+            characters=characters,
+            relationships=relationships,
+            bypass_cache=bypass_cache,
+            on_progress=on_progress,
+        )
+        store.count_run(incremental=False)
+    else:
+        delta = content[baseline.delta_start :]
+        if isinstance(previous, MetaOutput):
+            delta = _meta_delta_content(previous, delta)
+        new = await pipeline.run_section(
+            client,
+            cfg,
+            section,
+            delta,
+            characters=characters,
+            relationships=relationships,
+            bypass_cache=bypass_cache,
+            on_progress=on_progress,
+        )
+        out = _merge(section, previous, new, content)
+        store.count_run(incremental=True)
+        observability.incremental(
+            section=section,
+            base_novel_id=baseline.novel_id,
+            matched_segments=baseline.matched_segments,
+            delta_chars=len(content) - baseline.delta_start,
+            total_chars=len(content),
+        )
+
+    await asyncio.to_thread(store.record, novel_id, segments, section, pipeline.dump_output(section, out))
+    return out
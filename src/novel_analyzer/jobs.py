@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+from . import batch, observability
+from .config_loader import JobsConfig, LLMConfig
+from .llm_client import LLMClient
+from .mapped_text import MappedText, NovelText
+
+
+ACTIVE = ("queued", "running")
+STATUSES = (*ACTIVE, "ok", "partial", "error", "cancelled")
+_IDLE_POLL_SECONDS = 5.0
+
+
+class JobStore:
+    """SQLite job table. Section outputs are checkpointed as each one finishes, so a job interrupted by a
+    restart is re-queued and only runs the sections it has not finished yet.
+
+    The novel text of every queued/running job is kept as a UTF-8 file under cfg.dir (one per novel_id)
+    and served as a MappedText; it is removed once no active job refers to it.
+    """
+
+    def __init__(self, cfg: JobsConfig):
+        self._cfg = cfg
+        self._lock = threading.Lock()
+        # 保存小说文件 + 插入 queued 行 与 清理无主文件 互斥，避免刚写好的文件在行可见前被删掉
+        self._content_lock = threading.Lock()
+        path = Path(cfg.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " novel_id TEXT NOT NULL,"
+            " chars INTEGER NOT NULL,"
+            " sections TEXT NOT NULL,"
+            " bypass_cache INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " results TEXT NOT NULL,"
+            " errors TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._conn.commit()
+        self.recovered = 0
+
+    def content_path(self, novel_id: str) -> Path:
+        return Path(self._cfg.dir) / f"{novel_id}.txt"
+
+    def submit(
+        self,
+        content: NovelText,
+        *,
+        novel_id: str,
+        sections: tuple[str, ...] = batch.SECTIONS,
+        bypass_cache: bool = False,
+    ) -> dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._content_lock:
+            self._save_content(novel_id, content)
+            now = time.time()
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, novel_id, chars, sections, bypass_cache, status, results, errors,"
+                    " created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'queued', '{}', '{}', ?, ?)",
+                    (job_id, novel_id, len(content), json.dumps(list(sections)), int(bypass_cache), now, now),
+                )
+                self._conn.commit()
+        job = self.get(job_id)
+        assert job is not None
+        return job
+
+    def load_content(self, novel_id: str) -> NovelText:
+        return MappedText(self.content_path(novel_id), sha256=novel_id)
+
+    def requeue_running(self) -> int:
+        """Jobs left 'running' by a previous process go back to the queue; their checkpoints are kept."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'", (time.time(),)
+            )
+            self._conn.commit()
+            self.recovered += cur.rowcount
+        self._sweep_content()
+        return cur.rowcount
+
+    def claim(self) -> dict[str, Any] | None:
+        """Oldest queued job, atomically marked running."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', errors = '{}', started_at = COALESCE(started_at, ?),"
+                " updated_at = ? WHERE job_id = ?",
+                (now, now, row[0]),
+            )
+            self._conn.commit()
+        return self.get(row[0])
+
+    def checkpoint(self, job_id: str, section: str, output: dict[str, Any] | None, error: str | None) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT results, errors FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            results, errors = json.loads(row[0]), json.loads(row[1])
+            if output is not None:
+                results[section] = output
+                errors.pop(section, None)
+            if error is not None:
+                errors[section] = error
+            self._conn.execute(
+                "UPDATE jobs SET results = ?, errors = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(results, ensure_ascii=False), json.dumps(errors, ensure_ascii=False), time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def checkpoints(self, job_id: str) -> dict[str, Any]:
+        """Every finished section output of the job, including a core run only to feed dependent sections."""
+        with self._lock:
+            row = self._conn.execute("SELECT results FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else {}
+
+    def finish(self, job_id: str, status: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE job_id = ? AND status = 'running'",
+                (status, now, now, job_id),
+            )
+            self._prune()
+            self._conn.commit()
+        self._sweep_content()
+
+    def cancel(self, job_id: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, updated_at = ?"
+                " WHERE job_id = ? AND status IN ('queued', 'running')",
+                (now, now, job_id),
+            )
+            self._conn.commit()
+        self._sweep_content()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job(row, with_results=True) if row is not None else None
+
+    def list_jobs(self, *, status: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        where, args = ("WHERE status = ?", [status]) if status else ("", [])
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*args, max(1, int(limit)))
+            ).fetchall()
+        return [_job(row, with_results=False) for row in rows]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {"path": self._cfg.path, "recovered": self.recovered, **{s: int(counts.get(s, 0)) for s in STATUSES}}
+
+    def _save_content(self, novel_id: str, content: NovelText) -> None:
+        path = self.content_path(novel_id)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(content, MappedText):
+                    with open(content.path, "rb") as src:
+                        shutil.copyfileobj(src, f)
+                else:
+                    f.write(content.encode("utf-8"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _prune(self) -> None:
+        max_finished = int(self._cfg.max_finished)
+        if max_finished <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND job_id NOT IN"
+            " (SELECT job_id FROM jobs WHERE status NOT IN ('queued', 'running') ORDER BY updated_at DESC LIMIT ?)",
+            (max_finished,),
+        )
+
+    def _sweep_content(self) -> None:
+        """Delete novel files no queued/running job needs (a file still mapped elsewhere is retried next time)."""
+        root = Path(self._cfg.dir)
+        if not root.is_dir():
+            return
+        with self._content_lock:
+            with self._lock:
+                active = {
+                    r[0] for r in self._conn.execute("SELECT DISTINCT novel_id FROM jobs WHERE status IN ('queued', 'running')")
+                }
+            for path in root.glob("*.txt"):
+                if path.stem not in active:
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+
+
+_COLUMNS = "job_id, novel_id, chars, sections, bypass_cache, status, results, errors, created_at, started_at, finished_at"
+
+
+def _job(row: tuple, *, with_results: bool) -> dict[str, Any]:
+    job_id, novel_id, chars, sections, bypass_cache, status, results, errors, created, started, finished = row
+    sections = json.loads(sections)
+    results = json.loads(results)
+    job = {
+        "job_id": job_id,
+        "novel_id": novel_id,
+        "chars": chars,
+        "status": status,
+        "sections": sections,
+        # core 即使未被请求也会为依赖 section 运行并落盘，这里只报告请求的部分
+        "completed": [s for s in sections if s in results],
+        "bypass_cache": bool(bypass_cache),
+        "created_at": created,
+        "started_at": started,
+        "finished_at": finished,
+    }
+    if with_results:
+        job["results"] = {s: results[s] for s in sections if s in results}
+        job["errors"] = json.loads(errors)
+    return job
+
+
+class JobRunner:
+    """In-process worker pool: `workers` asyncio tasks claim queued jobs and run them with batch.analyze_novel.
+
+    Checkpointed sections are passed back in as `completed`, so a resumed job continues where it stopped.
+    Stopping the runner leaves in-flight jobs 'running' in the table; the next start() re-queues them.
+    """
+
+    def __init__(self, store: JobStore, cfg: LLMConfig, client_factory: Callable[[], LLMClient]):
+        self._store = store
+        self._cfg = cfg
+        self._client_factory = client_factory
+        self._wake = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        self._store.requeue_running()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, int(self._cfg.jobs.workers)))]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    async def cancel(self, job_id: str) -> dict[str, Any] | None:
+        job = await asyncio.to_thread(self._store.cancel, job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            # 先清再取：claim 与 wait 之间提交的任务会重新 set，不会漏掉
+            self._wake.clear()
+            job = await asyncio.to_thread(self._store.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=_IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        started = time.monotonic()
+        # SQLite 与正文文件的读写都放到线程里，不阻塞同一事件循环上的 HTTP 请求
+        completed = await asyncio.to_thread(self._store.checkpoints, job_id)
+        try:
+            content = await asyncio.to_thread(self._store.load_content, job["novel_id"])
+            client = self._client_factory()
+        except Exception as e:
+            await asyncio.to_thread(
+                self._store.checkpoint, job_id, "job", None, f"任务无法启动: {getattr(e, 'detail', None) or e}"
+            )
+            await asyncio.to_thread(self._store.finish, job_id, "error")
+            return
+
+        async def on_section(section: str, output: dict[str, Any] | None, error: str | None) -> None:
+            await asyncio.to_thread(self._store.checkpoint, job_id, section, output, error)
+
+        inner = asyncio.create_task(
+            batch.analyze_novel(
+                client,
+                self._cfg,
+                content,
+                novel_id=job["novel_id"],
+                sections=tuple(job["sections"]),
+                bypass_cache=job["bypass_cache"],
+                completed=completed,
+                on_section=on_section,
+            )
+        )
+        self._running[job_id] = inner
+        try:
+            await asyncio.wait([inner])
+        except asyncio.CancelledError:
+            # 进程退出：任务保持 running，下次 start() 重新排队并从检查点继续
+            inner.cancel()
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+        if inner.cancelled():
+            status = "cancelled"
+        elif inner.exception() is not None:
+            await asyncio.to_thread(self._store.checkpoint, job_id, "job", None, f"内部错误: {inner.exception()}")
+            status = "error"
+        else:
+            outputs, errors = inner.result()
+            status = "ok" if not errors else ("partial" if outputs else "error")
+        if status != "cancelled":
+            # 已被取消的任务 finish() 不会覆盖其状态
+            await asyncio.to_thread(self._store.finish, job_id, status)
+        observability.job(
+            job_id=job_id,
+            status=status,
+            resumed_sections=len(completed),
+            elapsed_seconds=time.monotonic() - started,
+        )
+
+
+_instances_lock = threading.Lock()
+_instances: dict[str, JobStore] = {}
+
+
+def get_store(cfg: JobsConfig) -> JobStore | None:
+    if not cfg.enabled:
+        return None
+    with _instances_lock:
+        store = _instances.get(cfg.path)
+        if store is None:
+            store = JobStore(cfg)
+            _instances[cfg.path] = store
+        return store
+
+
+def stats() -> list[dict[str, Any]]:
+    with _instances_lock:
+        stores = list(_instances.values())
+    return [s.stats() for s in stores]
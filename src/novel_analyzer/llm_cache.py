@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .config_loader import CacheConfig
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(
+    *,
+    api_url: str,
+    model: str,
+    section: str,
+    tool: dict[str, Any],
+    prompt: str,
+    temperature: float,
+) -> str:
+    tool_hash = _sha256(json.dumps(tool, ensure_ascii=False, sort_keys=True))
+    prompt_hash = _sha256(prompt)
+    return _sha256(json.dumps([api_url, model, section, tool_hash, prompt_hash, float(temperature)]))
+
+
+class LLMCache:
+    """SQLite-backed cache of validated section outputs with TTL + size eviction."""
+
+    def __init__(self, cfg: CacheConfig):
+        self._cfg = cfg
+        self._lock = threading.Lock()
+        path = Path(cfg.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " section TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._is_expired(row[1], now):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        try:
+            value = json.loads(row[0])
+        except Exception:
+            return None
+        return value if isinstance(value, dict) else None
+
+    def put(self, key: str, *, section: str, value: dict[str, Any]) -> None:
+        text = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, section, value, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, section, text, len(text.encode("utf-8")), now, now),
+            )
+            self.writes += 1
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self) -> int:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            return int(cur.rowcount or 0)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            return {
+                "path": self._cfg.path,
+                "entries": int(entries),
+                "size_bytes": int(size),
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        ttl = float(self._cfg.ttl_seconds)
+        return ttl > 0 and now - float(created_at) > ttl
+
+    def _evict(self, now: float) -> None:
+        ttl = float(self._cfg.ttl_seconds)
+        if ttl > 0:
+            cur = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - ttl,))
+            self.evictions += int(cur.rowcount or 0)
+
+        max_entries = int(self._cfg.max_entries)
+        max_bytes = int(self._cfg.max_mb) * 1024 * 1024
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if (max_entries <= 0 or entries <= max_entries) and (max_bytes <= 0 or size <= max_bytes):
+            return
+
+        # 按最近访问时间从旧到新淘汰，直到同时满足条数与体积上限
+        rows = self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC").fetchall()
+        doomed: list[str] = []
+        for key, item_size in rows:
+            if (max_entries <= 0 or entries <= max_entries) and (max_bytes <= 0 or size <= max_bytes):
+                break
+            doomed.append(key)
+            entries -= 1
+            size -= int(item_size)
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(k,) for k in doomed])
+        self.evictions += len(doomed)
+
+
+_instances_lock = threading.Lock()
+_instances: dict[str, LLMCache] = {}
+
+
+def get_cache(cfg: CacheConfig) -> LLMCache | None:
+    if not cfg.enabled:
+        return None
+    with _instances_lock:
+        cache = _instances.get(cfg.path)
+        if cache is None:
+            cache = LLMCache(cfg)
+            _instances[cfg.path] = cache
+        return cache
+
+
+def stats() -> list[dict[str, Any]]:
+    with _instances_lock:
+        caches = list(_instances.values())
+    return [c.stats() for c in caches]
@@ -1,17 +1,26 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 import time
 from dataclasses import dataclass
-from typing import Any, TypeVar
+from typing import Any, Callable, TypeVar
 
-import requests
 from pydantic import BaseModel, ValidationError
 
-from .config_loader import LLMConfig
+from .config_loader import LLMConfig, SectionConfig
+from . import capabilities
+from . import circuit_breaker
+from . import hedging
 from . import observability
+from . import http_pool
+from . import providers
+from . import llm_cache
 from . import llm_dumps
+from . import rate_limiter
+from . import single_flight
+from . import tokens
 from .prompts import extract_requirements_excerpt, render, truncate_text
 
 
@@ -31,6 +40,14 @@ class LLMClientError(Exception):
         self.raw_response = raw_response
 
 
+class CircuitOpenError(LLMClientError):
+    """Upstream breaker is open: the call was rejected without touching the network."""
+
+    def __init__(self, message: str, *, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 def _inline_refs(schema: Any) -> Any:
     if not isinstance(schema, dict):
         if isinstance(schema, list):
@@ -94,12 +111,24 @@ def _format_validation_errors(err: ValidationError, *, max_items: int = 20) -> l
     return out
 
 
-def _backoff_seconds(backoff: str, base: float, attempt_index: int, max_wait: float) -> float:
+def _backoff_seconds(
+    backoff: str,
+    base: float,
+    attempt_index: int,
+    max_wait: float,
+    *,
+    jitter: str = "none",
+    retry_after: float | None = None,
+) -> float:
     if backoff == "linear":
         wait = base * (attempt_index + 1)
     else:
         wait = base * (2 ** attempt_index)
-    return min(max_wait, max(0.0, float(wait)))
+    wait = rate_limiter.jittered(min(max_wait, max(0.0, float(wait))), jitter=jitter)
+    if retry_after is not None:
+        # 服务端给出的等待时间是下限，不受 max_wait 限制
+        wait = max(wait, float(retry_after))
+    return wait
 
 
 def _strip_code_fences(text: str) -> str:
@@ -335,25 +364,413 @@ def _normalize_scenes_args(args: dict[str, Any]) -> dict[str, Any]:
     return out
 
 
+ProgressCallback = Callable[[dict[str, Any]], None]
+
+# "stream" 作为被拒参数出现的说法；\b 排除 upstream 等词，要求拒绝措辞紧挨着参数名
+_STREAM_REJECTED_RE = re.compile(
+    r"(?:unsupported|unknown|unrecognized|unexpected|invalid|not (?:supported|allowed|permitted))(?:[ :]+\w+){0,2}?[ :]+['\"`]?stream\b"
+    r"|\bstream(?:ing)?['\"`]?(?: \w+){0,2}? (?:is |are )?(?:unsupported|not (?:supported|allowed|permitted)|invalid)\b",
+    re.IGNORECASE,
+)
+
+
+def _rejects_stream(body: str) -> bool:
+    """Whether an error body rejects the `stream` parameter itself (not merely mentions the word)."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        err = data.get("error")
+        if isinstance(err, dict) and err.get("param") == "stream":
+            return True
+        # FastAPI/pydantic 风格：detail[].loc 以 stream 结尾
+        detail = data.get("detail")
+        if isinstance(detail, list) and any(
+            isinstance(d, dict) and isinstance(d.get("loc"), list) and d["loc"][-1:] == ["stream"] for d in detail
+        ):
+            return True
+        messages = [err.get("message") if isinstance(err, dict) else err, data.get("message")]
+        return any(isinstance(m, str) and _STREAM_REJECTED_RE.search(m) for m in messages)
+    return bool(_STREAM_REJECTED_RE.search(body))
+
+
+class _StreamedResponse:
+    """Response-like view over a consumed SSE stream (or a plain body), matching what the retry loop reads."""
+
+    def __init__(self, status_code: int, text: str, json_obj: Any | None = None, headers: Any | None = None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self._json_obj = json_obj
+
+    def json(self) -> Any:
+        if self._json_obj is not None:
+            return self._json_obj
+        return json.loads(self.text)
+
+
+class _StreamAccumulator:
+    """Assemble chat.completion.chunk deltas (tool_calls / function_call / content) into one message."""
+
+    def __init__(self, *, section: str, on_progress: ProgressCallback | None, interval: float):
+        self._section = section
+        self._on_progress = on_progress
+        self._interval = max(0.0, float(interval))
+        self._last_report = 0.0
+        self.bytes_received = 0
+        self.chunks = 0
+        self.usage: dict[str, Any] | None = None
+        self.tool_calls: dict[int, dict[str, str]] = {}
+        self.function_call: dict[str, str] | None = None
+        self.content_parts: list[str] = []
+
+    def feed(self, line: str) -> None:
+        self.bytes_received += len(line.encode("utf-8")) + 1
+        if not line.startswith("data:"):
+            return
+        data = line[len("data:") :].strip()
+        if not data or data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except Exception:
+            return
+        if not isinstance(chunk, dict):
+            return
+
+        if isinstance(chunk.get("usage"), dict):
+            self.usage = chunk["usage"]
+
+        for choice in chunk.get("choices") or []:
+            delta = (choice or {}).get("delta") or {}
+            for tc in delta.get("tool_calls") or []:
+                idx = tc.get("index", 0) if isinstance(tc.get("index"), int) else 0
+                entry = self.tool_calls.setdefault(idx, {"name": "", "arguments": ""})
+                fn = tc.get("function") or {}
+                if isinstance(fn.get("name"), str) and not entry["name"]:
+                    entry["name"] = fn["name"]
+                if isinstance(fn.get("arguments"), str):
+                    entry["arguments"] += fn["arguments"]
+
+            fc = delta.get("function_call")
+            if isinstance(fc, dict):
+                if self.function_call is None:
+                    self.function_call = {"name": "", "arguments": ""}
+                if isinstance(fc.get("name"), str) and not self.function_call["name"]:
+                    self.function_call["name"] = fc["name"]
+                if isinstance(fc.get("arguments"), str):
+                    self.function_call["arguments"] += fc["arguments"]
+
+            if isinstance(delta.get("content"), str):
+                self.content_parts.append(delta["content"])
+
+        self.chunks += 1
+        self._report(final=False)
+
+    def tokens_received(self) -> int:
+        if self.usage and isinstance(self.usage.get("completion_tokens"), int):
+            return int(self.usage["completion_tokens"])
+        # 多数实现每个 chunk 携带约 1 个 token，作为无 usage 时的近似
+        return self.chunks
+
+    def _report(self, *, final: bool) -> None:
+        if self._on_progress is None:
+            return
+        now = time.monotonic()
+        if not final and now - self._last_report < self._interval:
+            return
+        self._last_report = now
+        try:
+            self._on_progress(
+                {
+                    "section": self._section,
+                    "bytes": self.bytes_received,
+                    "tokens": self.tokens_received(),
+                    "done": final,
+                }
+            )
+        except Exception:
+            return
+
+    def finish(self) -> dict[str, Any]:
+        self._report(final=True)
+        message: dict[str, Any] = {"role": "assistant"}
+        if self.tool_calls:
+            message["tool_calls"] = [
+                {"type": "function", "function": dict(self.tool_calls[idx])} for idx in sorted(self.tool_calls)
+            ]
+        if self.function_call is not None:
+            message["function_call"] = dict(self.function_call)
+        if self.content_parts:
+            message["content"] = "".join(self.content_parts)
+        out: dict[str, Any] = {"choices": [{"message": message}]}
+        if self.usage is not None:
+            out["usage"] = self.usage
+        return out
+
+
+class _SyncIO:
+    """Blocking I/O: used by call_section, which drives the shared coroutine in a private event loop."""
+
+    async def post(self, url: str, *, headers: dict[str, str], json: Any, timeout: float) -> Any:
+        return http_pool.post(url, headers=headers, json=json, timeout=timeout)
+
+    async def post_stream(self, url: str, *, headers: dict[str, str], json: Any, timeout: Any, on_line: Any) -> Any:
+        return http_pool.post_stream(url, headers=headers, json=json, timeout=timeout, on_line=on_line)
+
+    async def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    async def write_dump(self, **kwargs: Any) -> None:
+        llm_dumps.write_dump(**kwargs)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return fn(*args, **kwargs)
+
+
+class _AsyncIO:
+    """Non-blocking I/O: used by acall_section inside the server event loop."""
+
+    async def post(self, url: str, *, headers: dict[str, str], json: Any, timeout: float) -> Any:
+        return await http_pool.apost(url, headers=headers, json=json, timeout=timeout)
+
+    async def post_stream(self, url: str, *, headers: dict[str, str], json: Any, timeout: Any, on_line: Any) -> Any:
+        return await http_pool.apost_stream(url, headers=headers, json=json, timeout=timeout, on_line=on_line)
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    async def write_dump(self, **kwargs: Any) -> None:
+        if not llm_dumps.enabled():
+            return
+        await asyncio.to_thread(llm_dumps.write_dump, **kwargs)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+_SYNC_IO = _SyncIO()
+_ASYNC_IO = _AsyncIO()
+
+
 class LLMClient:
-    def __init__(self, runtime: LLMRuntime, cfg: LLMConfig):
-        self._runtime = runtime
+    """Section calls over one runtime or a providers.ProviderPool (least-outstanding choice + failover).
+
+    A bare LLMRuntime becomes a one-provider pool that uses defaults.rate_limit, so its limiter,
+    breaker and capability keys stay "api_url|model".
+    """
+
+    def __init__(self, runtime: LLMRuntime | providers.ProviderPool, cfg: LLMConfig):
+        if isinstance(runtime, LLMRuntime):
+            runtime = providers.ProviderPool(
+                [providers.Provider(name="primary", api_url=runtime.api_url, api_key=runtime.api_key, model=runtime.model)]
+            )
+        self._pool = runtime
+        primary = runtime.primary
+        # model 属性按主 provider 报告；缓存键按每次实际返回结果的 provider 计
+        self._runtime = LLMRuntime(api_url=primary.api_url, api_key=primary.api_key, model=primary.model)
         self._cfg = cfg
+        http_pool.configure(cfg.defaults.http)
+
+    @property
+    def model(self) -> str:
+        return self._runtime.model
+
+    def model_for(self, section: str) -> str:
+        """Model a section is first sent to after routing (sizes its token budget)."""
+        sec = self._cfg.sections.get(section)
+        return self._pool_for(sec).primary.model if sec is not None else self.model
+
+    def _pool_for(self, sec: SectionConfig) -> providers.ProviderPool:
+        """Providers a section may use: its route chain in order, else the whole pool (with sec.model if set)."""
+        if not sec.route and not sec.model:
+            return self._pool
+        return self._pool.route(sec.route, model=sec.model)
+
+    def call_section(
+        self,
+        *,
+        section: str,
+        prompt: str,
+        output_model: type[T],
+        bypass_cache: bool = False,
+        on_progress: ProgressCallback | None = None,
+    ) -> T:
+        """Blocking variant; must not be called from a running event loop (use acall_section there)."""
+        return asyncio.run(
+            self._call_section(
+                _SYNC_IO,
+                section=section,
+                prompt=prompt,
+                output_model=output_model,
+                bypass_cache=bypass_cache,
+                on_progress=on_progress,
+            )
+        )
 
-    def call_section(self, *, section: str, prompt: str, output_model: type[T]) -> T:
+    async def acall_section(
+        self,
+        *,
+        section: str,
+        prompt: str,
+        output_model: type[T],
+        bypass_cache: bool = False,
+        on_progress: ProgressCallback | None = None,
+    ) -> T:
+        """on_progress receives {section, bytes, tokens, done} while a streamed response is arriving."""
+        return await self._call_section(
+            _ASYNC_IO,
+            section=section,
+            prompt=prompt,
+            output_model=output_model,
+            bypass_cache=bypass_cache,
+            on_progress=on_progress,
+        )
+
+    async def _call_section(
+        self,
+        io: _SyncIO | _AsyncIO,
+        *,
+        section: str,
+        prompt: str,
+        output_model: type[T],
+        bypass_cache: bool,
+        on_progress: ProgressCallback | None,
+    ) -> T:
         if section not in self._cfg.sections:
             raise LLMClientError(f"未知 section: {section}")
 
         sec = self._cfg.sections[section]
         tool = self._build_tool(section=section, output_model=output_model)
 
-        args, raw = self._call_tool_with_retry(
+        def cache_key(provider: providers.Provider) -> str:
+            return llm_cache.make_key(
+                api_url=provider.api_url,
+                model=provider.model,
+                section=section,
+                tool=tool,
+                prompt=prompt,
+                temperature=sec.temperature,
+            )
+
+        routed = self._pool_for(sec)
+        key = cache_key(routed.primary)
+        cache = llm_cache.get_cache(self._cfg.cache)
+        if cache is not None and not bypass_cache:
+            cached = await io.run(cache.get, key)
+            if cached is not None:
+                validated, _ = self._validate_args(output_model, cached)
+                if validated is not None:
+                    observability.cache(section=section, hit=True)
+                    return validated
+            observability.cache(section=section, hit=False)
+
+        async def call() -> T:
+            out, served = await self._call_section_hedged(
+                io,
+                section=section,
+                prompt=prompt,
+                output_model=output_model,
+                tool=tool,
+                on_progress=on_progress,
+            )
+            if cache is not None:
+                # 按实际返回结果的 provider/model 写入：故障转移的结果不能顶替主 provider 的缓存
+                value = out.model_dump(mode="json", by_alias=True)
+                await io.run(cache.put, cache_key(served), section=section, value=value)
+            return out
+
+        if not self._cfg.defaults.single_flight.enabled:
+            return await call()
+        # 相同请求在途时合并为一次上游调用；跟随者不上报流式进度（进度只属于发起者）
+        # 合并键覆盖路由内所有可能返回结果的 provider/model：候选链不同的请求不能共享一次结果
+        flight_key = "|".join(cache_key(provider) for provider in routed.providers)
+        return await single_flight.get_single_flight().do(flight_key, section, call)
+
+    async def _call_section_hedged(
+        self,
+        io: _SyncIO | _AsyncIO,
+        *,
+        section: str,
+        prompt: str,
+        output_model: type[T],
+        tool: dict[str, Any],
+        on_progress: ProgressCallback | None,
+    ) -> tuple[T, providers.Provider]:
+        """Race a duplicate call against a straggling primary (async path only; the blocking path cannot overlap)."""
+        hedger = hedging.get_hedger(section, self._cfg.defaults.hedging) if io is _ASYNC_IO else None
+
+        async def attempt(progress: ProgressCallback | None) -> tuple[tuple[T, providers.Provider], float]:
+            started = time.monotonic()
+            out = await self._call_section_uncached(
+                io,
+                section=section,
+                prompt=prompt,
+                output_model=output_model,
+                tool=tool,
+                on_progress=progress,
+            )
+            return out, time.monotonic() - started
+
+        if hedger is None:
+            out, _ = await attempt(on_progress)
+            return out
+
+        delay = hedger.delay()
+        primary = asyncio.ensure_future(attempt(on_progress))
+        tasks = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and hedger.try_hedge():
+                    observability.hedge(section=section, delay_seconds=delay)
+                    # 对冲请求不上报进度，避免前端看到两份交错的接收字节数
+                    tasks.add(asyncio.ensure_future(attempt(None)))
+
+            first_error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    err = task.exception()
+                    if err is not None:
+                        first_error = first_error or err
+                        continue
+                    out, elapsed = task.result()
+                    hedger.observe(elapsed)
+                    if len(tasks) > 1:
+                        hedger.record_winner(hedge=task is not primary)
+                    return out
+            raise first_error if first_error is not None else LLMClientError(f"{section} 调用失败")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _call_section_uncached(
+        self,
+        io: _SyncIO | _AsyncIO,
+        *,
+        section: str,
+        prompt: str,
+        output_model: type[T],
+        tool: dict[str, Any],
+        on_progress: ProgressCallback | None,
+    ) -> tuple[T, providers.Provider]:
+        """Validated output plus the provider whose response produced it."""
+        sec = self._cfg.sections[section]
+
+        args, raw, served = await self._call_tool_with_retry(
+            io,
             section=section,
             prompt=prompt,
             tool=tool,
             tool_name=sec.tool_name,
             temperature=sec.temperature,
             stage="primary",
+            on_progress=on_progress,
         )
 
         if args is None:
@@ -364,7 +781,7 @@ class LLMClient:
             validated, errors = self._validate_args(output_model, args)
 
         if validated is not None:
-            return validated
+            return validated, served
 
         if not self._cfg.repair.enabled or self._cfg.repair.max_attempts <= 0:
             raise LLMClientError(f"{section} schema 校验失败", raw_response=raw)
@@ -382,13 +799,15 @@ class LLMClient:
                 bad_output=bad_output,
                 validation_errors=errors,
             )
-            repair_args, repair_raw = self._call_tool_with_retry(
+            repair_args, repair_raw, served = await self._call_tool_with_retry(
+                io,
                 section=section,
                 prompt=repair_prompt,
                 tool=tool,
                 tool_name=sec.tool_name,
                 temperature=self._cfg.repair_template.temperature,
                 stage="repair",
+                on_progress=on_progress,
             )
 
             if repair_args is None:
@@ -407,7 +826,7 @@ class LLMClient:
         observability.repair(section=section, success=repair_ok, reason="schema", errors=repair_errors)
 
         if validated is not None:
-            return validated
+            return validated, served
 
         raise LLMClientError(f"{section} Repair 失败（schema 校验仍不通过）", raw_response=raw)
 
@@ -473,8 +892,9 @@ class LLMClient:
             validation_errors=errors_text,
         )
 
-    def _call_tool_with_retry(
+    async def _call_tool_with_retry(
         self,
+        io: _SyncIO | _AsyncIO,
         *,
         section: str,
         prompt: str,
@@ -482,180 +902,355 @@ class LLMClient:
         tool_name: str,
         temperature: float,
         stage: str,
-    ) -> tuple[dict[str, Any] | None, str]:
+        on_progress: ProgressCallback | None = None,
+    ) -> tuple[dict[str, Any] | None, str, providers.Provider]:
         timeout = int(self._cfg.defaults.timeout_seconds)
         retry = self._cfg.defaults.retry
+        retryable_codes = set(retry.retryable_status_codes)
+        registry = capabilities.get_registry(self._cfg.capabilities)
+        streaming = self._cfg.defaults.streaming
+        token_cfg = self._cfg.content_processing.token_budget
+        estimated_tokens = tokens.estimate_tokens(prompt, token_cfg) + tokens.estimate_tokens(
+            json.dumps(tool, ensure_ascii=False), token_cfg
+        )
 
-        url = f"{self._runtime.api_url}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self._runtime.api_key}",
-            "Content-Type": "application/json",
-        }
+        # 以下按每次尝试选中的 provider 重新赋值；do_request/send 在调用时读取
+        api_url = model = url = upstream = ""
+        headers: dict[str, str] = {}
+        limiter: rate_limiter.RateLimiter | None = None
+        breaker: circuit_breaker.CircuitBreaker | None = None
+        budget: circuit_breaker.RetryBudget | None = None
+        pool = self._pool_for(self._cfg.sections[section])
+        failed: set[str] = set()
+        open_circuits: dict[str, float] = {}
+        counted: set[str] = set()
+
+        async def pick() -> providers.Provider:
+            """Least-loaded provider whose breaker lets a request through; failed ones only as a last resort."""
+            while True:
+                if len(open_circuits) >= len(pool.providers):
+                    open_for = min(open_circuits.values())
+                    raise CircuitOpenError(
+                        f"{section} 上游服务暂不可用（熔断中，约 {int(open_for) + 1} 秒后重试）",
+                        retry_after=open_for,
+                    )
+                candidate = await pool.acquire(io.sleep, avoid=failed, exclude=set(open_circuits))
+                candidate_breaker = circuit_breaker.get_breaker(candidate.key, self._cfg.defaults.circuit_breaker)
+                open_for = candidate_breaker.allow() if candidate_breaker is not None else None
+                if open_for is None:
+                    return candidate
+                pool.release(candidate, outcome=providers.SKIPPED)
+                open_circuits[candidate.name] = open_for
+
+        def may_retry(reason: str) -> bool:
+            if budget is None or budget.try_spend():
+                return True
+            observability.retry_budget_exhausted(section=section, upstream=upstream, reason=reason)
+            return False
+
+        async def do_request(payload: dict[str, Any]) -> Any:
+            if limiter is not None:
+                wait = limiter.reserve(estimated_tokens)
+                if wait > 0:
+                    observability.rate_limited(section=section, wait_seconds=wait)
+                    await io.sleep(wait)
+            try:
+                res = await send(payload)
+            except (http_pool.Timeout, http_pool.RequestError):
+                if breaker is not None:
+                    breaker.record(False)
+                raise
+            if breaker is not None:
+                breaker.record(res.status_code < 500)
+            if res.status_code == 200:
+                try:
+                    usage = (res.json() or {}).get("usage") or {}
+                except Exception:
+                    usage = {}
+                if not isinstance(usage, dict):
+                    usage = {}
+                total = usage.get("total_tokens")
+                if limiter is not None:
+                    limiter.settle(estimated_tokens, total if isinstance(total, int) else None)
+                reported = usage.get("prompt_tokens")
+                if isinstance(reported, int):
+                    observability.token_usage(section=section, estimated=estimated_tokens, reported=reported)
+            return res
+
+        async def send(payload: dict[str, Any]) -> Any:
+            if not streaming.enabled or registry.get(api_url, model, capabilities.STREAM) is False:
+                return await io.post(url, headers=headers, json=payload, timeout=timeout)
 
-        payload_tools = {
-            "model": self._runtime.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": float(temperature),
-            "stream": False,
-            "tools": [tool],
-            "tool_choice": {"type": "function", "function": {"name": tool_name}},
-        }
+            acc = _StreamAccumulator(
+                section=section,
+                on_progress=on_progress,
+                interval=streaming.progress_interval_seconds,
+            )
+            status_code, body, res_headers = await io.post_stream(
+                url,
+                headers=headers,
+                json={**payload, "stream": True},
+                timeout=http_pool.stream_timeout(
+                    connect_seconds=streaming.connect_timeout_seconds,
+                    idle_seconds=streaming.idle_timeout_seconds,
+                ),
+                on_line=acc.feed,
+            )
+            if body is None:
+                data = acc.finish()
+                return _StreamedResponse(status_code, json.dumps(data, ensure_ascii=False), data, res_headers)
 
-        def do_request(payload: dict[str, Any]) -> requests.Response:
-            return requests.post(url, headers=headers, json=payload, timeout=timeout)
+            if status_code in {400, 422} and _rejects_stream(body):
+                observability.stream_fallback(section=section, reason=f"server rejects stream=true (status {status_code})")
+                res = await io.post(url, headers=headers, json=payload, timeout=timeout)
+                if res.status_code == 200 and registry.get(api_url, model, capabilities.STREAM) is not False:
+                    # 只有非流式重发成功才记住：确认是 stream 参数本身被拒，而不是请求的其他问题
+                    await io.run(registry.set, api_url, model, capabilities.STREAM, False)
+                return res
+            return _StreamedResponse(status_code, body, headers=res_headers)
 
         last_raw = ""
         last_err = ""
+        retry_wait = 0.0
         for attempt in range(int(retry.count)):
             attempt_index = attempt + 1
+            if retry_wait > 0:
+                # 退避在释放 provider 之后进行，不占用其并发名额
+                await io.sleep(retry_wait)
+                retry_wait = 0.0
+            provider = await pick()
+            api_url, model = provider.api_url, provider.model
+            url = f"{api_url}/chat/completions"
+            headers = {
+                "Authorization": f"Bearer {provider.api_key}",
+                "Content-Type": "application/json",
+            }
+            payload_tools = {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": float(temperature),
+                "stream": False,
+                "tools": [tool],
+                "tool_choice": {"type": "function", "function": {"name": tool_name}},
+            }
+            legacy_payload = {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": float(temperature),
+                "stream": False,
+                "functions": [tool.get("function") or {}],
+                "function_call": {"name": tool_name},
+            }
+            # 已知只支持 legacy 协议的 provider 直接发 functions/function_call，省掉一次必然 400 的整段 prompt 往返
+            first_protocol = "legacy" if registry.get(api_url, model, capabilities.PROTOCOL) == "legacy" else "tools"
+            first_payload = legacy_payload if first_protocol == "legacy" else payload_tools
+
+            upstream = provider.key
+            limiter = rate_limiter.get_limiter(upstream, provider.rate_limit or self._cfg.defaults.rate_limit)
+            breaker = circuit_breaker.get_breaker(upstream, self._cfg.defaults.circuit_breaker)
+            budget = circuit_breaker.get_budget(upstream, retry)
+            if budget is not None and provider.name not in counted:
+                counted.add(provider.name)
+                budget.record_request()
+
+            started = time.monotonic()
+            # 超时/连接错误/5xx 记为失败，429 记为限流；其余状态码说明上游可用
+            outcome, cooldown = providers.ERROR, 0.0
             try:
-                res = do_request(payload_tools)
-            except requests.exceptions.Timeout:
-                last_err = "timeout"
-                wait = _backoff_seconds(retry.backoff, retry.base_wait_seconds, attempt, retry.max_wait_seconds)
-                llm_dumps.write_dump(
-                    section=section,
-                    stage=stage,
-                    attempt=attempt_index,
-                    protocol="tools",
-                    model=self._runtime.model,
-                    tool_name=tool_name,
-                    temperature=float(temperature),
-                    prompt=prompt,
-                    request_payload=payload_tools,
-                    response_status_code=None,
-                    response_text=None,
-                    response_json=None,
-                    extracted_args=None,
-                    note="timeout",
-                )
-                if attempt < int(retry.count) - 1:
-                    observability.retry(
-                        section=section,
-                        attempt=attempt + 1,
-                        max_attempts=int(retry.count),
-                        reason=last_err,
-                        wait_seconds=wait,
-                    )
-                    time.sleep(wait)
-                    continue
-                raise LLMClientError(f"{section} 调用超时")
-            except requests.RequestException as e:
-                raise LLMClientError(f"{section} 请求失败: {e}")
-
-            response_text = res.text or ""
-            last_raw = response_text[:3000]
-
-            response_json: Any | None
-            try:
-                response_json = res.json()
-            except Exception:
-                response_json = None
-            protocol = "tools"
-            request_payload: dict[str, Any] | None = payload_tools
-            protocol_fallback = False
-
-            if res.status_code == 400:
-                err_text = response_text
-                if "tools" in err_text or "tool_choice" in err_text:
-                    observability.function_calling_protocol_fallback(
-                        section=section,
-                        reason="server rejects tools/tool_choice, trying legacy functions/function_call",
+                try:
+                    res = await do_request(first_payload)
+                except http_pool.Timeout:
+                    last_err = "timeout"
+                    failed.add(provider.name)
+                    # 还有别的 provider 可换时立即切换，不做退避
+                    wait = 0.0 if pool.has_alternative(failed) else _backoff_seconds(
+                        retry.backoff,
+                        retry.base_wait_seconds,
+                        attempt,
+                        retry.max_wait_seconds,
+                        jitter=retry.jitter,
                     )
-                    llm_dumps.write_dump(
+                    await io.write_dump(
                         section=section,
                         stage=stage,
                         attempt=attempt_index,
-                        protocol="tools",
-                        model=self._runtime.model,
+                        protocol=first_protocol,
+                        model=model,
                         tool_name=tool_name,
                         temperature=float(temperature),
                         prompt=prompt,
-                        request_payload=payload_tools,
-                        response_status_code=int(res.status_code),
-                        response_text=response_text,
-                        response_json=response_json,
+                        request_payload=first_payload,
+                        response_status_code=None,
+                        response_text=None,
+                        response_json=None,
                         extracted_args=None,
-                        note="protocol fallback trigger",
+                        note="timeout",
                     )
-                    protocol_fallback = True
-                    legacy_payload = {
-                        "model": self._runtime.model,
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": float(temperature),
-                        "stream": False,
-                        "functions": [tool.get("function") or {}],
-                        "function_call": {"name": tool_name},
-                    }
-                    res = do_request(legacy_payload)
-                    protocol = "legacy"
-                    request_payload = legacy_payload
-
-                    response_text = res.text or ""
-                    last_raw = response_text[:3000]
-
-                    try:
-                        response_json = res.json()
-                    except Exception:
-                        response_json = None
-
-            extracted_args: dict[str, Any] | None = None
-            notes: list[str] = []
-            if protocol_fallback:
-                notes.append("protocol fallback")
-            if res.status_code != 200:
-                notes.append(f"status {res.status_code}")
-            if response_json is None:
-                notes.append("json parse failed")
-
-            if res.status_code == 200 and isinstance(response_json, dict):
-                extracted_args = self._extract_tool_arguments(response_json, tool_name=tool_name, section=section)
-                if extracted_args is None:
-                    notes.append("tool arguments missing/unparsable")
-
-            llm_dumps.write_dump(
-                section=section,
-                stage=stage,
-                attempt=attempt_index,
-                protocol=protocol,
-                model=self._runtime.model,
-                tool_name=tool_name,
-                temperature=float(temperature),
-                prompt=prompt,
-                request_payload=request_payload,
-                response_status_code=int(res.status_code),
-                response_text=response_text,
-                response_json=response_json,
-                extracted_args=extracted_args,
-                note="; ".join(notes),
-            )
+                    if attempt < int(retry.count) - 1 and may_retry(last_err):
+                        observability.retry(
+                            section=section,
+                            attempt=attempt + 1,
+                            max_attempts=int(retry.count),
+                            reason=last_err,
+                            wait_seconds=wait,
+                        )
+                        retry_wait = wait
+                        continue
+                    raise LLMClientError(f"{section} 调用超时")
+                except http_pool.RequestError as e:
+                    last_err = "request_error"
+                    failed.add(provider.name)
+                    if pool.has_alternative(failed) and attempt < int(retry.count) - 1 and may_retry(last_err):
+                        observability.retry(
+                            section=section,
+                            attempt=attempt + 1,
+                            max_attempts=int(retry.count),
+                            reason=last_err,
+                            wait_seconds=0.0,
+                        )
+                        continue
+                    raise LLMClientError(f"{section} 请求失败: {e}")
+
+                response_text = res.text or ""
+                last_raw = response_text[:3000]
+
+                response_json: Any | None
+                try:
+                    response_json = res.json()
+                except Exception:
+                    response_json = None
+                protocol = first_protocol
+                request_payload: dict[str, Any] | None = first_payload
+                protocol_fallback = False
+
+                if res.status_code == 400 and protocol == "legacy":
+                    # 记忆的 legacy 协议不再被接受：清除记录，下次调用重新从 tools 开始探测
+                    registry.forget(api_url, model, capabilities.PROTOCOL)
+                elif res.status_code == 400:
+                    err_text = response_text
+                    if "tools" in err_text or "tool_choice" in err_text:
+                        observability.function_calling_protocol_fallback(
+                            section=section,
+                            reason="server rejects tools/tool_choice, trying legacy functions/function_call",
+                        )
+                        await io.write_dump(
+                            section=section,
+                            stage=stage,
+                            attempt=attempt_index,
+                            protocol="tools",
+                            model=model,
+                            tool_name=tool_name,
+                            temperature=float(temperature),
+                            prompt=prompt,
+                            request_payload=payload_tools,
+                            response_status_code=int(res.status_code),
+                            response_text=response_text,
+                            response_json=response_json,
+                            extracted_args=None,
+                            note="protocol fallback trigger",
+                        )
+                        protocol_fallback = True
+                        res = await do_request(legacy_payload)
+                        protocol = "legacy"
+                        request_payload = legacy_payload
+
+                        response_text = res.text or ""
+                        last_raw = response_text[:3000]
+
+                        try:
+                            response_json = res.json()
+                        except Exception:
+                            response_json = None
+
+                if res.status_code == 200 and registry.get(api_url, model, capabilities.PROTOCOL) != protocol:
+                    # 仅在取值变化时落盘，且放到线程里执行，不阻塞事件循环
+                    await io.run(registry.set, api_url, model, capabilities.PROTOCOL, protocol)
+
+                extracted_args: dict[str, Any] | None = None
+                notes: list[str] = []
+                if protocol_fallback:
+                    notes.append("protocol fallback")
+                if res.status_code != 200:
+                    notes.append(f"status {res.status_code}")
+                if response_json is None:
+                    notes.append("json parse failed")
+
+                if res.status_code == 200 and isinstance(response_json, dict):
+                    extracted_args = self._extract_tool_arguments(response_json, tool_name=tool_name, section=section)
+                    if extracted_args is None:
+                        notes.append("tool arguments missing/unparsable")
+
+                await io.write_dump(
+                    section=section,
+                    stage=stage,
+                    attempt=attempt_index,
+                    protocol=protocol,
+                    model=model,
+                    tool_name=tool_name,
+                    temperature=float(temperature),
+                    prompt=prompt,
+                    request_payload=request_payload,
+                    response_status_code=int(res.status_code),
+                    response_text=response_text,
+                    response_json=response_json,
+                    extracted_args=extracted_args,
+                    note="; ".join(notes),
+                )
 
-            if res.status_code in set(retry.retryable_status_codes):
-                last_err = f"http_{res.status_code}"
-                wait = _backoff_seconds(retry.backoff, retry.base_wait_seconds, attempt, retry.max_wait_seconds)
-                if attempt < int(retry.count) - 1:
-                    observability.retry(
-                        section=section,
-                        attempt=attempt + 1,
-                        max_attempts=int(retry.count),
-                        reason=last_err,
-                        wait_seconds=wait,
+                if res.status_code not in retryable_codes:
+                    outcome = providers.OK if res.status_code < 500 else providers.ERROR
+                else:
+                    last_err = f"http_{res.status_code}"
+                    retry_after = rate_limiter.retry_after_seconds(getattr(res, "headers", None))
+                    if retry_after is not None:
+                        retry_after = min(retry_after, float(timeout))
+                        if limiter is not None:
+                            limiter.pause(retry_after)
+                    wait = _backoff_seconds(
+                        retry.backoff,
+                        retry.base_wait_seconds,
+                        attempt,
+                        retry.max_wait_seconds,
+                        jitter=retry.jitter,
+                        retry_after=retry_after,
                     )
-                    time.sleep(wait)
-                    continue
-
-            if res.status_code != 200:
-                raise LLMClientError(f"{section} API错误: {res.status_code}", raw_response=last_raw)
-
-            if not isinstance(response_json, dict):
-                raise LLMClientError(f"{section} 返回非JSON", raw_response=last_raw)
-
-            args = extracted_args
-            if args is None:
-                observability.missing_tool_call(section=section, reason="no tool_calls/function_call or unparsable arguments")
-                return None, last_raw
-
-            return args, last_raw
+                    if res.status_code == 429:
+                        outcome, cooldown = providers.THROTTLED, wait
+                    failed.add(provider.name)
+                    if pool.has_alternative(failed):
+                        wait = 0.0
+                    if attempt < int(retry.count) - 1 and may_retry(last_err):
+                        observability.retry(
+                            section=section,
+                            attempt=attempt + 1,
+                            max_attempts=int(retry.count),
+                            reason=last_err,
+                            wait_seconds=wait,
+                        )
+                        retry_wait = wait
+                        continue
+
+                if res.status_code != 200:
+                    raise LLMClientError(f"{section} API错误: {res.status_code}", raw_response=last_raw)
+
+                if not isinstance(response_json, dict):
+                    raise LLMClientError(f"{section} 返回非JSON", raw_response=last_raw)
+
+                args = extracted_args
+                if args is None:
+                    observability.missing_tool_call(section=section, reason="no tool_calls/function_call or unparsable arguments")
+                    return None, last_raw, provider
+
+                return args, last_raw, provider
+
+            finally:
+                pool.release(
+                    provider,
+                    outcome=outcome,
+                    latency=time.monotonic() - started,
+                    cooldown=cooldown,
+                    error=last_err,
+                )
 
         raise LLMClientError(f"{section} 调用失败: {last_err}", raw_response=last_raw)
 
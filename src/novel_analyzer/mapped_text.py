@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import weakref
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterator, Union
+
+
+# UTF-8 续字节（0x80-0xBF）之外的所有字节；bytes.translate 删除它们后剩下的长度即续字节数
+_NON_CONTINUATION = bytes(b for b in range(256) if b & 0xC0 != 0x80)
+_STRIDE_BYTES = 1 << 16
+_BLOCK_BYTES = 1 << 20
+
+
+def _char_count(data: bytes) -> int:
+    return len(data) - len(data.translate(None, _NON_CONTINUATION))
+
+
+def _release(mm: mmap.mmap | None, fd: int | None, path: str, delete: bool) -> None:
+    if mm is not None:
+        mm.close()
+    if fd is not None:
+        os.close(fd)
+    if delete:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class MappedText:
+    """A UTF-8 text file exposed as a read-only, char-indexed sequence.
+
+    The file is memory-mapped and only a sparse char -> byte checkpoint table (one entry per 64 KiB)
+    lives on the heap; text[a:b] decodes just the bytes it covers. With delete=True the file is
+    removed once the last reference goes away, so a session evicted mid-analysis stays readable.
+    """
+
+    def __init__(self, path: str | Path, *, sha256: str | None = None, delete: bool = False):
+        self.path = str(path)
+        fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            self.size_bytes = os.fstat(fd).st_size
+            self._mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ) if self.size_bytes else None
+        except BaseException:
+            os.close(fd)
+            raise
+        self._finalizer = weakref.finalize(self, _release, self._mm, fd, self.path, delete)
+
+        digest = hashlib.sha256() if sha256 is None else None
+        byte_marks = array("q")
+        char_marks = array("q")
+        pos = chars = 0
+        while pos < self.size_bytes:
+            end = self._char_boundary(min(self.size_bytes, pos + _STRIDE_BYTES))
+            data = self._bytes(pos, end)
+            if digest is not None:
+                digest.update(data)
+            byte_marks.append(pos)
+            char_marks.append(chars)
+            chars += _char_count(data)
+            pos = end
+        byte_marks.append(self.size_bytes)
+        char_marks.append(chars)
+        self._byte_marks = byte_marks
+        self._char_marks = char_marks
+        self._chars = chars
+        self.sha256 = sha256 if digest is None else digest.hexdigest()
+
+    def __len__(self) -> int:
+        return self._chars
+
+    def __getitem__(self, key: int | slice) -> str:
+        if isinstance(key, int):
+            if key < 0:
+                key += self._chars
+            if not 0 <= key < self._chars:
+                raise IndexError("MappedText index out of range")
+            return self[key : key + 1]
+        start, stop, step = key.indices(self._chars)
+        if step != 1:
+            raise ValueError("MappedText 仅支持步长为 1 的切片")
+        if stop <= start:
+            return ""
+        return self._bytes(self.byte_offset(start), self.byte_offset(stop)).decode("utf-8")
+
+    def byte_offset(self, char_pos: int) -> int:
+        i = bisect_right(self._char_marks, char_pos) - 1
+        b0, c0 = self._byte_marks[i], self._char_marks[i]
+        if char_pos == c0:
+            return b0
+        segment = self._bytes(b0, self._byte_marks[i + 1]).decode("utf-8")
+        return b0 + len(segment[: char_pos - c0].encode("utf-8"))
+
+    def char_offset(self, byte_pos: int) -> int:
+        byte_pos = self._char_boundary(max(0, min(byte_pos, self.size_bytes)))
+        i = bisect_right(self._byte_marks, byte_pos) - 1
+        return self._char_marks[i] + _char_count(self._bytes(self._byte_marks[i], byte_pos))
+
+    def iter_blocks(self, block_bytes: int | None = None) -> Iterator[tuple[int, str]]:
+        """(char offset, text) blocks of about block_bytes, cut after a newline whenever one is in reach."""
+        block_bytes = max(4, int(block_bytes or _BLOCK_BYTES))
+        pos = chars = 0
+        while pos < self.size_bytes:
+            end = min(self.size_bytes, pos + block_bytes)
+            if end < self.size_bytes:
+                assert self._mm is not None
+                newline = self._mm.rfind(b"\n", pos, end)
+                end = newline + 1 if newline >= pos else self._char_boundary(end)
+            text = self._bytes(pos, end).decode("utf-8")
+            yield chars, text
+            chars += len(text)
+            pos = end
+
+    def close(self) -> None:
+        self._finalizer()
+
+    def _bytes(self, start: int, end: int) -> bytes:
+        return self._mm[start:end] if self._mm is not None else b""
+
+    def _char_boundary(self, pos: int) -> int:
+        """Move pos back to the start of the UTF-8 sequence it falls in."""
+        if self._mm is None:
+            return 0
+        while 0 < pos < self.size_bytes and self._mm[pos] & 0xC0 == 0x80:
+            pos -= 1
+        return pos
+
+
+NovelText = Union[str, MappedText]
+
+
+def text_blocks(text: NovelText) -> Iterator[tuple[int, str]]:
+    """(char offset, str) pieces covering text; a str is a single block, a MappedText is decoded block by block."""
+    if isinstance(text, MappedText):
+        yield from text.iter_blocks()
+    elif text:
+        yield 0, text
+
+
+def as_str(text: NovelText) -> str:
+    return text if isinstance(text, str) else text[:]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+from pydantic import BaseModel
+
+from .schemas import (
+    Character,
+    CoreOutput,
+    EvolutionEntry,
+    LewdElementEntry,
+    LewdElementsOutput,
+    Relationship,
+    SceneEntry,
+    ScenesOutput,
+    SexScenes,
+    ThunderOutput,
+    ThunderzoneEntry,
+)
+
+
+def _longer(a: str | None, b: str | None) -> str | None:
+    if not (b or "").strip():
+        return a
+    if not (a or "").strip():
+        return b
+    return b if len(b or "") > len(a or "") else a
+
+
+def _join_unique(parts: Sequence[str]) -> str:
+    seen: list[str] = []
+    for p in parts:
+        s = (p or "").strip()
+        if s and s not in seen:
+            seen.append(s)
+    return "\n".join(seen)
+
+
+def merge_core(outs: Sequence[CoreOutput]) -> CoreOutput:
+    """Dedup characters by name (keeping the most detailed fields) and union relationships by (from, to, type)."""
+    characters: dict[str, Character] = {}
+    for out in outs:
+        for c in out.characters:
+            key = c.name.strip()
+            prev = characters.get(key)
+            if prev is None:
+                characters[key] = c
+                continue
+            scores = [x for x in (prev.lewdness_score, c.lewdness_score) if x is not None]
+            characters[key] = prev.model_copy(
+                update={
+                    "identity": _longer(prev.identity, c.identity),
+                    "personality": _longer(prev.personality, c.personality),
+                    "sexual_preferences": _longer(prev.sexual_preferences, c.sexual_preferences),
+                    "lewdness_score": max(scores) if scores else None,
+                    "lewdness_analysis": _longer(prev.lewdness_analysis, c.lewdness_analysis),
+                }
+            )
+
+    relationships: dict[tuple[str, str, str], Relationship] = {}
+    for out in outs:
+        for r in out.relationships:
+            key = (r.from_.strip(), r.to.strip(), r.type.strip())
+            if key not in relationships:
+                relationships[key] = r
+    return CoreOutput(characters=list(characters.values()), relationships=list(relationships.values()))
+
+
+def _scene_key(s: SceneEntry) -> tuple[frozenset[str], str, str]:
+    return frozenset(s.participants), s.chapter.strip(), s.description.strip()
+
+
+def merge_scenes(outs: Sequence[ScenesOutput]) -> ScenesOutput:
+    """Chunks arrive in text order: the first chunk that mentions a pair owns its first scene."""
+    first: dict[frozenset[str], SceneEntry] = {}
+    scenes: dict[tuple[frozenset[str], str, str], SceneEntry] = {}
+    evolution: dict[tuple[str, str], EvolutionEntry] = {}
+    total = 0
+    for out in outs:
+        for s in out.first_sex_scenes:
+            first.setdefault(frozenset(s.participants), s)
+        for s in out.sex_scenes.scenes:
+            scenes.setdefault(_scene_key(s), s)
+        total += out.sex_scenes.total_count
+        for e in out.evolution:
+            evolution.setdefault((e.chapter.strip(), e.stage.strip()), e)
+    return ScenesOutput(
+        first_sex_scenes=list(first.values()),
+        sex_scenes=SexScenes(total_count=max(total, len(scenes)), scenes=list(scenes.values())),
+        evolution=list(evolution.values()),
+    )
+
+
+def merge_thunder(outs: Sequence[ThunderOutput]) -> ThunderOutput:
+    zones: dict[tuple[str, frozenset[str], str], ThunderzoneEntry] = {}
+    for out in outs:
+        for z in out.thunderzones:
+            zones.setdefault((z.type.strip(), frozenset(z.involved_characters), z.chapter_location.strip()), z)
+    summary = _join_unique([o.thunderzone_summary for o in outs if o.thunderzones]) or outs[0].thunderzone_summary
+    return ThunderOutput(thunderzones=list(zones.values()), thunderzone_summary=summary)
+
+
+def merge_lewd_elements(outs: Sequence[LewdElementsOutput]) -> LewdElementsOutput:
+    """One entry per type (the schema forbids duplicates); involved characters are unioned."""
+    by_type: dict[str, LewdElementEntry] = {}
+    for out in outs:
+        for item in out.lewd_elements:
+            prev = by_type.get(item.type)
+            if prev is None:
+                by_type[item.type] = item
+                continue
+            names = list(dict.fromkeys([*prev.involved_characters, *item.involved_characters]))
+            by_type[item.type] = prev.model_copy(update={"involved_characters": names})
+    summary = _join_unique([o.lewd_elements_summary for o in outs if o.lewd_elements]) or outs[0].lewd_elements_summary
+    return LewdElementsOutput(lewd_elements=list(by_type.values()), lewd_elements_summary=summary)
+
+
+def merge_outputs(section: str, outs: Sequence[BaseModel]) -> BaseModel:
+    if not outs:
+        raise ValueError("merge_outputs 需要至少一个结果")
+    if len(outs) == 1:
+        return outs[0]
+    if section == "core":
+        return merge_core(outs)  # type: ignore[arg-type]
+    if section == "scenes":
+        return merge_scenes(outs)  # type: ignore[arg-type]
+    if section == "thunder":
+        return merge_thunder(outs)  # type: ignore[arg-type]
+    if section == "lewd_elements":
+        return merge_lewd_elements(outs)  # type: ignore[arg-type]
+    return outs[0]
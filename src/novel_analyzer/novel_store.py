@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable
+
+from .config_loader import NovelStoreConfig
+from .mapped_text import MappedText, NovelText
+from .schemas import CoreOutput
+
+
+def content_id(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class NovelSession:
+    novel_id: str
+    content: NovelText
+    chars: int
+    memory_bytes: int
+    created_at: float
+    last_access: float
+    core: CoreOutput | None = None
+
+
+class NovelStore:
+    """Content-addressed novel sessions with LRU + TTL eviction and a size cap.
+
+    With storage: mmap each text is written once as a UTF-8 file and served as a MappedText, so
+    sessions cost a small offset table on the heap instead of a full str; memory_bytes then counts
+    file bytes. An evicted file is removed once in-flight analyses drop their reference.
+    """
+
+    def __init__(self, cfg: NovelStoreConfig):
+        self._cfg = cfg
+        self._mapped = (cfg.storage or "memory").strip().lower() == "mmap"
+        self._dir: Path | None = None
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, NovelSession] = OrderedDict()
+        self._memory_bytes = 0
+        self.evictions = 0
+
+    def put(self, content: str, *, novel_id: str | None = None) -> NovelSession:
+        """Register content; novel_id may be passed when the caller already hashed it (streamed uploads)."""
+        novel_id = novel_id or content_id(content)
+        existing = self.get(novel_id)
+        if existing is not None:
+            return existing
+        if self._mapped:
+            return self._insert(novel_id, self._write(novel_id, lambda f: f.write(content.encode("utf-8"))))
+        return self._insert(novel_id, content)
+
+    def put_file(self, src: IO[bytes], *, novel_id: str) -> NovelSession:
+        """Register UTF-8 bytes read from src (e.g. an upload spool) without decoding them into one str when mapped."""
+        existing = self.get(novel_id)
+        if existing is not None:
+            return existing
+        src.seek(0)
+        if self._mapped:
+            return self._insert(novel_id, self._write(novel_id, lambda f: shutil.copyfileobj(src, f)))
+        return self._insert(novel_id, src.read().decode("utf-8"))
+
+    def get(self, novel_id: str) -> NovelSession | None:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._items.get(novel_id)
+            if session is None:
+                return None
+            session.last_access = now
+            self._items.move_to_end(novel_id)
+            return session
+
+    def set_core(self, novel_id: str, core: CoreOutput) -> None:
+        with self._lock:
+            session = self._items.get(novel_id)
+            if session is not None:
+                session.core = core
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "storage": "mmap" if self._mapped else "memory",
+                "items": len(self._items),
+                "memory_bytes": self._memory_bytes,
+                "max_items": self._cfg.max_items,
+                "max_memory_bytes": self._cfg.max_memory_mb * 1024 * 1024,
+                "evictions": self.evictions,
+            }
+
+    def _insert(self, novel_id: str, content: NovelText) -> NovelSession:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            existing = self._items.get(novel_id)
+            if existing is not None:
+                # 并发上传同一文本：保留先写入的会话
+                if isinstance(content, MappedText):
+                    content.close()
+                existing.last_access = now
+                self._items.move_to_end(novel_id)
+                return existing
+
+            session = NovelSession(
+                novel_id=novel_id,
+                content=content,
+                chars=len(content),
+                memory_bytes=content.size_bytes if isinstance(content, MappedText) else sys.getsizeof(content),
+                created_at=now,
+                last_access=now,
+            )
+            self._items[novel_id] = session
+            self._memory_bytes += session.memory_bytes
+            self._enforce_limits(keep=novel_id)
+            return session
+
+    def _write(self, novel_id: str, write: Callable[[IO[bytes]], Any]) -> MappedText:
+        fd, path = tempfile.mkstemp(prefix=f"{novel_id[:16]}.", suffix=".txt", dir=self._storage_dir())
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            return MappedText(path, sha256=novel_id, delete=True)
+        except BaseException:
+            Path(path).unlink(missing_ok=True)
+            raise
+
+    def _storage_dir(self) -> str:
+        with self._lock:
+            if self._dir is None:
+                if self._cfg.dir:
+                    self._dir = Path(self._cfg.dir)
+                    self._dir.mkdir(parents=True, exist_ok=True)
+                else:
+                    self._dir = Path(tempfile.mkdtemp(prefix="novel_store_"))
+            return str(self._dir)
+
+    def _drop(self, novel_id: str) -> None:
+        session = self._items.pop(novel_id, None)
+        if session is not None:
+            self._memory_bytes -= session.memory_bytes
+            self.evictions += 1
+
+    def _expire(self, now: float) -> None:
+        ttl = float(self._cfg.ttl_seconds)
+        if ttl <= 0:
+            return
+        for novel_id in [k for k, v in self._items.items() if now - v.last_access > ttl]:
+            self._drop(novel_id)
+
+    def _enforce_limits(self, *, keep: str) -> None:
+        max_items = max(1, int(self._cfg.max_items))
+        max_bytes = max(0, int(self._cfg.max_memory_mb)) * 1024 * 1024
+        # 按 LRU 顺序淘汰；刚写入的会话即便单独超过上限也保留，避免上传后立即失效。
+        while len(self._items) > 1 and (
+            len(self._items) > max_items or (max_bytes > 0 and self._memory_bytes > max_bytes)
+        ):
+            oldest = next(iter(self._items))
+            if oldest == keep:
+                break
+            self._drop(oldest)
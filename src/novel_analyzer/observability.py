@@ -36,19 +36,48 @@ def retry(*, section: str, attempt: int, max_attempts: int, reason: str, wait_se
     )
 
 
-def truncation(*, section: str, original_chars: int, kept_chars: int, strategy: str) -> None:
+def truncation(
+    *,
+    section: str,
+    original_chars: int,
+    kept_chars: int,
+    strategy: str,
+    windows: int | None = None,
+) -> None:
     ratio = 0.0
     if original_chars > 0:
         ratio = round(kept_chars / original_chars, 4)
+    payload: dict[str, Any] = {
+        "event": "content_truncation",
+        "section": section,
+        "original_chars": original_chars,
+        "kept_chars": kept_chars,
+        "ratio": ratio,
+        "strategy": strategy,
+    }
+    if windows is not None:
+        payload["windows"] = windows
+    _emit(logging.INFO, payload)
+
+
+def cleanup(
+    *,
+    original_chars: int,
+    cleaned_chars: int,
+    dropped_lines: int,
+    boilerplate_lines: int,
+    saved_tokens: int,
+) -> None:
     _emit(
         logging.INFO,
         {
-            "event": "content_truncation",
-            "section": section,
+            "event": "content_cleanup",
             "original_chars": original_chars,
-            "kept_chars": kept_chars,
-            "ratio": ratio,
-            "strategy": strategy,
+            "cleaned_chars": cleaned_chars,
+            "saved_chars": original_chars - cleaned_chars,
+            "dropped_lines": dropped_lines,
+            "boilerplate_lines": boilerplate_lines,
+            "saved_tokens": saved_tokens,
         },
     )
 
@@ -86,3 +115,157 @@ def missing_tool_call(*, section: str, reason: str) -> None:
             "reason": reason,
         },
     )
+
+
+def cache(*, section: str, hit: bool) -> None:
+    _emit(
+        logging.INFO,
+        {
+            "event": "llm_cache",
+            "section": section,
+            "hit": hit,
+        },
+    )
+
+
+def stream_fallback(*, section: str, reason: str) -> None:
+    _emit(
+        logging.WARNING,
+        {
+            "event": "llm_stream_fallback",
+            "section": section,
+            "reason": reason,
+        },
+    )
+
+
+def rate_limited(*, section: str, wait_seconds: float) -> None:
+    _emit(
+        logging.INFO,
+        {
+            "event": "llm_rate_limited",
+            "section": section,
+            "wait_seconds": round(float(wait_seconds), 3),
+        },
+    )
+
+
+def circuit_state(*, upstream: str, previous: str, state: str, failure_rate: float | None) -> None:
+    _emit(
+        logging.WARNING if state != "closed" else logging.INFO,
+        {
+            "event": "llm_circuit_state",
+            "upstream": upstream,
+            "previous": previous,
+            "state": state,
+            "failure_rate": None if failure_rate is None else round(float(failure_rate), 3),
+        },
+    )
+
+
+def retry_budget_exhausted(*, section: str, upstream: str, reason: str) -> None:
+    _emit(
+        logging.WARNING,
+        {
+            "event": "llm_retry_budget_exhausted",
+            "section": section,
+            "upstream": upstream,
+            "reason": reason,
+        },
+    )
+
+
+def provider_cooldown(*, provider: str, consecutive_failures: int, cooldown_seconds: float, reason: str) -> None:
+    _emit(
+        logging.WARNING,
+        {
+            "event": "llm_provider_cooldown",
+            "provider": provider,
+            "consecutive_failures": consecutive_failures,
+            "cooldown_seconds": cooldown_seconds,
+            "reason": reason,
+        },
+    )
+
+
+def hedge(*, section: str, delay_seconds: float) -> None:
+    _emit(
+        logging.INFO,
+        {
+            "event": "llm_hedge",
+            "section": section,
+            "delay_seconds": round(float(delay_seconds), 3),
+        },
+    )
+
+
+def coalesced(*, section: str) -> None:
+    _emit(
+        logging.INFO,
+        {
+            "event": "llm_single_flight_coalesced",
+            "section": section,
+        },
+    )
+
+
+def chunked(*, section: str, chunks: int, covered_chars: int, original_chars: int, failed: int) -> None:
+    _emit(
+        logging.WARNING if failed else logging.INFO,
+        {
+            "event": "content_chunked",
+            "section": section,
+            "chunks": chunks,
+            "covered_chars": covered_chars,
+            "original_chars": original_chars,
+            "coverage": round(covered_chars / original_chars, 4) if original_chars else 1.0,
+            "failed": failed,
+        },
+    )
+
+
+def incremental(
+    *,
+    section: str,
+    base_novel_id: str,
+    matched_segments: int,
+    delta_chars: int,
+    total_chars: int,
+) -> None:
+    _emit(
+        logging.INFO,
+        {
+            "event": "llm_incremental",
+            "section": section,
+            "base_novel_id": base_novel_id,
+            "matched_segments": matched_segments,
+            "delta_chars": delta_chars,
+            "total_chars": total_chars,
+        },
+    )
+
+
+def job(*, job_id: str, status: str, resumed_sections: int, elapsed_seconds: float) -> None:
+    _emit(
+        logging.INFO if status in ("ok", "cancelled") else logging.WARNING,
+        {
+            "event": "llm_job",
+            "job_id": job_id,
+            "status": status,
+            "resumed_sections": resumed_sections,
+            "elapsed_seconds": round(elapsed_seconds, 3),
+        },
+    )
+
+
+def token_usage(*, section: str, estimated: int, reported: int) -> None:
+    _emit(
+        logging.INFO,
+        {
+            "event": "llm_token_usage",
+            "section": section,
+            "estimated_prompt_tokens": int(estimated),
+            "reported_prompt_tokens": int(reported),
+            "ratio": round(reported / estimated, 4) if estimated else None,
+        },
+    )
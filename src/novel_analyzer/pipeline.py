@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import weakref
+from typing import Any, Iterable
+
+from pydantic import BaseModel
+
+from .config_loader import LLMConfig
+from . import observability
+from .chapters import chapter_count
+from .cleanup import clean_content
+from .content_processor import chapter_index, prepare_content, section_content_config, split_chunks
+from .llm_client import LLMClient, ProgressCallback
+from .mapped_text import NovelText
+from .merge import merge_outputs
+from .prompts import render
+from .tokens import context_tokens, estimate_tokens
+from .schemas import (
+    Character,
+    CoreOutput,
+    LewdElementsOutput,
+    MetaOutput,
+    Relationship,
+    ScenesOutput,
+    ThunderOutput,
+)
+from .validators import (
+    validate_core_consistency,
+    validate_lewd_elements_consistency,
+    validate_scenes_consistency,
+    validate_thunder_consistency,
+)
+
+
+SECTION_OUTPUTS: dict[str, type[BaseModel]] = {
+    "meta": MetaOutput,
+    "core": CoreOutput,
+    "scenes": ScenesOutput,
+    "thunder": ThunderOutput,
+    "lewd_elements": LewdElementsOutput,
+}
+
+# 依赖 core 角色表/关系的 section（core 通过校验后并行扇出）
+DEPENDENT_SECTIONS = ("scenes", "thunder", "lewd_elements")
+
+
+class ConsistencyError(Exception):
+    def __init__(self, section: str, errors: list[str]):
+        super().__init__(f"{section} 一致性校验失败")
+        self.section = section
+        self.errors = errors
+
+
+def render_section_prompt(
+    cfg: LLMConfig,
+    section: str,
+    content: NovelText,
+    *,
+    characters: Iterable[Character] = (),
+    relationships: Iterable[Relationship] = (),
+    model: str | None = None,
+    cache_document: bool = True,
+) -> str:
+    sec = cfg.sections[section]
+    characters = list(characters)
+    context: dict[str, Any] = {"tool_name": sec.tool_name}
+    if section in DEPENDENT_SECTIONS:
+        names = {c.name for c in characters}
+        context["allowed_names_json"] = json.dumps(sorted(names), ensure_ascii=False)
+    if section in {"scenes", "thunder"}:
+        context["relationships_json"] = json.dumps(
+            [r.model_dump(by_alias=True) for r in relationships],
+            ensure_ascii=False,
+        )
+    token_budget = content_token_budget(cfg, section, model=model, context=context)
+    context["content"] = prepare_content(
+        content,
+        cfg,
+        section=section,
+        token_budget=token_budget,
+        names=[c.name for c in characters],
+        cache_document=cache_document,
+    )
+    return render(sec.prompt_template, **context)
+
+
+def content_token_budget(
+    cfg: LLMConfig,
+    section: str,
+    *,
+    model: str | None,
+    context: dict[str, Any],
+) -> int | None:
+    """Tokens left for the novel text in model's window, or None to fall back to max_chars.
+
+    A section profile that sets its own max_chars opts that section out of window filling.
+    """
+    tb = cfg.content_processing.token_budget
+    if not tb.enabled:
+        return None
+    profile = cfg.content_processing.sections.get(section)
+    if profile is not None and profile.max_chars is not None:
+        return None
+    window = context_tokens(tb, model)
+    if window <= 0:
+        return None
+    template_tokens = estimate_tokens(render(cfg.sections[section].prompt_template, **{**context, "content": ""}), tb)
+    schema_tokens = estimate_tokens(
+        json.dumps(SECTION_OUTPUTS[section].model_json_schema(), ensure_ascii=False, separators=(",", ":")),
+        tb,
+    )
+    return max(0, window - int(tb.reserve_output_tokens) - template_tokens - schema_tokens)
+
+
+def _section_model(client: LLMClient, section: str) -> str | None:
+    """The routed model for section; clients without routing (test fakes) expose a single model."""
+    model_for = getattr(client, "model_for", None)
+    if model_for is not None:
+        return model_for(section)
+    return getattr(client, "model", None)
+
+
+def check_consistency(section: str, out: BaseModel, names: set[str]) -> list[str]:
+    if section == "core":
+        return validate_core_consistency(out)  # type: ignore[arg-type]
+    if section == "scenes":
+        return validate_scenes_consistency(out, names)  # type: ignore[arg-type]
+    if section == "thunder":
+        return validate_thunder_consistency(out, names)  # type: ignore[arg-type]
+    if section == "lewd_elements":
+        return validate_lewd_elements_consistency(out, names)  # type: ignore[arg-type]
+    return []
+
+
+def dump_output(section: str, out: BaseModel) -> dict[str, Any]:
+    if section == "core":
+        return out.model_dump(by_alias=True)
+    return out.model_dump()
+
+
+def plan_chunks(cfg: LLMConfig, section: str, content: NovelText) -> list[tuple[int, int]] | None:
+    """Chunk spans for section, or None when the section runs once over prepare_content() output."""
+    cp = section_content_config(cfg, section)
+    chunking = cp.chunking
+    if not chunking.enabled or section not in chunking.sections:
+        return None
+    max_chars = int(cp.max_chars)
+    if max_chars <= 0 or len(content) <= max_chars:
+        return None
+
+    chunk_chars = int(chunking.chunk_chars) if chunking.chunk_chars > 0 else max_chars
+    spans = split_chunks(
+        content,
+        min(chunk_chars, max_chars),
+        int(cp.boundary_search_window),
+        boundary_aware=bool(cp.boundary_aware),
+    )
+    limit = int(chunking.max_chunks)
+    if limit > 0 and len(spans) > limit:
+        # 均匀抽取，保证首尾块都在内
+        step = (len(spans) - 1) / max(1, limit - 1)
+        spans = [spans[round(i * step)] for i in range(limit)]
+    return spans
+
+
+# 每个 client 一个分块并发上限：/api/analyze/full 并行的多个 section 共用，而不是各自 chunking.concurrency
+_chunk_limiters: weakref.WeakKeyDictionary[Any, tuple[asyncio.AbstractEventLoop, int, asyncio.Semaphore]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _chunk_limiter(client: LLMClient, concurrency: int) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    entry = _chunk_limiters.get(client)
+    if entry is None or entry[0] is not loop or entry[1] != concurrency:
+        entry = (loop, concurrency, asyncio.Semaphore(concurrency))
+        _chunk_limiters[client] = entry
+    return entry[2]
+
+
+async def _run_chunks(
+    client: LLMClient,
+    cfg: LLMConfig,
+    section: str,
+    content: NovelText,
+    spans: list[tuple[int, int]],
+    *,
+    characters: list[Character],
+    relationships: list[Relationship],
+    bypass_cache: bool,
+    on_progress: ProgressCallback | None,
+) -> BaseModel:
+    sem = _chunk_limiter(client, max(1, int(cfg.content_processing.chunking.concurrency)))
+    progress: dict[int, dict[str, Any]] = {}
+
+    def chunk_progress(idx: int) -> ProgressCallback | None:
+        if on_progress is None:
+            return None
+
+        def report(p: dict[str, Any]) -> None:
+            progress[idx] = p
+            on_progress(
+                {
+                    "section": section,
+                    "bytes": sum(int(x.get("bytes") or 0) for x in progress.values()),
+                    "tokens": sum(int(x.get("tokens") or 0) for x in progress.values()),
+                    "done": False,
+                }
+            )
+
+        return report
+
+    async def run_one(idx: int, start: int, end: int) -> BaseModel:
+        async with sem:
+            prompt = await asyncio.to_thread(
+                render_section_prompt,
+                cfg,
+                section,
+                content[start:end],
+                characters=characters,
+                relationships=relationships,
+                model=_section_model(client, section),
+                cache_document=False,
+            )
+            return await client.acall_section(
+                section=section,
+                prompt=prompt,
+                output_model=SECTION_OUTPUTS[section],
+                bypass_cache=bypass_cache,
+                on_progress=chunk_progress(idx),
+            )
+
+    results = await asyncio.gather(
+        *(run_one(idx, start, end) for idx, (start, end) in enumerate(spans)),
+        return_exceptions=True,
+    )
+    outs = [r for r in results if isinstance(r, BaseModel)]
+    failures = [r for r in results if isinstance(r, BaseException)]
+    observability.chunked(
+        section=section,
+        chunks=len(spans),
+        covered_chars=sum(end - start for start, end in spans),
+        original_chars=len(content),
+        failed=len(failures),
+    )
+    if not outs:
+        raise failures[0]
+    return merge_outputs(section, outs)
+
+
+async def run_section(
+    client: LLMClient,
+    cfg: LLMConfig,
+    section: str,
+    content: NovelText,
+    *,
+    characters: list[Character] | None = None,
+    relationships: list[Relationship] | None = None,
+    bypass_cache: bool = False,
+    on_progress: ProgressCallback | None = None,
+) -> BaseModel:
+    """Clean and prepare content, call the LLM and run the cross-field consistency checks for one section.
+
+    With content_processing.chunking enabled, long novels are analysed chunk by chunk and the
+    per-chunk outputs are merged before the consistency checks; a chunk that fails is dropped
+    as long as at least one chunk succeeds.
+
+    Raises LLMClientError for upstream/schema failures and ConsistencyError when the
+    validated output references unknown characters (or, for core, is empty).
+    """
+    characters = characters or []
+    relationships = relationships or []
+    # 清洗与截断要扫描整本书（行哈希、临时文件、sha256），放到线程里，不阻塞事件循环上的其他请求
+    content, _ = await asyncio.to_thread(
+        clean_content, content, cfg.content_processing.cleanup, cfg.content_processing.token_budget
+    )
+
+    spans = plan_chunks(cfg, section, content)
+    if spans is not None:
+        out = await _run_chunks(
+            client,
+            cfg,
+            section,
+            content,
+            spans,
+            characters=characters,
+            relationships=relationships,
+            bypass_cache=bypass_cache,
+            on_progress=on_progress,
+        )
+    else:
+        prompt = await asyncio.to_thread(
+            render_section_prompt,
+            cfg,
+            section,
+            content,
+            characters=characters,
+            relationships=relationships,
+            model=_section_model(client, section),
+        )
+        out = await client.acall_section(
+            section=section,
+            prompt=prompt,
+            output_model=SECTION_OUTPUTS[section],
+            bypass_cache=bypass_cache,
+            on_progress=on_progress,
+        )
+
+    if isinstance(out, MetaOutput):
+        out = _with_detected_chapter_count(out, content)
+
+    errors = check_consistency(section, out, {c.name for c in characters})
+    if errors:
+        raise ConsistencyError(section, errors)
+    return out
+
+
+def _with_detected_chapter_count(out: MetaOutput, content: NovelText) -> MetaOutput:
+    """The chapter headings are countable locally, so that number should not depend on the LLM reading them."""
+    count = chapter_count(chapter_index(content))
+    if count <= 0 or count == out.novel_info.chapter_count:
+        return out
+    return out.model_copy(update={"novel_info": out.novel_info.model_copy(update={"chapter_count": count})})
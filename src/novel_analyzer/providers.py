@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Iterable, Mapping
+from urllib.parse import urlparse
+
+from . import observability
+from .config_loader import LLMConfig, ProvidersConfig, RateLimitConfig, RouteTarget
+
+
+OK = "ok"
+ERROR = "error"
+THROTTLED = "throttled"
+SKIPPED = "skipped"
+
+_LATENCY_ALPHA = 0.2
+_WAIT_SLOT_SECONDS = 0.05
+
+
+class Provider:
+    """One upstream (api_url + key + model) in the pool, with its live load and health.
+
+    key names the upstream for the shared rate limiter and circuit breaker. It defaults to the bare
+    "api_url|model" a single-runtime client has always used; pools of several keys suffix the name.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        api_url: str,
+        api_key: str,
+        model: str,
+        weight: float = 1.0,
+        max_concurrency: int = 0,
+        rate_limit: RateLimitConfig | None = None,
+        key: str | None = None,
+    ):
+        self.name = name
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.weight = max(1e-6, float(weight))
+        self.max_concurrency = max(0, int(max_concurrency))
+        self.rate_limit = rate_limit
+        self.key = key or f"{api_url.rstrip('/')}|{model}"
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.consecutive_failures = 0
+        self.latency_ewma: float | None = None
+        self.cooldown_until = 0.0
+        self.last_error = ""
+
+    def at_capacity(self) -> bool:
+        return self.max_concurrency > 0 and self.outstanding >= self.max_concurrency
+
+
+class ProviderPool:
+    """Weighted least-outstanding selection over several providers, with failure cooldowns.
+
+    A provider with `failure_threshold` consecutive failures (timeouts, transport errors, 5xx) is
+    skipped for `cooldown_seconds`; a 429 parks it until its Retry-After. When every candidate is
+    cooling down the one that recovers first is still used, so a pool never refuses outright.
+    """
+
+    def __init__(
+        self,
+        providers: Iterable[Provider],
+        *,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        ordered: bool = False,
+        lock: threading.Lock | None = None,
+    ):
+        self.providers = list(providers)
+        if not self.providers:
+            raise ValueError("provider 池为空")
+        self.ordered = ordered
+        self._failure_threshold = max(1, int(failure_threshold))
+        self._cooldown_seconds = max(0.0, float(cooldown_seconds))
+        # 路由子池与父池共用同一把锁和同一批 Provider 对象，在途数与健康状态只记一份
+        self._lock = lock or threading.Lock()
+        self._variants: dict[tuple[str, str], Provider] = {}
+        self._routes: dict[tuple, ProviderPool] = {}
+
+    @property
+    def primary(self) -> Provider:
+        return self.providers[0]
+
+    def select(self, *, avoid: set[str] = frozenset(), exclude: set[str] = frozenset()) -> Provider | None:
+        """Reserve a slot on the best provider; None while every eligible provider is at its concurrency cap.
+
+        exclude is hard (e.g. circuit open); avoid is soft (failed earlier in this call) and is ignored
+        once nothing else is left.
+        """
+        now = time.monotonic()
+        with self._lock:
+            allowed = [p for p in self.providers if p.name not in exclude]
+            candidates = [p for p in allowed if p.name not in avoid] or allowed
+            free = [p for p in candidates if not p.at_capacity()]
+            if not free:
+                return None
+            healthy = [p for p in free if p.cooldown_until <= now] or [min(free, key=lambda p: p.cooldown_until)]
+            if self.ordered:
+                best = healthy[0]
+            else:
+                best = min(healthy, key=lambda p: ((p.outstanding + 1) / p.weight, p.latency_ewma or 0.0, p.requests))
+            best.outstanding += 1
+            best.requests += 1
+            return best
+
+    async def acquire(
+        self,
+        sleep: Callable[[float], Awaitable[None]],
+        *,
+        avoid: set[str] = frozenset(),
+        exclude: set[str] = frozenset(),
+    ) -> Provider:
+        while True:
+            provider = self.select(avoid=avoid, exclude=exclude)
+            if provider is not None:
+                return provider
+            await sleep(_WAIT_SLOT_SECONDS)
+
+    def has(self, name: str) -> bool:
+        return any(p.name == name for p in self.providers)
+
+    def route(self, targets: Iterable[RouteTarget] = (), *, model: str | None = None) -> ProviderPool:
+        """Sub-pool for one section: its route tried in order, or every provider switched to `model`.
+
+        Targets naming a provider that is not in this pool (env unset) are skipped; with none left the
+        section falls back to the whole pool. The result is cached, so callers may route per request.
+        """
+        targets = tuple(targets)
+        key = (targets, model)
+        with self._lock:
+            routed = self._routes.get(key)
+            if routed is not None:
+                return routed
+            by_name = {p.name: p for p in self.providers}
+            chain = [
+                self._variant(by_name[t.provider], t.model or model)
+                for t in targets
+                if t.provider in by_name
+            ]
+            ordered = bool(chain)
+            if not chain:
+                chain = [self._variant(p, model) for p in self.providers]
+            chain = list({id(p): p for p in chain}.values())
+            if not ordered and chain == self.providers:
+                routed = self
+            else:
+                routed = ProviderPool(
+                    chain,
+                    failure_threshold=self._failure_threshold,
+                    cooldown_seconds=self._cooldown_seconds,
+                    ordered=ordered,
+                    lock=self._lock,
+                )
+            self._routes[key] = routed
+            return routed
+
+    def _variant(self, base: Provider, model: str | None) -> Provider:
+        """base with a different model; its own key, so limiter/breaker/health are tracked per model."""
+        if not model or model == base.model:
+            return base
+        variant = self._variants.get((base.name, model))
+        if variant is None:
+            plain = f"{base.api_url.rstrip('/')}|{base.model}"
+            suffix = base.key[len(plain):] if base.key.startswith(plain) else f"#{base.name}"
+            variant = Provider(
+                name=f"{base.name}:{model}",
+                api_url=base.api_url,
+                api_key=base.api_key,
+                model=model,
+                weight=base.weight,
+                max_concurrency=base.max_concurrency,
+                rate_limit=base.rate_limit,
+                key=f"{base.api_url.rstrip('/')}|{model}{suffix}",
+            )
+            self._variants[(base.name, model)] = variant
+        return variant
+
+    def has_alternative(self, avoid: set[str]) -> bool:
+        return any(p.name not in avoid for p in self.providers)
+
+    def release(
+        self,
+        provider: Provider,
+        *,
+        outcome: str,
+        latency: float | None = None,
+        cooldown: float = 0.0,
+        error: str = "",
+    ) -> None:
+        now = time.monotonic()
+        became_unhealthy = False
+        with self._lock:
+            provider.outstanding = max(0, provider.outstanding - 1)
+            if outcome == OK:
+                provider.consecutive_failures = 0
+                if latency is not None:
+                    prev = provider.latency_ewma
+                    provider.latency_ewma = latency if prev is None else prev + _LATENCY_ALPHA * (latency - prev)
+            elif outcome == THROTTLED:
+                provider.throttled += 1
+                provider.cooldown_until = max(provider.cooldown_until, now + max(0.0, cooldown))
+            elif outcome == ERROR:
+                provider.failures += 1
+                provider.consecutive_failures += 1
+                provider.last_error = error
+                if provider.consecutive_failures >= self._failure_threshold and provider.cooldown_until <= now:
+                    provider.cooldown_until = now + self._cooldown_seconds
+                    became_unhealthy = True
+            else:
+                # 熔断中未发出的请求：不计入请求数
+                provider.requests = max(0, provider.requests - 1)
+        if became_unhealthy:
+            observability.provider_cooldown(
+                provider=provider.name,
+                consecutive_failures=provider.consecutive_failures,
+                cooldown_seconds=self._cooldown_seconds,
+                reason=error,
+            )
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": p.name,
+                    "upstream": p.key,
+                    "model": p.model,
+                    "weight": p.weight,
+                    "max_concurrency": p.max_concurrency,
+                    "outstanding": p.outstanding,
+                    "requests": p.requests,
+                    "failures": p.failures,
+                    "throttled": p.throttled,
+                    "error_rate": round(p.failures / p.requests, 4) if p.requests else 0.0,
+                    "latency_ms": round(p.latency_ewma * 1000, 1) if p.latency_ewma is not None else None,
+                    "healthy": p.cooldown_until <= now,
+                    "cooldown_for": round(max(0.0, p.cooldown_until - now), 3),
+                    "last_error": p.last_error,
+                }
+                for p in [*self.providers, *self._variants.values()]
+            ]
+
+
+def validate_api_url(api_url: str) -> str:
+    url = (api_url or "").strip()
+    parsed = urlparse(url)
+    if parsed.scheme not in {"http", "https"} or not parsed.netloc:
+        raise ValueError("API URL必须是http/https且包含主机，例如：https://example.com/v1")
+    return url.rstrip("/")
+
+
+def _resolve(cfg: ProvidersConfig, environ: Mapping[str, str]) -> list[tuple[Any, ...]]:
+    """(ProviderConfig, api_url, api_key, model) for each configured provider whose env vars are all set."""
+    resolved = []
+    for p in cfg.pool:
+        api_url = environ.get(f"{p.env_prefix}API_BASE_URL", "").strip()
+        api_key = environ.get(f"{p.env_prefix}API_KEY", "").strip()
+        model = (p.model or environ.get(f"{p.env_prefix}MODEL_NAME", "")).strip()
+        if api_url and api_key and model:
+            resolved.append((p, validate_api_url(api_url), api_key, model))
+    return resolved
+
+
+def build_pool(cfg: LLMConfig, environ: Mapping[str, str] | None = None) -> ProviderPool:
+    resolved = _resolve(cfg.providers, os.environ if environ is None else environ)
+    if not resolved:
+        raise ValueError("服务端未配置API（请在.env中设置API_BASE_URL/API_KEY/MODEL_NAME）")
+    return ProviderPool(
+        (
+            Provider(
+                name=p.name,
+                api_url=api_url,
+                api_key=api_key,
+                model=model,
+                weight=p.weight,
+                max_concurrency=p.max_concurrency,
+                rate_limit=p.rate_limit,
+                # 只有一个上游时沿用 api_url|model，限流/熔断统计与单 runtime 时一致
+                key=f"{api_url}|{model}#{p.name}" if len(resolved) > 1 else None,
+            )
+            for p, api_url, api_key, model in resolved
+        ),
+        failure_threshold=cfg.providers.failure_threshold,
+        cooldown_seconds=cfg.providers.cooldown_seconds,
+    )
+
+
+_instances_lock = threading.Lock()
+_instances: dict[tuple, ProviderPool] = {}
+
+
+def get_pool(cfg: LLMConfig, environ: Mapping[str, str] | None = None) -> ProviderPool:
+    """Process-wide pool for the current env, so load and health are shared by every request."""
+    env = os.environ if environ is None else environ
+    key = (cfg.providers, tuple((p.name, url, k, m) for p, url, k, m in _resolve(cfg.providers, env)))
+    with _instances_lock:
+        pool = _instances.get(key)
+        if pool is None:
+            pool = build_pool(cfg, env)
+            # env 变化（如改了 .env 重启前热加载）时旧池作废
+            _instances.clear()
+            _instances[key] = pool
+        return pool
+
+
+def stats() -> list[dict[str, Any]]:
+    with _instances_lock:
+        pools = list(_instances.values())
+    return [item for pool in pools for item in pool.stats()]
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping
+
+from .config_loader import RateLimitConfig
+
+
+class _Bucket:
+    """Token bucket that allows a negative balance: reserve() returns how long the caller must wait."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.balance = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.balance = min(self.capacity, self.balance + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # 单次请求超过整个桶容量时按满桶计，避免永远等不到
+        self.balance -= min(float(amount), self.capacity)
+        if self.balance >= 0:
+            return 0.0
+        return -self.balance / self.rate
+
+    def refund(self, amount: float) -> None:
+        self.balance = min(self.capacity, self.balance + float(amount))
+
+
+class RateLimiter:
+    """Requests-per-minute + tokens-per-minute limiter shared by every LLMClient call to one upstream."""
+
+    def __init__(self, cfg: RateLimitConfig):
+        self._lock = threading.Lock()
+        self._requests = _Bucket(cfg.requests_per_minute) if cfg.requests_per_minute > 0 else None
+        self._tokens = _Bucket(cfg.tokens_per_minute) if cfg.tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """Take one request and estimated_tokens from the buckets; return seconds to sleep before sending."""
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self._paused_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(estimated_tokens, now))
+            if wait > 0:
+                self.waits += 1
+                self.waited_seconds += wait
+            return wait
+
+    def settle(self, estimated_tokens: int, actual_tokens: int | None) -> None:
+        """Correct the token bucket once the provider reports real usage."""
+        if self._tokens is None or actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens.refund(estimated_tokens - int(actual_tokens))
+
+    def pause(self, seconds: float) -> None:
+        """Server said 'slow down': hold every caller of this upstream, not just the one that got the 429."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests_per_minute": self._requests.capacity if self._requests else None,
+                "tokens_per_minute": self._tokens.capacity if self._tokens else None,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            }
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+
+def _parse_duration(value: str) -> float | None:
+    s = value.strip().lower()
+    if not s:
+        return None
+    try:
+        return max(0.0, float(s))
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(s)
+    if not parts or "".join(n + u for n, u in parts) != s.replace(" ", ""):
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * scale[u] for n, u in parts)
+
+
+def retry_after_seconds(headers: Mapping[str, str] | None) -> float | None:
+    """Server-provided wait hint from Retry-After / x-ratelimit-reset-* headers (largest one wins)."""
+    if not headers:
+        return None
+    hints: list[float] = []
+
+    raw = headers.get("retry-after")
+    if raw:
+        parsed = _parse_duration(raw)
+        if parsed is None:
+            try:
+                parsed = max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+            except Exception:
+                parsed = None
+        if parsed is not None:
+            hints.append(parsed)
+
+    raw_ms = headers.get("retry-after-ms")
+    if raw_ms:
+        try:
+            hints.append(max(0.0, float(raw_ms) / 1000.0))
+        except ValueError:
+            pass
+
+    for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens", "x-ratelimit-reset"):
+        raw = headers.get(name)
+        if raw:
+            parsed = _parse_duration(raw)
+            if parsed is not None:
+                hints.append(parsed)
+
+    return max(hints) if hints else None
+
+
+def jittered(wait: float, *, jitter: str) -> float:
+    if jitter == "full":
+        return random.uniform(0.0, max(0.0, wait))
+    return wait
+
+
+_instances_lock = threading.Lock()
+_instances: dict[str, RateLimiter] = {}
+
+
+def get_limiter(key: str, cfg: RateLimitConfig) -> RateLimiter | None:
+    if cfg.requests_per_minute <= 0 and cfg.tokens_per_minute <= 0:
+        return None
+    with _instances_lock:
+        limiter = _instances.get(key)
+        if limiter is None:
+            limiter = RateLimiter(cfg)
+            _instances[key] = limiter
+        return limiter
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    with _instances_lock:
+        items = list(_instances.items())
+    return {key: limiter.stats() for key, limiter in items}
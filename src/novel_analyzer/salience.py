@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+from typing import Iterable
+
+from .config_loader import SalienceConfig
+from .mapped_text import NovelText, text_blocks
+
+
+# 对白归属：“X说/道/问…”前面的 2-3 个汉字大概率是人名
+_SPEAKER_RE = re.compile(r"([一-鿿]{2,3})(?:说|道|问|笑|喊|叫|低声|轻声|心想|看着|点头|摇头)")
+_NAME_STOPWORDS = frozenset({"他们", "她们", "我们", "你们", "自己", "这时", "然后", "于是", "突然", "一边", "不禁", "忍不住"})
+
+
+def candidate_names(text: NovelText, *, limit: int, min_count: int) -> list[str]:
+    counts: Counter[str] = Counter()
+    for _, block in text_blocks(text):
+        counts.update(_SPEAKER_RE.findall(block))
+    return [
+        name
+        for name, n in counts.most_common(limit * 2)
+        if n >= min_count and name not in _NAME_STOPWORDS
+    ][:limit]
+
+
+def _bucket_hits(text: NovelText, pattern: re.Pattern[str], bucket: int, buckets: int) -> list[int]:
+    """Match counts per bucket: match starts are collected per block, then counted with one bisect per bucket."""
+    starts: list[int] = []
+    for base, block in text_blocks(text):
+        starts.extend(base + m.start() for m in pattern.finditer(block))
+    edges = [bisect_left(starts, i * bucket) for i in range(buckets + 1)]
+    return [hi - lo for lo, hi in zip(edges, edges[1:])]
+
+
+def _alternation(terms: Iterable[str]) -> re.Pattern[str] | None:
+    unique = sorted({t for t in terms if t}, key=len, reverse=True)
+    if not unique:
+        return None
+    return re.compile("|".join(re.escape(t) for t in unique))
+
+
+def select_windows(
+    text: NovelText,
+    *,
+    window_chars: int,
+    count: int,
+    cfg: SalienceConfig,
+    names: Iterable[str] = (),
+) -> list[tuple[int, int]]:
+    """Top-count non-overlapping windows by lexicon + name density, returned in text order.
+
+    Matches are counted per bucket (a quarter window) with one regex pass per term class, and
+    window scores are differences of a prefix sum over the buckets, so scoring stays linear in the text.
+    Returns [] when nothing in the text matches.
+    """
+    if count <= 0 or window_chars <= 0 or len(text) <= window_chars:
+        return []
+
+    bucket = max(1, window_chars // 4)
+    per_window = max(1, window_chars // bucket)
+    buckets = (len(text) + bucket - 1) // bucket
+
+    scores = [0.0] * buckets
+    lexicon = _alternation(cfg.lexicon)
+    if lexicon is not None:
+        weight = float(cfg.lexicon_weight)
+        scores = [score + n * weight for score, n in zip(scores, _bucket_hits(text, lexicon, bucket, buckets))]
+    all_names = list(names) or candidate_names(text, limit=int(cfg.max_names), min_count=int(cfg.min_name_count))
+    name_re = _alternation(all_names)
+    if name_re is not None:
+        weight = float(cfg.name_weight)
+        scores = [score + n * weight for score, n in zip(scores, _bucket_hits(text, name_re, bucket, buckets))]
+
+    # 前缀和：窗口分数 = prefix[s + per_window] - prefix[s]（末尾不足一个窗口的按实际桶数）
+    prefix = [0.0, *accumulate(scores)]
+    starts = max(1, buckets - per_window + 1)
+    window_scores = [
+        (total, s)
+        for s, total in enumerate(prefix[min(s + per_window, buckets)] - prefix[s] for s in range(starts))
+        if total > 0
+    ]
+    if not window_scores:
+        return []
+
+    # 分数相同时优先靠前的窗口，保证结果稳定
+    window_scores.sort(key=lambda item: (-item[0], item[1]))
+    taken: list[int] = []
+    for _, s in window_scores:
+        if all(abs(s - t) >= per_window for t in taken):
+            taken.append(s)
+            if len(taken) >= count:
+                break
+    return [(s * bucket, min(len(text), s * bucket + window_chars)) for s in sorted(taken)]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, TypeVar
+
+from pydantic import BaseModel
+
+from . import observability
+
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class _LeaderCancelled(Exception):
+    """The call being waited on was cancelled by its own caller; followers retry instead of failing."""
+
+
+class SingleFlight:
+    """Coalesces concurrent identical section calls into one upstream call.
+
+    The first caller for a key runs the call; callers that arrive while it is in flight wait for
+    its validated result (a deep copy each, so they can be mutated independently) or its error.
+    Waiting goes through concurrent.futures, so the blocking path (one event loop per call, in
+    worker threads) and the async path coalesce with each other.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: dict[str, concurrent.futures.Future] = {}
+        self._counts: dict[str, dict[str, int]] = {}
+
+    async def do(self, key: str, section: str, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            with self._lock:
+                counts = self._counts.setdefault(section, {"calls": 0, "coalesced": 0, "leader_cancelled": 0})
+                counts["calls"] += 1
+                fut = self._inflight.get(key)
+                leader = fut is None
+                if leader:
+                    fut = concurrent.futures.Future()
+                    self._inflight[key] = fut
+                else:
+                    counts["coalesced"] += 1
+
+            if leader:
+                return await self._lead(key, section, fut, fn)
+
+            observability.coalesced(section=section)
+            try:
+                # shield：跟随者被取消时不能连带取消共享的 future
+                out = await asyncio.shield(asyncio.wrap_future(fut))
+            except _LeaderCancelled:
+                with self._lock:
+                    counts["calls"] -= 1
+                    counts["coalesced"] -= 1
+                continue
+            return out.model_copy(deep=True)
+
+    async def _lead(self, key: str, section: str, fut: concurrent.futures.Future, fn: Callable[[], Awaitable[T]]) -> T:
+        try:
+            out = await fn()
+        except asyncio.CancelledError:
+            self._finish(key, section, fut, error=_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._finish(key, section, fut, error=e)
+            raise
+        self._finish(key, section, fut, result=out)
+        return out
+
+    def _finish(
+        self,
+        key: str,
+        section: str,
+        fut: concurrent.futures.Future,
+        *,
+        result: Any = None,
+        error: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+            if isinstance(error, _LeaderCancelled):
+                self._counts[section]["leader_cancelled"] += 1
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._inflight),
+                "sections": {section: dict(counts) for section, counts in self._counts.items()},
+            }
+
+
+_instance_lock = threading.Lock()
+_instance: SingleFlight | None = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = SingleFlight()
+        return _instance
+
+
+def stats() -> dict[str, Any]:
+    with _instance_lock:
+        instance = _instance
+    return instance.stats() if instance is not None else {"in_flight": 0, "sections": {}}
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import math
+
+from .config_loader import TokenBudgetConfig
+
+
+_DEFAULT = TokenBudgetConfig()
+
+
+def estimate_tokens(text: str, cfg: TokenBudgetConfig = _DEFAULT) -> int:
+    """Offline token estimate calibrated per script: wide (CJK) chars vs narrow (ASCII) chars.
+
+    Counting is done on the UTF-8 byte length, which the C encoder computes without a Python
+    loop: ASCII is 1 byte and CJK is 3, so (bytes - chars) / 2 approximates the wide-char count.
+    """
+    if not text:
+        return 0
+    return estimate_tokens_from_sizes(len(text), len(text.encode("utf-8")), cfg)
+
+
+def estimate_tokens_from_sizes(chars: int, utf8_bytes: int, cfg: TokenBudgetConfig = _DEFAULT) -> int:
+    """estimate_tokens() for text known only by its char and UTF-8 byte counts (e.g. a mapped file)."""
+    if chars <= 0:
+        return 0
+    wide = min(chars, max(0, (utf8_bytes - chars) // 2))
+    narrow = chars - wide
+    return int(math.ceil(wide * float(cfg.cjk_tokens_per_char) + narrow / max(0.1, float(cfg.ascii_chars_per_token))))
+
+
+def context_tokens(cfg: TokenBudgetConfig, model: str | None) -> int:
+    """Context window for model (exact name, then longest configured prefix), or the default."""
+    if model:
+        if model in cfg.context_tokens:
+            return int(cfg.context_tokens[model])
+        prefixes = [name for name in cfg.context_tokens if model.startswith(name)]
+        if prefixes:
+            return int(cfg.context_tokens[max(prefixes, key=len)])
+    return int(cfg.default_context_tokens)
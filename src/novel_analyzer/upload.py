@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import codecs
+import hashlib
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import IO, Awaitable, Callable
+
+
+# 与前端 decodeTextFile 相同的判定顺序：BOM → 严格 UTF-8 → GB18030（容错）
+MODES = ("auto", "utf-8", "gb18030")
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_SNIFF_BYTES = 4096
+_READ_CHUNK = 1 << 20
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+@dataclass
+class SpooledNovel:
+    """Normalized UTF-8 text in a spooled temp file (rewound), plus its SHA-256 and sizes."""
+
+    file: IO[bytes]
+    sha256: str
+    size_bytes: int
+    chars: int
+    encoding: str
+    source_bytes: int
+
+    def read_text(self) -> str:
+        self.file.seek(0)
+        return self.file.read().decode("utf-8")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _sniff_utf16(sample: bytes) -> str | None:
+    """UTF-16 without a BOM: the NUL high bytes of ASCII (newlines, punctuation) all sit on one parity.
+
+    UTF-8 and GB18030 text never contains NUL, so a handful of them is already a strong signal.
+    """
+    even = sample[0::2].count(0)
+    odd = sample[1::2].count(0)
+    if even + odd < 4:
+        return None
+    if odd >= 9 * even:
+        return "utf-16-le"
+    if even >= 9 * odd:
+        return "utf-16-be"
+    return None
+
+
+class IncrementalSpooler:
+    """Decode an upload of unknown encoding chunk by chunk into a UTF-8 spool file.
+
+    Nothing larger than one chunk is held as a str. In auto mode without a BOM the stream is decoded as
+    strict UTF-8 while the raw bytes are spooled alongside; the first invalid sequence restarts the
+    output from the raw spool as GB18030, so the result matches whole-file detection. Line endings are
+    kept as-is, so the hash equals novel_store.content_id() of the same text uploaded as JSON.
+    """
+
+    def __init__(self, *, mode: str = "auto", spool_max_bytes: int = 16 << 20, max_bytes: int = 0):
+        mode = (mode or "auto").strip().lower()
+        if mode not in MODES:
+            raise ValueError(f"不支持的编码模式：{mode}（可选 {', '.join(MODES)}）")
+        self._mode = mode
+        self._spool_max_bytes = max(0, int(spool_max_bytes))
+        self._max_bytes = max(0, int(max_bytes))
+        self._out: IO[bytes] = SpooledTemporaryFile(max_size=self._spool_max_bytes)
+        self._raw: IO[bytes] | None = None
+        self._head = b""
+        self._decoder: codecs.IncrementalDecoder | None = None
+        self._sha = hashlib.sha256()
+        self._size_bytes = 0
+        self._chars = 0
+        self.encoding = ""
+        self.source_bytes = 0
+
+    def feed(self, data: bytes) -> None:
+        self.source_bytes += len(data)
+        if self._max_bytes and self.source_bytes > self._max_bytes:
+            self.close()
+            raise UploadTooLargeError(f"文件过大：超过 {self._max_bytes // (1024 * 1024)} MB 上限")
+        if self._decoder is None:
+            self._head += data
+            if len(self._head) >= _SNIFF_BYTES:
+                self._start(final=False)
+            return
+        self._decode(data, final=False)
+
+    def finish(self) -> SpooledNovel:
+        if self._decoder is None:
+            self._start(final=True)
+        else:
+            self._decode(b"", final=True)
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        self._out.seek(0)
+        return SpooledNovel(
+            file=self._out,
+            sha256=self._sha.hexdigest(),
+            size_bytes=self._size_bytes,
+            chars=self._chars,
+            encoding=self.encoding,
+            source_bytes=self.source_bytes,
+        )
+
+    def close(self) -> None:
+        self._out.close()
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def _start(self, *, final: bool) -> None:
+        head, self._head = self._head, b""
+        errors = "replace"
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                head = head[len(bom):]
+                break
+        else:
+            encoding = self._mode if self._mode != "auto" else (_sniff_utf16(head[:_SNIFF_BYTES]) or "")
+            if not encoding:
+                encoding, errors = "utf-8", "strict"
+                self._raw = SpooledTemporaryFile(max_size=self._spool_max_bytes)
+        self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+        self._decode(head, final=final)
+
+    def _decode(self, data: bytes, *, final: bool) -> None:
+        assert self._decoder is not None
+        if self._raw is not None:
+            self._raw.write(data)
+        try:
+            text = self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            self._fallback(final=final)
+            return
+        self._emit(text)
+
+    def _fallback(self, *, final: bool) -> None:
+        raw, self._raw = self._raw, None
+        assert raw is not None
+        self._out.seek(0)
+        self._out.truncate()
+        self._sha = hashlib.sha256()
+        self._size_bytes = 0
+        self._chars = 0
+        self.encoding = "gb18030"
+        self._decoder = codecs.getincrementaldecoder("gb18030")(errors="replace")
+        raw.seek(0)
+        for block in iter(lambda: raw.read(_READ_CHUNK), b""):
+            self._emit(self._decoder.decode(block))
+        raw.close()
+        if final:
+            self._emit(self._decoder.decode(b"", True))
+
+    def _emit(self, text: str) -> None:
+        if not text:
+            return
+        data = text.encode("utf-8")
+        self._out.write(data)
+        self._sha.update(data)
+        self._size_bytes += len(data)
+        self._chars += len(text)
+
+
+async def spool_upload(
+    read: Callable[[int], Awaitable[bytes]],
+    *,
+    mode: str = "auto",
+    spool_max_bytes: int = 16 << 20,
+    max_bytes: int = 0,
+    chunk_bytes: int = _READ_CHUNK,
+) -> SpooledNovel:
+    """Drain read(n) (e.g. UploadFile.read) through an IncrementalSpooler."""
+    spooler = IncrementalSpooler(mode=mode, spool_max_bytes=spool_max_bytes, max_bytes=max_bytes)
+    try:
+        while True:
+            data = await read(chunk_bytes)
+            if not data:
+                break
+            spooler.feed(data)
+        return spooler.finish()
+    except BaseException:
+        spooler.close()
+        raise
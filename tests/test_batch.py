@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import batch
+from novel_analyzer.config_loader import IncrementalConfig, load_llm_config
+from test_full_pipeline import _FakeClient
+
+
+def _cfg(tmp_path):
+    cfg = load_llm_config(REPO_ROOT)
+    return replace(cfg, incremental=IncrementalConfig(enabled=True, path=str(tmp_path / "analyses.sqlite3")))
+
+
+def _library(tmp_path) -> Path:
+    root = tmp_path / "novels"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_text("第1章 开始\n甲走进教室。\n", encoding="utf-8")
+    (root / "b.txt").write_bytes("第1章 雨夜\n乙撑着伞。\n".encode("gb18030"))
+    (root / "sub" / "c.txt").write_text("第1章 重逢\n丙回到故乡。\n", encoding="utf-8")
+    (root / "notes.md").write_text("不是小说", encoding="utf-8")
+    return root
+
+
+def _run(client, cfg, root, tmp_path, **kwargs):
+    log = io.StringIO()
+    summary = asyncio.run(
+        batch.run_batch(
+            client,
+            cfg,
+            root,
+            out_path=tmp_path / "out" / "results.jsonl",
+            manifest_path=tmp_path / "out" / "results.manifest.jsonl",
+            log=log,
+            **kwargs,
+        )
+    )
+    return summary, log.getvalue()
+
+
+def _results(tmp_path) -> list[dict]:
+    return [json.loads(line) for line in (tmp_path / "out" / "results.jsonl").read_text(encoding="utf-8").splitlines()]
+
+
+def test_batch_writes_results_and_resumes(tmp_path):
+    cfg = _cfg(tmp_path)
+    root = _library(tmp_path)
+    client = _FakeClient()
+
+    summary, log = _run(client, cfg, root, tmp_path, concurrency=2)
+
+    assert (summary["done"], summary["failed"], summary["skipped"]) == (3, 0, 0)
+    results = {r["path"]: r for r in _results(tmp_path)}
+    assert set(results) == {"a.txt", "b.txt", "sub/c.txt"}
+    assert all(r["status"] == "ok" and set(r["sections"]) == set(batch.SECTIONS) for r in results.values())
+    assert results["b.txt"]["encoding"] == "gb18030"
+    assert results["a.txt"]["sections"]["core"]["characters"][0]["name"] == "甲"
+    assert "预计剩余" in log
+
+    # 重跑：全部跳过，不再调用模型
+    rerun = _FakeClient()
+    summary, _ = _run(rerun, cfg, root, tmp_path)
+    assert (summary["done"], summary["skipped"]) == (0, 3)
+    assert rerun.prompts == {}
+
+    # 修改过的文件重新分析
+    (root / "a.txt").write_text("第1章 开始\n甲走进教室。\n第2章 放学\n甲回家。\n", encoding="utf-8")
+    summary, _ = _run(_FakeClient(), cfg, root, tmp_path)
+    assert (summary["done"], summary["skipped"]) == (1, 2)
+    assert [r["path"] for r in _results(tmp_path)][-1] == "a.txt"
+
+
+def test_partial_failures_are_retried_on_resume(tmp_path):
+    cfg = _cfg(tmp_path)
+    root = _library(tmp_path)
+
+    summary, _ = _run(_FakeClient(fail={"core"}), cfg, root, tmp_path, sections=("core", "thunder"))
+    assert summary["failed"] == 3
+    result = _results(tmp_path)[0]
+    assert result["status"] == "error"
+    assert set(result["errors"]) == {"core", "thunder"}
+    assert result["errors"]["thunder"] == "core 未通过校验，跳过"
+
+    client = _FakeClient()
+    summary, _ = _run(client, cfg, root, tmp_path, sections=("core", "thunder"))
+    assert (summary["done"], summary["failed"]) == (3, 0)
+    assert set(client.prompts) == {"core", "thunder"}
+
+
+def test_progress_reports_throughput_and_eta():
+    now = [0.0]
+    progress = batch.Progress(10, clock=lambda: now[0])
+    for _ in range(2):
+        progress.record(batch.NovelResult(path="x.txt", status="ok", chars=30_000))
+    now[0] = 60.0
+
+    snap = progress.snapshot()
+    assert snap["novels_per_minute"] == 2.0
+    assert snap["chars_per_second"] == 1000
+    assert snap["eta_seconds"] == 240.0
+    assert "预计剩余 4m00s" in progress.line()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import capabilities
+from novel_analyzer.capabilities import CapabilityRegistry
+from novel_analyzer.config_loader import CapabilitiesConfig
+from novel_analyzer.llm_client import LLMClient, LLMRuntime
+from novel_analyzer.schemas import MetaOutput
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def test_registry_persists_across_instances(tmp_path):
+    cfg = CapabilitiesConfig(path=str(tmp_path / "caps.json"), ttl_seconds=3600)
+
+    CapabilityRegistry(cfg).set("https://api.example.com/v1", "m", capabilities.PROTOCOL, "legacy")
+    reloaded = CapabilityRegistry(cfg)
+
+    assert reloaded.get("https://api.example.com/v1", "m", capabilities.PROTOCOL) == "legacy"
+    assert reloaded.get("https://api.example.com/v1", "other", capabilities.PROTOCOL) is None
+
+
+def test_registry_entries_expire(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(capabilities.time, "time", lambda: now[0])
+    registry = CapabilityRegistry(CapabilitiesConfig(path=str(tmp_path / "caps.json"), ttl_seconds=60))
+
+    registry.set("https://api.example.com/v1", "m", capabilities.STREAM, False)
+    assert registry.get("https://api.example.com/v1", "m", capabilities.STREAM) is False
+
+    now[0] += 61
+    assert registry.get("https://api.example.com/v1", "m", capabilities.STREAM) is None
+
+
+def test_registry_writes_file_only_when_a_value_changes(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(capabilities.time, "time", lambda: now[0])
+    registry = CapabilityRegistry(CapabilitiesConfig(path=str(tmp_path / "caps.json"), ttl_seconds=60))
+    saves: list[int] = []
+    save = registry._save
+    monkeypatch.setattr(registry, "_save", lambda: (saves.append(1), save()))
+
+    registry.set("https://api.example.com/v1", "m", capabilities.PROTOCOL, "tools")
+    registry.set("https://api.example.com/v1", "m", capabilities.PROTOCOL, "tools")
+    assert len(saves) == 1
+
+    now[0] += 61
+    assert registry.get("https://api.example.com/v1", "m", capabilities.PROTOCOL) is None
+    assert len(saves) == 1
+
+    registry.set("https://api.example.com/v1", "m", capabilities.PROTOCOL, "legacy")
+    assert len(saves) == 2
+    assert json.loads((tmp_path / "caps.json").read_text(encoding="utf-8"))["https://api.example.com/v1|m"]["protocol"]["value"] == "legacy"
+    assert [p.name for p in tmp_path.iterdir()] == ["caps.json"]
+
+
+def test_async_calls_record_capabilities_off_the_event_loop(monkeypatch, tmp_path):
+    caps_cfg = CapabilitiesConfig(path=str(tmp_path / "caps.json"), ttl_seconds=3600)
+    cfg = replace(_make_cfg(repair_enabled=False), capabilities=caps_cfg)
+    client = LLMClient(LLMRuntime(api_url="http://caps.example.com/v1", api_key="sk", model="m"), cfg)
+    args = {"novel_info": None, "summary": "能力"}
+    data = {"choices": [{"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}]}
+
+    async def fake_apost(url, headers=None, json=None, timeout=None):
+        return _FakeResponse(200, text="{}", json_obj=data)
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "apost", fake_apost)
+    registry = capabilities.get_registry(caps_cfg)
+    writers: list[threading.Thread] = []
+    set_ = registry.set
+    monkeypatch.setattr(registry, "set", lambda *a: (writers.append(threading.current_thread()), set_(*a)))
+
+    async def run():
+        for prompt in ("A", "B"):
+            await client.acall_section(section="meta", prompt=prompt, output_model=MetaOutput)
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+
+    # 第二次调用取值未变，不再写入
+    assert len(writers) == 1
+    assert writers[0] is not loop_thread
+    assert registry.get("http://caps.example.com/v1", "m", capabilities.PROTOCOL) == "tools"
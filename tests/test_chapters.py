@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+TESTS_DIR = Path(__file__).resolve().parent
+if str(TESTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TESTS_DIR))
+
+
+from novel_analyzer import pipeline
+from novel_analyzer.chapters import build_chapter_index, chapter_count
+from novel_analyzer.content_processor import prepare_content
+
+from test_content_processor import _make_cfg
+
+
+def _novel(chapters: int, body: str = "他们在城里走了很久。", repeat: int = 40) -> str:
+    parts = ["序言：这是一部测试小说。\n"]
+    for i in range(1, chapters + 1):
+        parts.append(f"第{i}章 标题{i}\n" + (body * repeat) + "\n")
+    return "".join(parts)
+
+
+def test_chapter_index_offsets_cover_text():
+    text = _novel(3)
+    chapters = build_chapter_index(text)
+
+    assert [c.title for c in chapters] == ["", "第1章 标题1", "第2章 标题2", "第3章 标题3"]
+    assert chapters[0].start == 0 and chapters[-1].end == len(text)
+    assert all(a.end == b.start for a, b in zip(chapters, chapters[1:]))
+    assert chapter_count(chapters) == 3
+
+    # 分卷后章节号从 1 重新开始；同一章拆成上/下两段只算一次
+    volumes = "第一卷\n第1章 起\n甲。\n第2章 承上\n乙。\n第2章 承下\n丙。\n第二卷\n第1章 转\n丁。\n第2章 合\n戊。\n"
+    assert chapter_count(build_chapter_index(volumes)) == 4
+
+    english = "Chapter 1 Start\nfoo.\nChapter 2 Next\nbar.\n"
+    assert chapter_count(build_chapter_index(english)) == 2
+    assert build_chapter_index("没有章节的文本。") == []
+
+
+def test_per_chapter_head_spreads_budget_across_chapters():
+    text = _novel(10)
+    cfg = _make_cfg(max_chars=2000, strategy="per_chapter_head")
+    cfg = replace(cfg, content_processing=replace(cfg.content_processing, chapter_min_chars=100))
+
+    out = prepare_content(text, cfg, section="core")
+
+    assert len(out) <= 2000
+    assert all(f"第{i}章" in out for i in range(1, 11))
+
+
+def test_chapter_stratified_groups_chapters_when_budget_is_small():
+    text = _novel(40)
+    cfg = _make_cfg(max_chars=1500, strategy="chapter_stratified")
+    cfg = replace(cfg, content_processing=replace(cfg.content_processing, chapter_min_chars=200))
+
+    out = prepare_content(text, cfg, section="core")
+
+    assert len(out) <= 1500
+    sampled = [i for i in range(1, 41) if f"第{i}章 " in out]
+    assert 2 <= len(sampled) < 40
+    assert sampled[-1] > 30
+
+
+def test_meta_chapter_count_comes_from_index():
+    from novel_analyzer.config_loader import load_llm_config
+
+    class _Client:
+        async def acall_section(self, *, section, prompt, output_model, bypass_cache=False, on_progress=None):
+            return output_model.model_validate(
+                {
+                    "novel_info": {"world_setting": "现代", "world_tags": [], "chapter_count": 1, "is_completed": False},
+                    "summary": "摘要",
+                }
+            )
+
+    out = asyncio.run(pipeline.run_section(_Client(), load_llm_config(REPO_ROOT), "meta", _novel(7, repeat=2)))
+    assert out.novel_info.chapter_count == 7
+
+    two_volumes = _novel(7, repeat=2) + "第二卷\n" + _novel(5, repeat=2)
+    out = asyncio.run(pipeline.run_section(_Client(), load_llm_config(REPO_ROOT), "meta", two_volumes))
+    assert out.novel_info.chapter_count == 12
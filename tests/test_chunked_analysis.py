@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import pipeline
+from novel_analyzer.config_loader import ChunkingConfig, load_llm_config
+from novel_analyzer.content_processor import split_chunks
+from novel_analyzer.llm_client import LLMClientError
+
+
+def _character(name: str, identity: str) -> dict:
+    return {
+        "name": name,
+        "gender": "male",
+        "identity": identity,
+        "personality": "内向",
+        "sexual_preferences": "未知",
+    }
+
+
+class _ChunkClient:
+    """Returns a core output naming whichever markers appear in the chunk it was given."""
+
+    def __init__(self):
+        self.prompts: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def acall_section(self, *, section, prompt, output_model, bypass_cache=False, on_progress=None):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if "坏块" in prompt:
+            raise LLMClientError("core 调用失败")
+        characters = [_character("甲", "学生")]
+        relationships = []
+        if "乙出场" in prompt:
+            characters.append(_character("乙", "甲的同班同学，转学生"))
+            relationships.append({"from": "甲", "to": "乙", "type": "同学", "start_way": "转学", "description": "同班"})
+        return output_model.model_validate({"characters": characters, "relationships": relationships})
+
+
+def _cfg(*, max_chunks: int = 0):
+    cfg = load_llm_config(REPO_ROOT)
+    cp = replace(
+        cfg.content_processing,
+        max_chars=400,
+        chunking=ChunkingConfig(enabled=True, max_chunks=max_chunks, concurrency=2),
+    )
+    return replace(cfg, content_processing=cp)
+
+
+def test_split_chunks_covers_text_on_sentence_boundaries():
+    text = "这是一句话。" * 200
+    spans = split_chunks(text, 100, 30)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(a[1] == b[0] for a, b in zip(spans, spans[1:]))
+    assert all(end - start <= 100 for start, end in spans)
+    assert all(text[end - 1] == "。" for _, end in spans)
+
+
+def test_core_runs_per_chunk_and_merges_entities():
+    text = ("甲在教室里看书。" * 60) + ("乙出场了。" * 60) + ("甲回家。" * 150) + ("坏块。" * 60) + ("甲回家。" * 60)
+    client = _ChunkClient()
+
+    out = asyncio.run(pipeline.run_section(client, _cfg(), "core", text))
+
+    assert len(client.prompts) > 2
+    assert client.max_in_flight <= 2
+    assert [c.name for c in out.characters] == ["甲", "乙"]
+    assert len(out.relationships) == 1
+    # 去重后保留信息最完整的一份
+    assert out.characters[1].identity == "甲的同班同学，转学生"
+
+
+def test_max_chunks_samples_evenly_including_ends():
+    text = "一句话。" * 2000
+    spans = pipeline.plan_chunks(_cfg(max_chunks=3), "core", text)
+
+    assert spans is not None and len(spans) == 3
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(text)
+    assert pipeline.plan_chunks(_cfg(), "meta", text) is None
+
+
+def test_parallel_sections_share_one_chunk_limit_and_skip_document_cache():
+    from novel_analyzer import content_processor
+
+    text = ("甲在教室里看书。" * 60) + ("乙出场了。" * 60) + ("甲回家。" * 150)
+    client = _ChunkClient()
+    cfg = _cfg()
+    before = set(content_processor._DOCUMENTS._items)
+
+    async def run():
+        return await asyncio.gather(*(pipeline.run_section(client, cfg, "core", text) for _ in range(3)))
+
+    asyncio.run(run())
+
+    assert len(client.prompts) > 6
+    assert client.max_in_flight <= 2
+    # 只有整本书进入文档缓存，分块切片不占位
+    assert len(set(content_processor._DOCUMENTS._items) - before) <= 1
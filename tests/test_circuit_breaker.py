@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+TESTS_DIR = Path(__file__).resolve().parent
+if str(TESTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TESTS_DIR))
+
+
+from novel_analyzer import circuit_breaker
+from novel_analyzer.config_loader import CircuitBreakerConfig
+from novel_analyzer.llm_client import CircuitOpenError, LLMClient, LLMClientError, LLMRuntime
+from novel_analyzer.schemas import MetaOutput
+
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    cfg = CircuitBreakerConfig(enabled=True, min_requests=2, failure_rate_threshold=0.5, open_seconds=30)
+    breaker = circuit_breaker.CircuitBreaker("u|m", cfg)
+
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == circuit_breaker.OPEN
+    assert breaker.allow() == 30
+
+    # 熔断期过后进入半开，只放行一个探测请求
+    now[0] += 30
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert breaker.allow() is None
+    assert breaker.allow() is not None
+
+    breaker.record(True)
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.allow() is None
+
+
+def test_open_breaker_fails_fast_without_network(monkeypatch):
+    runtime = LLMRuntime(api_url="http://down.example.com/v1", api_key="sk", model="m")
+    base_cfg = _make_cfg()
+    cfg = replace(
+        base_cfg,
+        defaults=replace(
+            base_cfg.defaults,
+            circuit_breaker=CircuitBreakerConfig(enabled=True, min_requests=2, open_seconds=60),
+        ),
+    )
+    client = LLMClient(runtime, cfg)
+    calls: list[str] = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        return _FakeResponse(502, text="bad gateway")
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+
+    for _ in range(2):
+        with pytest.raises(LLMClientError):
+            client.call_section(section="meta", prompt="P", output_model=MetaOutput)
+    assert len(calls) == 2
+
+    with pytest.raises(CircuitOpenError) as exc:
+        client.call_section(section="meta", prompt="P", output_model=MetaOutput)
+    assert len(calls) == 2
+    assert 0 < exc.value.retry_after <= 60
+    assert circuit_breaker.stats()["http://down.example.com/v1|m"]["breaker"]["state"] == "open"
+
+
+def test_retry_budget_stops_retries_beyond_ratio(monkeypatch):
+    runtime = LLMRuntime(api_url="http://flaky.example.com/v1", api_key="sk", model="m")
+    base_cfg = _make_cfg()
+    cfg = replace(
+        base_cfg,
+        defaults=replace(
+            base_cfg.defaults,
+            retry=replace(base_cfg.defaults.retry, count=3, budget_ratio=0.1, budget_min_retries=1),
+        ),
+    )
+    client = LLMClient(runtime, cfg)
+    args = {"novel_info": None, "summary": "ok"}
+    data = {"choices": [{"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}]}
+    responses = [
+        _FakeResponse(503, text="busy"),
+        _FakeResponse(200, text=json.dumps(data), json_obj=data),
+        _FakeResponse(503, text="busy"),
+    ]
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        return responses.pop(0)
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+
+    # 第一次调用用掉唯一的重试额度；第二次 503 时预算耗尽，直接失败而不是继续重试
+    assert client.call_section(section="meta", prompt="A", output_model=MetaOutput).summary == "ok"
+    with pytest.raises(LLMClientError, match="503"):
+        client.call_section(section="meta", prompt="B", output_model=MetaOutput)
+    assert responses == []
+    assert circuit_breaker.stats()["http://flaky.example.com/v1|m"]["retry_budget"]["denied"] == 1
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import cleanup as cleanup_mod
+from novel_analyzer import mapped_text
+from novel_analyzer.cleanup import clean_content
+from novel_analyzer.config_loader import CleanupConfig, TokenBudgetConfig
+from novel_analyzer.mapped_text import MappedText
+
+
+CFG = CleanupConfig(enabled=True, min_repeats=3, drop_patterns=("本章完",))
+
+
+def _pirated(chapters: int = 6) -> str:
+    parts = []
+    for i in range(1, chapters + 1):
+        parts.append(
+            f"第{i}章 标题\n\n\n\n"
+            "　　天下第一小说网 免费阅读\n"
+            f"　　他们走了很久，第{i}天终于到了。。。。\n"
+            "“嗯。”\n“嗯。”\n“嗯。”\n"
+            f"　　ＡＢＣ１２３！！！！…………第{i}次\n"
+            "（本章完）\n"
+        )
+    return "".join(parts)
+
+
+def test_drops_repeated_lines_and_normalizes():
+    text = _pirated()
+    cleaned, report = clean_content(text, CFG, TokenBudgetConfig())
+
+    assert "小说网" not in cleaned and "本章完" not in cleaned
+    assert cleaned.count("“嗯。”") == 18  # 对白即使重复也保留
+    assert all(f"第{i}章 标题" in cleaned for i in range(1, 7))
+    assert "第1章 标题\n\n他们走了很久，第1天终于到了。\n" in cleaned
+    assert "ABC123！……第1次" in cleaned
+
+    assert report is not None
+    assert report.original_chars == len(text) and report.cleaned_chars == len(cleaned)
+    assert report.dropped_lines == 12 and report.boilerplate_lines == 2
+    assert report.saved_tokens > 0
+
+
+def test_disabled_is_passthrough():
+    text = _pirated()
+    assert clean_content(text, CleanupConfig(enabled=False), TokenBudgetConfig()) == (text, None)
+
+
+def test_mapped_text_matches_str(tmp_path, monkeypatch):
+    monkeypatch.setattr(mapped_text, "_BLOCK_BYTES", 97)
+    monkeypatch.setattr(cleanup_mod, "_CACHE", cleanup_mod._CleanupCache())
+    text = _pirated(20)
+    path = tmp_path / "novel.txt"
+    path.write_bytes(text.encode("utf-8"))
+
+    expected, expected_report = clean_content(text, CFG, TokenBudgetConfig())
+    cleaned, report = clean_content(MappedText(path), CFG, TokenBudgetConfig())
+
+    assert isinstance(cleaned, MappedText)
+    assert cleaned[:] == expected
+    assert report == expected_report
+
+
+def test_run_section_cleans_and_prepares_off_the_event_loop(monkeypatch):
+    from novel_analyzer import content_processor, pipeline
+    from novel_analyzer.config_loader import load_llm_config
+    from test_full_pipeline import _FakeClient
+
+    loop_thread = threading.get_ident()
+    threads: dict[str, int] = {}
+
+    def spy(name, fn):
+        def wrapper(*args, **kwargs):
+            threads[name] = threading.get_ident()
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(pipeline, "clean_content", spy("clean", pipeline.clean_content))
+    monkeypatch.setattr(pipeline, "prepare_content", spy("prepare", content_processor.prepare_content))
+
+    asyncio.run(pipeline.run_section(_FakeClient(), load_llm_config(REPO_ROOT), "meta", _pirated()))
+
+    assert set(threads) == {"clean", "prepare"}
+    assert loop_thread not in threads.values()
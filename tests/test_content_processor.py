@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import shutil
 import sys
+from dataclasses import replace
 from pathlib import Path
 
+import pytest
+
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 SRC_DIR = REPO_ROOT / "src"
@@ -12,13 +16,15 @@ if str(SRC_DIR) not in sys.path:
 
 from novel_analyzer.config_loader import (
     ContentProcessingConfig,
+    ContentProfileConfig,
     DefaultsConfig,
     LLMConfig,
     RepairConfig,
     RepairTemplateConfig,
     RetryPolicy,
+    load_llm_config,
 )
-from novel_analyzer.content_processor import prepare_content
+from novel_analyzer.content_processor import prepare_content, section_content_config
 
 
 def _make_cfg(*, max_chars: int, strategy: str, boundary_aware: bool = True) -> LLMConfig:
@@ -70,3 +76,103 @@ def test_prepare_content_head_strategy_appends_marker():
 
     assert len(out) <= 80
     assert "内容已截断" in out
+
+
+def test_boundary_index_matches_linear_scan():
+    import random
+
+    from novel_analyzer.content_processor import BoundaryIndex, _find_first_boundary, _find_last_boundary
+
+    rng = random.Random(7)
+    text = "".join(rng.choice("甲乙丙\n\n。！？.!?ab") for _ in range(3000))
+    index = BoundaryIndex(text)
+
+    for _ in range(500):
+        start = rng.randrange(0, len(text))
+        end = min(len(text), start + rng.randrange(0, 60))
+        assert _find_last_boundary(text, start, end, index) == _find_last_boundary(text, start, end)
+        assert _find_first_boundary(text, start, end, index) == _find_first_boundary(text, start, end)
+
+
+def test_prepare_content_scans_each_document_once(monkeypatch):
+    import novel_analyzer.content_processor as cp_mod
+
+    builds: list[int] = []
+    original = cp_mod.BoundaryIndex.__init__
+
+    def counting_init(self, text):
+        builds.append(len(text))
+        original(self, text)
+
+    monkeypatch.setattr(cp_mod.BoundaryIndex, "__init__", counting_init)
+
+    cfg = _make_cfg(max_chars=300, strategy="head_middle_tail", boundary_aware=True)
+    content = "只扫描一次的文档。\n" * 200
+    outs = {prepare_content(content, cfg, section=s) for s in ("meta", "core", "scenes", "thunder", "lewd_elements")}
+
+    assert len(outs) == 1
+    assert builds == [len(content)]
+
+
+def test_salience_picks_dense_windows_in_order():
+    from dataclasses import replace
+
+    from novel_analyzer.config_loader import SalienceConfig
+
+    cfg = _make_cfg(max_chars=700, strategy="salience", boundary_aware=True)
+    cfg = replace(
+        cfg,
+        content_processing=replace(
+            cfg.content_processing,
+            salience=SalienceConfig(lexicon=("拥抱",), window_chars=200, min_name_count=2),
+        ),
+    )
+    filler = "天气很好，街上没什么人。\n" * 60
+    hot_a = "小红说：“你来了。”小明笑着拥抱了她。\n" * 8
+    hot_b = "小明道：“别走。”两人再次拥抱。\n" * 8
+    content = filler + hot_a + filler + hot_b + filler
+
+    out = prepare_content(content, cfg, section="scenes")
+
+    assert len(out) <= 700
+    assert "内容已截断" in out
+    assert "小红说" in out and "两人再次拥抱" in out
+    assert out.index("小红说") < out.index("两人再次拥抱")
+    assert out.count("天气很好") < 10
+
+
+def test_salience_without_hits_falls_back_to_head_middle_tail():
+    cfg = _make_cfg(max_chars=300, strategy="salience", boundary_aware=True)
+    content = "平淡无奇的一句话。\n" * 200
+
+    assert prepare_content(content, cfg, section="meta") == prepare_content(
+        content, _make_cfg(max_chars=300, strategy="head_middle_tail"), section="meta"
+    )
+
+
+def test_section_profile_overrides_shared_settings():
+    cfg = _make_cfg(max_chars=600, strategy="head_middle_tail")
+    profiles = {"meta": ContentProfileConfig(max_chars=200, strategy="head_tail")}
+    cfg = replace(cfg, content_processing=replace(cfg.content_processing, sections=profiles))
+    content = "".join(f"第{i}句。\n" for i in range(300))
+
+    meta_cp = section_content_config(cfg, "meta")
+    assert (meta_cp.max_chars, meta_cp.strategy) == (200, "head_tail")
+    assert meta_cp.boundary_search_window == cfg.content_processing.boundary_search_window
+    assert section_content_config(cfg, "scenes") is cfg.content_processing
+
+    meta = prepare_content(content, cfg, section="meta")
+    scenes = prepare_content(content, cfg, section="scenes")
+    assert len(meta) <= 200 < len(scenes) <= 600
+    assert meta.startswith("第0句") and meta.rstrip().endswith("第299句。")
+
+
+def test_load_llm_config_rejects_unknown_section_profile(tmp_path):
+    shutil.copytree(REPO_ROOT / "config", tmp_path / "config")
+    path = tmp_path / "config" / "llm.yaml"
+    path.write_text(
+        path.read_text(encoding="utf-8").replace("    meta:\n      max_chars: 8000", "    metaa:\n      max_chars: 8000"),
+        encoding="utf-8",
+    )
+    with pytest.raises(ValueError, match="content_processing.sections.metaa"):
+        load_llm_config(tmp_path)
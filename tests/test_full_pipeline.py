@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+import backend
+from novel_analyzer.llm_client import LLMClientError
+
+
+_OUTPUTS = {
+    "meta": {
+        "novel_info": {
+            "world_setting": "现代",
+            "world_tags": [],
+            "chapter_count": 1,
+            "is_completed": False,
+            "completion_note": "",
+        },
+        "summary": "摘要",
+    },
+    "core": {
+        "characters": [
+            {
+                "name": "甲",
+                "gender": "male",
+                "identity": "学生",
+                "personality": "内向",
+                "sexual_preferences": "未知",
+            }
+        ],
+        "relationships": [],
+    },
+    "scenes": {"first_sex_scenes": [], "sex_scenes": {"total_count": 0, "scenes": []}, "evolution": []},
+    "thunder": {"thunderzones": [], "thunderzone_summary": "无"},
+    "lewd_elements": {"lewd_elements": [], "lewd_elements_summary": "无"},
+}
+
+
+class _FakeClient:
+    def __init__(self, *, fail: set[str] | None = None):
+        self.fail = fail or set()
+        self.prompts: dict[str, str] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def acall_section(self, *, section, prompt, output_model, bypass_cache=False, on_progress=None):
+        self.prompts[section] = prompt
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if section in self.fail:
+            raise LLMClientError(f"{section} 调用失败")
+        return output_model.model_validate(_OUTPUTS[section])
+
+
+def _read_events(res) -> list[dict]:
+    return [json.loads(line) for line in res.text.splitlines() if line.strip()]
+
+
+@pytest.fixture()
+def fake_client(monkeypatch, tmp_path):
+    holder: dict[str, _FakeClient] = {}
+    # 增量分析的结果库写到临时目录，避免测试之间互相当作“前一版本”
+    inc = replace(backend.LLM_CFG.incremental, path=str(tmp_path / "analyses.sqlite3"))
+    job_cfg = replace(backend.LLM_CFG.jobs, path=str(tmp_path / "jobs.sqlite3"), dir=str(tmp_path / "jobs"))
+    monkeypatch.setattr(backend, "LLM_CFG", replace(backend.LLM_CFG, incremental=inc, jobs=job_cfg))
+
+    def factory():
+        return holder["client"]
+
+    monkeypatch.setattr(backend, "_llm_client", factory)
+    return holder
+
+
+def test_full_pipeline_streams_every_section(fake_client):
+    fake_client["client"] = client = _FakeClient()
+
+    with TestClient(backend.app) as http:
+        res = http.post("/api/analyze/full", json={"content": "第1章\n甲走进教室。"})
+
+    assert res.status_code == 200
+    events = _read_events(res)
+    assert events[-1] == {"event": "done"}
+    by_section = {e["section"]: e for e in events if "section" in e}
+    assert set(by_section) == {"meta", "core", "scenes", "thunder", "lewd_elements"}
+    assert all(e["status"] == "ok" for e in by_section.values())
+    assert '"甲"' in client.prompts["scenes"]
+    assert client.max_in_flight >= 2
+
+
+def test_full_pipeline_skips_dependents_when_core_fails(fake_client):
+    fake_client["client"] = _FakeClient(fail={"core"})
+
+    with TestClient(backend.app) as http:
+        res = http.post("/api/analyze/full", json={"content": "第1章\n甲走进教室。"})
+
+    by_section = {e["section"]: e for e in _read_events(res) if "section" in e}
+    assert by_section["meta"]["status"] == "ok"
+    assert by_section["core"]["status"] == "error"
+    for section in ("scenes", "thunder", "lewd_elements"):
+        assert by_section[section]["status"] == "skipped"
+
+
+def test_sections_reference_uploaded_novel_and_reuse_session_core(fake_client):
+    fake_client["client"] = client = _FakeClient()
+
+    with TestClient(backend.app) as http:
+        uploaded = http.post("/api/novels", json={"content": "第1章\n甲走进教室。"}).json()
+        novel_id = uploaded["novel_id"]
+
+        missing_core = http.post("/api/analyze/scenes", json={"novel_id": novel_id})
+        assert missing_core.status_code == 422
+
+        core = http.post("/api/analyze/core", json={"novel_id": novel_id})
+        assert core.status_code == 200
+
+        scenes = http.post("/api/analyze/scenes", json={"novel_id": novel_id})
+        assert scenes.status_code == 200
+
+        unknown = http.post("/api/analyze/meta", json={"novel_id": "0" * 64})
+        assert unknown.status_code == 404
+
+    assert "甲走进教室" in client.prompts["scenes"]
+    assert '"甲"' in client.prompts["scenes"]
+
+
+def test_multipart_upload_decodes_on_server(fake_client, monkeypatch):
+    fake_client["client"] = client = _FakeClient()
+    cp = backend.LLM_CFG.content_processing
+    cleanup_on = replace(cp, cleanup=replace(cp.cleanup, enabled=True))
+    monkeypatch.setattr(backend, "LLM_CFG", replace(backend.LLM_CFG, content_processing=cleanup_on))
+    text = "第1章\n甲走进教室。"
+
+    with TestClient(backend.app) as http:
+        res = http.post(
+            "/api/novels/upload",
+            files={"file": ("novel.txt", text.encode("gb18030"), "text/plain")},
+        )
+        assert res.status_code == 200
+        uploaded = res.json()
+        assert uploaded["encoding"] == "gb18030"
+        assert uploaded["chars"] == len(text)
+        assert uploaded["cleanup"]["original_chars"] == len(text)
+        # 与 JSON 上传同一文本得到相同 novel_id
+        assert http.post("/api/novels", json={"content": text}).json()["novel_id"] == uploaded["novel_id"]
+
+        meta = http.post("/api/analyze/meta", json={"novel_id": uploaded["novel_id"]})
+        assert meta.status_code == 200
+
+    assert "甲走进教室" in client.prompts["meta"]
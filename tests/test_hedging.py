@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+TESTS_DIR = Path(__file__).resolve().parent
+if str(TESTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TESTS_DIR))
+
+
+from novel_analyzer import hedging
+from novel_analyzer.config_loader import HedgingConfig
+from novel_analyzer.llm_client import LLMClient, LLMRuntime
+from novel_analyzer.schemas import MetaOutput
+
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def test_hedger_budget_caps_extra_requests():
+    hedger = hedging.SectionHedger(HedgingConfig(enabled=True, min_samples=2, min_delay_seconds=0, max_extra_ratio=0.5))
+    assert hedger.delay() is None
+    hedger.observe(1.0)
+    hedger.observe(3.0)
+
+    assert hedger.delay() == 3.0
+    assert hedger.try_hedge() is True
+    assert hedger.try_hedge() is False
+    assert hedger.stats()["denied"] == 1
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled(monkeypatch):
+    runtime = LLMRuntime(api_url="http://hedge.example.com/v1", api_key="sk", model="m")
+    base_cfg = _make_cfg()
+    hedge_cfg = HedgingConfig(enabled=True, min_samples=1, min_delay_seconds=0.05, max_extra_ratio=1.0)
+    cfg = replace(base_cfg, defaults=replace(base_cfg.defaults, hedging=hedge_cfg))
+    client = LLMClient(runtime, cfg)
+
+    hedger = hedging.get_hedger("meta", hedge_cfg)
+    hedger.observe(0.05)
+
+    args = {"novel_info": None, "summary": "对冲"}
+    data = {"choices": [{"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}]}
+    calls: list[int] = []
+    cancelled: list[bool] = []
+
+    async def fake_apost(url, headers=None, json=None, timeout=None):
+        calls.append(len(calls))
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return _FakeResponse(200, text="{}", json_obj=data)
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "apost", fake_apost)
+
+    out = asyncio.run(client.acall_section(section="meta", prompt="PROMPT", output_model=MetaOutput))
+
+    assert out.summary == "对冲"
+    assert len(calls) == 2
+    assert cancelled == [True]
+    stats = hedging.stats()["meta"]
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import http_pool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if payload.get("stream"):
+            body = b"data: {\"n\": 1}\n\ndata: {\"n\": 2}\n\ndata: [DONE]\n\n"
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps({"ok": True}).encode("utf-8")
+            content_type = "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        return
+
+
+@pytest.fixture()
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    http_pool.close_all()
+
+
+def test_pool_reuses_keepalive_connection(server_url):
+    url = f"{server_url}/v1/chat/completions"
+    for _ in range(3):
+        res = http_pool.post(url, headers={}, json={"x": 1}, timeout=5)
+        assert res.status_code == 200
+
+    stats = [s for s in http_pool.stats() if s["origin"] == server_url]
+    assert len(stats) == 1
+    assert stats[0]["requests"] == 3
+    assert stats[0]["connections_opened"] == 1
+    assert stats[0]["reused"] == 2
+    assert stats[0]["open"] == 1
+    assert stats[0]["idle"] == 1
+
+
+def test_post_stream_feeds_sse_lines(server_url):
+    lines: list[str] = []
+    status, body, _ = http_pool.post_stream(
+        f"{server_url}/v1/chat/completions",
+        headers={},
+        json={"stream": True},
+        timeout=http_pool.stream_timeout(connect_seconds=5, idle_seconds=5),
+        on_line=lines.append,
+    )
+
+    assert status == 200
+    assert body is None
+    assert [line for line in lines if line] == ['data: {"n": 1}', 'data: {"n": 2}', "data: [DONE]"]
+
+
+def test_async_pool_from_a_finished_loop_is_closed_when_replaced(server_url):
+    url = f"{server_url}/v1/chat/completions"
+
+    async def call():
+        res = await http_pool.apost(url, headers={}, json={"x": 1}, timeout=5)
+        assert res.status_code == 200
+        return http_pool._async_pools[server_url]
+
+    first = asyncio.run(call())
+    sockets = [
+        c._connection._network_stream.get_extra_info("socket") for c in first._transport._pool.connections
+    ]
+    assert sockets and all(s.fileno() != -1 for s in sockets)
+
+    second = asyncio.run(call())
+
+    assert second is not first
+    assert all(s.fileno() == -1 for s in sockets)
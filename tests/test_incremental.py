@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import incremental
+from novel_analyzer.config_loader import IncrementalConfig, load_llm_config
+from novel_analyzer.novel_store import content_id
+
+
+def _novel(chapters: int) -> str:
+    return "".join(f"第{i}章 标题{i}\n" + f"角色{i}登场，和大家一起走了很久。" * 20 + "\n" for i in range(1, chapters + 1))
+
+
+class _Client:
+    """Names one character per chapter heading it sees, so merged outputs show which chapters were sent."""
+
+    def __init__(self):
+        self.prompts: dict[str, str] = {}
+
+    async def acall_section(self, *, section, prompt, output_model, bypass_cache=False, on_progress=None):
+        self.prompts[section] = prompt
+        seen = [i for i in range(1, 20) if f"第{i}章 " in prompt]
+        if section == "meta":
+            return output_model.model_validate(
+                {
+                    "novel_info": {"world_setting": "现代", "world_tags": [f"t{seen[-1]}"], "chapter_count": 1, "is_completed": False},
+                    "summary": f"摘要到第{seen[-1]}章",
+                }
+            )
+        characters = [
+            {"name": f"角色{i}", "gender": "male", "identity": "学生", "personality": "内向", "sexual_preferences": "未知"}
+            for i in seen
+        ]
+        return output_model.model_validate({"characters": characters, "relationships": []})
+
+
+def _cfg(tmp_path):
+    cfg = load_llm_config(REPO_ROOT)
+    return replace(cfg, incremental=IncrementalConfig(enabled=True, path=str(tmp_path / "a.sqlite3")))
+
+
+def _run(client, cfg, section, text):
+    return asyncio.run(incremental.run_section(client, cfg, section, text, novel_id=content_id(text)))
+
+
+def test_extension_analyses_only_new_chapters_and_merges(tmp_path):
+    cfg = _cfg(tmp_path)
+    full = _novel(5)
+    # 上次导入时第 3 章还没写完
+    partial = full[: full.index("第3章 ") + 60]
+    first = _Client()
+    _run(first, cfg, "core", partial)
+    _run(first, cfg, "meta", partial)
+
+    second = _Client()
+    core = _run(second, cfg, "core", full)
+    meta = _run(second, cfg, "meta", full)
+
+    # 旧版最后一章变长了：连同新增章节一起重新分析
+    assert "第2章 " not in second.prompts["core"]
+    assert "第3章 " in second.prompts["core"] and "第5章 " in second.prompts["core"]
+    assert [c.name for c in core.characters] == [f"角色{i}" for i in range(1, 6)]
+
+    assert "摘要到第3章" in second.prompts["meta"]
+    assert meta.summary == "摘要到第5章"
+    assert meta.novel_info.chapter_count == 5
+    assert meta.novel_info.world_tags == ["t3", "t5"]
+
+    stats = incremental.get_store(cfg.incremental).stats()
+    assert stats["incremental_runs"] == 2 and stats["full_runs"] == 2
+
+
+def test_unrelated_or_edited_novel_runs_in_full(tmp_path):
+    cfg = _cfg(tmp_path)
+    _run(_Client(), cfg, "core", _novel(3))
+
+    edited = _novel(3).replace("角色1登场", "角色1出场") + "第4章 标题4\n新内容。\n"
+    client = _Client()
+    _run(client, cfg, "core", edited)
+    assert "第1章 " in client.prompts["core"]
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+import backend
+from novel_analyzer import jobs
+from novel_analyzer.config_loader import JobsConfig, load_llm_config
+from novel_analyzer.novel_store import content_id
+from test_full_pipeline import _OUTPUTS, _FakeClient, fake_client  # noqa: F401
+
+
+TEXT = "第1章 开始\n甲走进教室。\n"
+
+
+def _cfg(tmp_path):
+    cfg = load_llm_config(REPO_ROOT)
+    return replace(
+        cfg,
+        incremental=replace(cfg.incremental, enabled=False),
+        jobs=JobsConfig(enabled=True, path=str(tmp_path / "jobs.sqlite3"), dir=str(tmp_path / "jobs"), workers=2),
+    )
+
+
+class _SlowClient(_FakeClient):
+    async def acall_section(self, **kwargs):
+        self.prompts[kwargs["section"]] = kwargs["prompt"]
+        await asyncio.sleep(30)
+
+
+async def _wait_finished(store: jobs.JobStore, job_id: str) -> dict:
+    for _ in range(500):
+        job = store.get(job_id)
+        if job["status"] not in jobs.ACTIVE:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_restart_resumes_from_checkpointed_sections(tmp_path):
+    cfg = _cfg(tmp_path)
+    store = jobs.JobStore(cfg.jobs)
+    job = store.submit(TEXT, novel_id=content_id(TEXT))
+    # 上一个进程跑完 meta/core 后崩溃：任务停在 running
+    assert store.claim()["job_id"] == job["job_id"]
+    store.checkpoint(job["job_id"], "meta", _OUTPUTS["meta"], None)
+    store.checkpoint(job["job_id"], "core", _OUTPUTS["core"], None)
+    assert store.content_path(job["novel_id"]).exists()
+
+    client = _FakeClient()
+
+    async def main():
+        runner = jobs.JobRunner(store, cfg, lambda: client)
+        runner.start()
+        try:
+            return await _wait_finished(store, job["job_id"])
+        finally:
+            await runner.stop()
+
+    done = asyncio.run(main())
+
+    assert done["status"] == "ok"
+    assert set(client.prompts) == {"scenes", "thunder", "lewd_elements"}
+    assert '"甲"' in client.prompts["scenes"]
+    assert set(done["results"]) == {"meta", "core", "scenes", "thunder", "lewd_elements"}
+    assert store.stats()["recovered"] == 1
+    assert not store.content_path(job["novel_id"]).exists()
+
+
+def test_sweep_running_during_submit_keeps_the_new_novel_file(tmp_path, monkeypatch):
+    cfg = _cfg(tmp_path)
+    store = jobs.JobStore(cfg.jobs)
+    novel_id = content_id(TEXT)
+    save_content = store._save_content
+    sweeper: list[threading.Thread] = []
+
+    def save_then_sweep(novel_id, content):
+        save_content(novel_id, content)
+        # 另一个线程里的 finish/cancel 恰好在文件已写、queued 行未插入时清理
+        t = threading.Thread(target=store._sweep_content)
+        t.start()
+        t.join(0.2)
+        sweeper.append(t)
+
+    monkeypatch.setattr(store, "_save_content", save_then_sweep)
+    job = store.submit(TEXT, novel_id=novel_id)
+    sweeper[0].join(5)
+
+    assert not sweeper[0].is_alive()
+    assert store.content_path(novel_id).exists()
+    assert store.load_content(job["novel_id"])[:] == TEXT
+
+
+def test_cancel_stops_running_job(tmp_path):
+    cfg = _cfg(tmp_path)
+    store = jobs.JobStore(cfg.jobs)
+    client = _SlowClient()
+
+    async def main():
+        runner = jobs.JobRunner(store, cfg, lambda: client)
+        runner.start()
+        try:
+            job = store.submit(TEXT, novel_id=content_id(TEXT), sections=("meta", "core"))
+            runner.notify()
+            while store.get(job["job_id"])["status"] != "running" or not client.prompts:
+                await asyncio.sleep(0.01)
+            await runner.cancel(job["job_id"])
+            await asyncio.sleep(0.05)
+            return store.get(job["job_id"])
+        finally:
+            await runner.stop()
+
+    job = asyncio.run(main())
+    assert job["status"] == "cancelled"
+    assert job["results"] == {}
+    assert store.list_jobs(status="cancelled")[0]["job_id"] == job["job_id"]
+
+
+def test_jobs_api_is_unavailable_unless_enabled(fake_client):
+    with TestClient(backend.app) as http:
+        assert http.post("/api/jobs", json={"content": TEXT}).status_code == 503
+        assert backend.JOB_RUNNER is None
+
+
+def test_jobs_api_submit_poll_list_and_cancel(fake_client, monkeypatch):
+    fake_client["client"] = _FakeClient()
+    monkeypatch.setattr(backend, "LLM_CFG", replace(backend.LLM_CFG, jobs=replace(backend.LLM_CFG.jobs, enabled=True)))
+
+    with TestClient(backend.app) as http:
+        res = http.post("/api/jobs", json={"content": TEXT, "sections": ["meta", "core"]})
+        assert res.status_code == 200
+        job_id = res.json()["job_id"]
+
+        for _ in range(500):
+            job = http.get(f"/api/jobs/{job_id}").json()
+            if job["status"] not in jobs.ACTIVE:
+                break
+            time.sleep(0.01)
+        assert job["status"] == "ok"
+        assert job["completed"] == ["meta", "core"]
+        assert job["results"]["core"]["characters"][0]["name"] == "甲"
+
+        listed = http.get("/api/jobs").json()["jobs"]
+        assert [j["job_id"] for j in listed] == [job_id]
+        assert "results" not in listed[0]
+
+        assert http.post(f"/api/jobs/{job_id}/cancel").json()["status"] == "ok"
+        assert http.get("/api/jobs/missing").status_code == 404
+        assert http.post("/api/jobs", json={"content": TEXT, "sections": ["nope"]}).status_code == 422
+        assert http.get("/api/debug/stats").json()["jobs"][-1]["ok"] == 1
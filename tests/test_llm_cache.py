@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import llm_cache, providers
+from novel_analyzer.config_loader import CacheConfig
+from novel_analyzer.llm_client import LLMClient, LLMRuntime
+from novel_analyzer.schemas import MetaOutput
+
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def _meta_response() -> _FakeResponse:
+    args = {"novel_info": None, "summary": "缓存"}
+    data = {
+        "choices": [
+            {"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}
+        ]
+    }
+    return _FakeResponse(200, text=json.dumps(data), json_obj=data)
+
+
+def test_call_section_hits_cache_and_honors_bypass(monkeypatch, tmp_path):
+    cache_cfg = CacheConfig(enabled=True, path=str(tmp_path / "cache.sqlite3"))
+    cfg = replace(_make_cfg(repair_enabled=False), cache=cache_cfg)
+    client = LLMClient(LLMRuntime(api_url="http://example.com/v1", api_key="sk", model="m"), cfg)
+
+    calls: list[dict] = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(json)
+        return _meta_response()
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+
+    first = client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput)
+    second = client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput)
+    assert first == second
+    assert len(calls) == 1
+
+    client.call_section(section="meta", prompt="OTHER", output_model=MetaOutput)
+    assert len(calls) == 2
+
+    client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput, bypass_cache=True)
+    assert len(calls) == 3
+
+    stats = llm_cache.get_cache(cache_cfg).stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+
+
+def test_failover_result_is_cached_under_the_provider_that_served_it(monkeypatch, tmp_path):
+    cache_cfg = CacheConfig(enabled=True, path=str(tmp_path / "failover.sqlite3"))
+    cfg = replace(_make_cfg(repair_enabled=False), cache=cache_cfg)
+    cfg = replace(cfg, defaults=replace(cfg.defaults, retry=replace(cfg.defaults.retry, count=2)))
+    pool = providers.ProviderPool(
+        [
+            providers.Provider(name="cache-primary", api_url="http://cache-primary.example.com/v1", api_key="sk", model="m"),
+            providers.Provider(name="cache-fallback", api_url="http://cache-fallback.example.com/v1", api_key="sk", model="m2"),
+        ]
+    )
+    client = LLMClient(pool, cfg)
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        if "cache-primary" in url:
+            return _FakeResponse(503, text="busy")
+        return _meta_response()
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.time, "sleep", lambda s: None)
+
+    assert client.call_section(section="meta", prompt="FAILOVER", output_model=MetaOutput).summary == "缓存"
+
+    cache = llm_cache.get_cache(cache_cfg)
+    tool = client._build_tool(section="meta", output_model=MetaOutput)
+    temperature = cfg.sections["meta"].temperature
+
+    def key(api_url: str, model: str) -> str:
+        return llm_cache.make_key(
+            api_url=api_url, model=model, section="meta", tool=tool, prompt="FAILOVER", temperature=temperature
+        )
+
+    assert cache.get(key("http://cache-primary.example.com/v1", "m")) is None
+    assert cache.get(key("http://cache-fallback.example.com/v1", "m2"))["summary"] == "缓存"
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = llm_cache.LLMCache(CacheConfig(enabled=True, path=str(tmp_path / "c.sqlite3"), max_entries=2))
+
+    cache.put("a", section="meta", value={"v": 1})
+    cache.put("b", section="meta", value={"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.put("c", section="meta", value={"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entries_expire(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = llm_cache.LLMCache(CacheConfig(enabled=True, path=str(tmp_path / "t.sqlite3"), ttl_seconds=60))
+
+    cache.put("a", section="meta", value={"v": 1})
+    now[0] += 61
+
+    assert cache.get("a") is None
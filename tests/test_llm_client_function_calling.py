@@ -111,7 +111,7 @@ def test_function_calling_parses_tool_calls(monkeypatch):
     import novel_analyzer.llm_client as llm_client_mod
 
     json_module = json
-    monkeypatch.setattr(llm_client_mod.requests, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
 
     out = client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput)
     assert out.summary == "好的"
@@ -122,7 +122,7 @@ def test_function_calling_parses_tool_calls(monkeypatch):
 
 
 def test_function_calling_falls_back_to_legacy_functions(monkeypatch):
-    runtime = LLMRuntime(api_url="http://example.com/v1", api_key="sk", model="m")
+    runtime = LLMRuntime(api_url="http://legacy.example.com/v1", api_key="sk", model="m")
     cfg = _make_cfg(repair_enabled=False)
     client = LLMClient(runtime, cfg)
 
@@ -163,7 +163,7 @@ def test_function_calling_falls_back_to_legacy_functions(monkeypatch):
 
     import novel_analyzer.llm_client as llm_client_mod
 
-    monkeypatch.setattr(llm_client_mod.requests, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
 
     out = client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput)
     assert out.summary == "ok"
@@ -172,6 +172,13 @@ def test_function_calling_falls_back_to_legacy_functions(monkeypatch):
     assert "tools" in calls[0]
     assert "functions" in calls[1]
 
+    # 协议已记忆：后续调用直接走 legacy，不再浪费一次 tools 请求
+    responses.append(_FakeResponse(200, text=json.dumps(legacy_data, ensure_ascii=False), json_obj=legacy_data))
+    out = client.call_section(section="meta", prompt="PROMPT2", output_model=MetaOutput)
+    assert out.summary == "ok"
+    assert len(calls) == 3
+    assert "functions" in calls[2]
+
 
 def test_meta_normalizes_null_novel_info(monkeypatch):
     runtime = LLMRuntime(api_url="http://example.com/v1", api_key="sk", model="m")
@@ -202,7 +209,7 @@ def test_meta_normalizes_null_novel_info(monkeypatch):
     import novel_analyzer.llm_client as llm_client_mod
 
     json_module = json
-    monkeypatch.setattr(llm_client_mod.requests, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
 
     out = client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput)
     assert out.summary == "ok"
@@ -232,8 +239,55 @@ def test_meta_falls_back_to_message_content_when_no_tool_calls(monkeypatch):
     import novel_analyzer.llm_client as llm_client_mod
 
     json_module = json
-    monkeypatch.setattr(llm_client_mod.requests, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
 
     out = client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput)
     assert out.summary == "这是摘要"
     assert out.novel_info.world_setting == "未知"
+
+
+def test_acall_section_uses_async_transport_and_backoff(monkeypatch):
+    import asyncio
+    from dataclasses import replace
+
+    runtime = LLMRuntime(api_url="http://example.com/v1", api_key="sk", model="m")
+    base_cfg = _make_cfg(repair_enabled=False)
+    cfg = replace(
+        base_cfg,
+        defaults=replace(
+            base_cfg.defaults,
+            retry=replace(base_cfg.defaults.retry, count=2, base_wait_seconds=0.5, max_wait_seconds=0.5),
+        ),
+    )
+    client = LLMClient(runtime, cfg)
+
+    args = {"novel_info": None, "summary": "异步"}
+    data = {
+        "choices": [
+            {"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}
+        ]
+    }
+    responses = [
+        _FakeResponse(503, text="busy"),
+        _FakeResponse(200, text=json.dumps(data), json_obj=data),
+    ]
+    sleeps: list[float] = []
+
+    async def fake_apost(url, headers=None, json=None, timeout=None):
+        return responses.pop(0)
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    def blocking_post(*args, **kwargs):
+        raise AssertionError("acall_section must not use the blocking transport")
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "apost", fake_apost)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", blocking_post)
+    monkeypatch.setattr(llm_client_mod.asyncio, "sleep", fake_sleep)
+
+    out = asyncio.run(client.acall_section(section="meta", prompt="PROMPT", output_model=MetaOutput))
+    assert out.summary == "异步"
+    assert sleeps == [0.5]
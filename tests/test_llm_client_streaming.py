@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer.config_loader import StreamingConfig
+from novel_analyzer.llm_client import LLMClient, LLMClientError, LLMRuntime, _rejects_stream
+from novel_analyzer.schemas import MetaOutput
+
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def _streaming_cfg():
+    cfg = _make_cfg(repair_enabled=False)
+    return replace(
+        cfg,
+        defaults=replace(cfg.defaults, streaming=StreamingConfig(enabled=True, progress_interval_seconds=0)),
+    )
+
+
+def _sse_lines(arguments: str) -> list[str]:
+    lines = []
+    first = {"choices": [{"delta": {"tool_calls": [{"index": 0, "function": {"name": "extract_meta", "arguments": ""}}]}}]}
+    lines.append("data: " + json.dumps(first))
+    lines.append("")
+    for i in range(0, len(arguments), 7):
+        piece = arguments[i : i + 7]
+        chunk = {"choices": [{"delta": {"tool_calls": [{"index": 0, "function": {"arguments": piece}}]}}]}
+        lines.append("data: " + json.dumps(chunk, ensure_ascii=False))
+        lines.append("")
+    lines.append("data: [DONE]")
+    return lines
+
+
+def test_streaming_assembles_tool_call_arguments_and_reports_progress(monkeypatch):
+    runtime = LLMRuntime(api_url="http://stream.example.com/v1", api_key="sk", model="m")
+    client = LLMClient(runtime, _streaming_cfg())
+
+    arguments = json.dumps({"novel_info": None, "summary": "流式摘要"}, ensure_ascii=False)
+    payloads: list[dict] = []
+
+    def fake_post_stream(url, headers=None, json=None, timeout=None, on_line=None):
+        payloads.append(json)
+        for line in _sse_lines(arguments):
+            on_line(line)
+        return 200, None, {}
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post_stream", fake_post_stream)
+
+    progress: list[dict] = []
+    out = client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput, on_progress=progress.append)
+
+    assert out.summary == "流式摘要"
+    assert payloads[0]["stream"] is True
+    assert progress and progress[-1]["done"] is True
+    assert progress[-1]["tokens"] >= 2
+    assert progress[-1]["bytes"] > len(arguments)
+
+
+def test_streaming_falls_back_when_provider_rejects_stream(monkeypatch):
+    runtime = LLMRuntime(api_url="http://nostream.example.com/v1", api_key="sk", model="m")
+    client = LLMClient(runtime, _streaming_cfg())
+
+    args = {"novel_info": None, "summary": "非流式"}
+    data = {
+        "choices": [
+            {"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}
+        ]
+    }
+    stream_calls: list[dict] = []
+    plain_calls: list[dict] = []
+
+    def fake_post_stream(url, headers=None, json=None, timeout=None, on_line=None):
+        stream_calls.append(json)
+        return 400, '{"error": "stream is not supported"}', {}
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        plain_calls.append(json)
+        return _FakeResponse(200, text="{}", json_obj=data)
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post_stream", fake_post_stream)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+
+    assert client.call_section(section="meta", prompt="A", output_model=MetaOutput).summary == "非流式"
+    assert client.call_section(section="meta", prompt="B", output_model=MetaOutput).summary == "非流式"
+
+    assert len(stream_calls) == 1
+    assert len(plain_calls) == 2
+    assert plain_calls[0]["stream"] is False
+
+
+def test_upstream_errors_mentioning_stream_do_not_disable_streaming(monkeypatch):
+    runtime = LLMRuntime(api_url="http://upstream-error.example.com/v1", api_key="sk", model="m")
+    client = LLMClient(runtime, _streaming_cfg())
+    stream_calls: list[dict] = []
+    plain_calls: list[dict] = []
+
+    def fake_post_stream(url, headers=None, json=None, timeout=None, on_line=None):
+        stream_calls.append(json)
+        return 400, '{"error": {"message": "upstream model error", "param": null}}', {}
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        plain_calls.append(json)
+        return _FakeResponse(200, text="{}", json_obj={})
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post_stream", fake_post_stream)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+
+    for prompt in ("A", "B"):
+        with pytest.raises(LLMClientError):
+            client.call_section(section="meta", prompt=prompt, output_model=MetaOutput)
+
+    # 不是 stream 参数被拒：不降级、不记忆，下次仍走流式
+    assert len(stream_calls) == 2
+    assert plain_calls == []
+    assert _rejects_stream('{"error": {"message": "Unsupported parameter: \'stream\'"}}')
+    assert _rejects_stream('{"detail": [{"loc": ["body", "stream"], "msg": "extra fields not permitted"}]}')
+    assert not _rejects_stream('{"detail": [{"loc": ["body", "messages"], "input": {"stream": true}}]}')
+
+
+def test_stream_rejection_is_not_remembered_when_plain_retry_fails(monkeypatch):
+    runtime = LLMRuntime(api_url="http://flaky-nostream.example.com/v1", api_key="sk", model="m")
+    client = LLMClient(runtime, _streaming_cfg())
+    stream_calls: list[dict] = []
+
+    def fake_post_stream(url, headers=None, json=None, timeout=None, on_line=None):
+        stream_calls.append(json)
+        return 400, '{"error": "stream is not supported"}', {}
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        return _FakeResponse(400, text='{"error": "bad messages"}')
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post_stream", fake_post_stream)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+
+    for prompt in ("A", "B"):
+        with pytest.raises(LLMClientError):
+            client.call_section(section="meta", prompt=prompt, output_model=MetaOutput)
+    assert len(stream_calls) == 2
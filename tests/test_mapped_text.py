@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import gc
+import random
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+TESTS_DIR = Path(__file__).resolve().parent
+if str(TESTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TESTS_DIR))
+
+
+from novel_analyzer import content_processor, mapped_text
+from novel_analyzer.chapters import build_chapter_index
+from novel_analyzer.config_loader import NovelStoreConfig, SalienceConfig
+from novel_analyzer.mapped_text import MappedText
+from novel_analyzer.novel_store import NovelStore, content_id
+from novel_analyzer.salience import select_windows
+
+from test_content_processor import _make_cfg
+
+
+def _novel() -> str:
+    rng = random.Random(7)
+    parts = ["序言：ascii and 中文 mixed 😀。\n"]
+    for i in range(1, 31):
+        body = "".join(rng.choice(["他们拥抱了。", "Plain text. ", "小明说：“好。”", "😀", "\n"]) for _ in range(200))
+        parts.append(f"第{i}章 标题\n{body}\n")
+    return "".join(parts)
+
+
+def _mapped(tmp_path: Path, text: str) -> MappedText:
+    path = tmp_path / "novel.txt"
+    path.write_bytes(text.encode("utf-8"))
+    return MappedText(path)
+
+
+@pytest.fixture(autouse=True)
+def _small_blocks(monkeypatch):
+    # 小块迫使扫描跨越多个 block，验证偏移拼接
+    monkeypatch.setattr(mapped_text, "_BLOCK_BYTES", 257)
+    monkeypatch.setattr(mapped_text, "_STRIDE_BYTES", 101)
+    monkeypatch.setattr(content_processor, "_DOCUMENTS", content_processor._DocumentCache())
+
+
+def test_slices_match_str(tmp_path):
+    text = _novel()
+    mt = _mapped(tmp_path, text)
+
+    assert len(mt) == len(text)
+    assert mt.sha256 == content_id(text)
+    assert "".join(block for _, block in mt.iter_blocks()) == text
+    rng = random.Random(1)
+    for _ in range(300):
+        a, b = sorted(rng.randrange(len(text) + 1) for _ in range(2))
+        assert mt[a:b] == text[a:b]
+        assert mt.char_offset(mt.byte_offset(a)) == a
+    assert mt[-1] == text[-1] and mt[:] == text
+
+
+def test_scans_over_blocks_match_str(tmp_path):
+    text = _novel()
+    mt = _mapped(tmp_path, text)
+    sal = SalienceConfig(lexicon=("拥抱",), min_name_count=2)
+
+    assert build_chapter_index(mt) == build_chapter_index(text)
+    assert select_windows(mt, window_chars=400, count=3, cfg=sal) == select_windows(text, window_chars=400, count=3, cfg=sal)
+    idx_mt, idx_str = content_processor.BoundaryIndex(mt), content_processor.BoundaryIndex(text)
+    assert idx_mt._offsets == idx_str._offsets
+
+
+@pytest.mark.parametrize("strategy", ["head_middle_tail", "head_tail", "chapter_stratified", "salience"])
+def test_prepare_content_decodes_only_selected_slices(tmp_path, monkeypatch, strategy):
+    text = _novel()
+    cfg = _make_cfg(max_chars=1200, strategy=strategy)
+    cfg = replace(cfg, content_processing=replace(cfg.content_processing, chapter_min_chars=100))
+    expected = content_processor.prepare_content(text, cfg, section="core")
+
+    monkeypatch.setattr(content_processor, "_DOCUMENTS", content_processor._DocumentCache())
+    mt = _mapped(tmp_path, text)
+    sliced: list[int] = []
+    original = MappedText.__getitem__
+
+    def spy(self, key):
+        out = original(self, key)
+        sliced.append(len(out))
+        return out
+
+    monkeypatch.setattr(MappedText, "__getitem__", spy)
+    assert content_processor.prepare_content(mt, cfg, section="core") == expected
+    assert max(sliced) <= 1200
+
+
+def test_mmap_store_removes_file_after_eviction(tmp_path):
+    store = NovelStore(NovelStoreConfig(max_items=1, ttl_seconds=0, storage="mmap", dir=str(tmp_path)))
+
+    first = store.put("第一本。" * 100)
+    assert isinstance(first.content, MappedText) and first.content[:4] == "第一本。"
+    path = Path(first.content.path)
+    assert path.exists() and store.stats()["memory_bytes"] == len(("第一本。" * 100).encode("utf-8"))
+
+    store.put("第二本。")
+    assert store.get(first.novel_id) is None
+    assert path.exists()  # 仍被 first 引用（相当于进行中的分析）
+    del first
+    gc.collect()
+    assert not path.exists()
@@ -113,7 +113,7 @@ def test_meta_normalize_parses_stringified_novel_info(monkeypatch):
 
     import novel_analyzer.llm_client as llm_client_mod
 
-    monkeypatch.setattr(llm_client_mod.requests, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
 
     out = client.call_section(section="meta", prompt="REQ\n\n## Novel Content\nX", output_model=MetaOutput)
     assert out.novel_info.world_setting == "修仙/架空"
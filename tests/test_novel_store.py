@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import novel_store as store_mod
+from novel_analyzer.config_loader import NovelStoreConfig
+from novel_analyzer.novel_store import NovelStore, content_id
+
+
+def test_put_is_content_addressed():
+    store = NovelStore(NovelStoreConfig(max_items=4, max_memory_mb=16, ttl_seconds=0))
+
+    a = store.put("第1章\n正文")
+    b = store.put("第1章\n正文")
+
+    assert a is b
+    assert a.novel_id == content_id("第1章\n正文")
+    assert store.stats()["items"] == 1
+
+
+def test_lru_eviction_by_item_count():
+    store = NovelStore(NovelStoreConfig(max_items=2, max_memory_mb=16, ttl_seconds=0))
+
+    a = store.put("A")
+    b = store.put("B")
+    assert store.get(a.novel_id) is a  # 触达 A，使 B 成为最久未用
+    store.put("C")
+
+    assert store.get(b.novel_id) is None
+    assert store.get(a.novel_id) is a
+    assert store.stats()["evictions"] == 1
+
+
+def test_memory_cap_keeps_latest_upload():
+    store = NovelStore(NovelStoreConfig(max_items=10, max_memory_mb=1, ttl_seconds=0))
+
+    old = store.put("旧" * 300_000)
+    new = store.put("新" * 300_000)
+
+    assert store.get(old.novel_id) is None
+    assert store.get(new.novel_id) is new
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(store_mod.time, "monotonic", lambda: now[0])
+    store = NovelStore(NovelStoreConfig(max_items=10, max_memory_mb=16, ttl_seconds=60))
+
+    session = store.put("正文")
+    now[0] += 61
+
+    assert store.get(session.novel_id) is None
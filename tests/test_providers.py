@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import providers
+from novel_analyzer.config_loader import ProviderConfig, ProvidersConfig, RouteTarget, load_llm_config
+from novel_analyzer.llm_client import LLMClient
+from novel_analyzer.schemas import MetaOutput
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def _provider(name: str, **kwargs) -> providers.Provider:
+    return providers.Provider(name=name, api_url=f"http://{name}.example.com/v1", api_key="sk", model="m", **kwargs)
+
+
+def test_weighted_least_outstanding_selection_and_caps():
+    pool = providers.ProviderPool([_provider("a", weight=2), _provider("b", max_concurrency=1)])
+
+    picked = [pool.select().name for _ in range(4)]
+    # a 权重 2：在途数按权重折算；b 满 1 个并发后不再分配
+    assert picked == ["a", "b", "a", "a"]
+
+    pool.release(pool.providers[1], outcome=providers.OK, latency=0.2)
+    assert pool.select(avoid={"a"}).name == "b"
+    assert pool.select(exclude={"a"}) is None
+
+
+def test_consecutive_failures_put_provider_on_cooldown():
+    pool = providers.ProviderPool([_provider("a"), _provider("b")], failure_threshold=2, cooldown_seconds=60)
+    a, b = pool.providers
+    for _ in range(2):
+        assert pool.select(avoid={"b"}) is a
+        pool.release(a, outcome=providers.ERROR, error="timeout")
+
+    # b 更忙，但 a 在冷却中
+    pool.select(avoid={"a"})
+    assert pool.select() is b
+
+    stats = {s["name"]: s for s in pool.stats()}
+    assert stats["a"]["healthy"] is False and stats["a"]["failures"] == 2
+    assert stats["a"]["error_rate"] == 1.0 and stats["a"]["last_error"] == "timeout"
+    assert stats["b"]["outstanding"] == 2
+
+
+def test_client_fails_over_to_next_provider_without_backoff(monkeypatch):
+    cfg = _make_cfg()
+    cfg = replace(cfg, defaults=replace(cfg.defaults, retry=replace(cfg.defaults.retry, count=2, base_wait_seconds=30, max_wait_seconds=30)))
+    pool = providers.ProviderPool([_provider("down"), _provider("up")])
+    client = LLMClient(pool, cfg)
+    data = {
+        "choices": [
+            {"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps({"summary": "好"})}}]}}
+        ]
+    }
+    calls: list[str] = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        if "down" in url:
+            return _FakeResponse(503, text="busy")
+        return _FakeResponse(200, text="ok", json_obj=data)
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.time, "sleep", lambda s: pytest.fail(f"unexpected backoff {s}"))
+
+    out = client.call_section(section="meta", prompt="P", output_model=MetaOutput)
+
+    assert out.summary == "好"
+    assert calls == ["http://down.example.com/v1/chat/completions", "http://up.example.com/v1/chat/completions"]
+    stats = {s["name"]: s for s in pool.stats()}
+    assert (stats["down"]["failures"], stats["up"]["failures"]) == (1, 0)
+    assert stats["up"]["latency_ms"] is not None
+    assert all(s["outstanding"] == 0 for s in stats.values())
+
+
+def test_build_pool_reads_prefixed_env_and_skips_unset():
+    cfg = replace(
+        load_llm_config(REPO_ROOT),
+        providers=ProvidersConfig(
+            pool=(
+                ProviderConfig(name="main"),
+                ProviderConfig(name="backup", env_prefix="BACKUP_", model="small", weight=0.5, max_concurrency=4),
+                ProviderConfig(name="unset", env_prefix="UNSET_"),
+            )
+        ),
+    )
+    env = {
+        "API_BASE_URL": "https://a.example.com/v1/",
+        "API_KEY": "k1",
+        "MODEL_NAME": "big",
+        "BACKUP_API_BASE_URL": "https://b.example.com/v1",
+        "BACKUP_API_KEY": "k2",
+    }
+
+    pool = providers.build_pool(cfg, env)
+
+    assert [(p.name, p.api_url, p.model, p.max_concurrency) for p in pool.providers] == [
+        ("main", "https://a.example.com/v1", "big", 0),
+        ("backup", "https://b.example.com/v1", "small", 4),
+    ]
+    assert pool.providers[1].key == "https://b.example.com/v1|small#backup"
+    assert providers.get_pool(cfg, env) is providers.get_pool(cfg, env)
+
+    with pytest.raises(ValueError):
+        providers.build_pool(cfg, {})
+    with pytest.raises(ValueError):
+        providers.build_pool(cfg, {**env, "API_BASE_URL": "ftp://a"})
+
+
+def test_route_orders_chain_and_shares_state_with_parent():
+    pool = providers.ProviderPool([_provider("main"), _provider("fast")])
+    routed = pool.route((RouteTarget("fast", model="small"), RouteTarget("main")))
+
+    assert routed is pool.route((RouteTarget("fast", model="small"), RouteTarget("main")))
+    assert [(p.name, p.model) for p in routed.providers] == [("fast:small", "small"), ("main", "m")]
+    assert routed.providers[1] is pool.providers[0]
+    assert routed.providers[0].key == "http://fast.example.com/v1|small"
+
+    # 按顺序：首选未满时总是选它，失败后才落到下一个
+    assert [routed.select().name for _ in range(2)] == ["fast:small", "fast:small"]
+    assert routed.select(avoid={"fast:small"}).name == "main"
+    stats = {s["name"]: s for s in pool.stats()}
+    assert stats["fast:small"]["outstanding"] == 2 and stats["main"]["outstanding"] == 1
+
+    # 未配置的 provider 被跳过；全部缺失时退回整个池
+    assert pool.route((RouteTarget("missing"),)) is pool
+    assert [p.model for p in pool.route((), model="small").providers] == ["small", "small"]
+
+
+def test_section_route_sends_model_override_and_falls_back(monkeypatch):
+    cfg = _make_cfg()
+    sections = dict(cfg.sections)
+    sections["meta"] = replace(sections["meta"], route=(RouteTarget("fast", model="small"), RouteTarget("main")))
+    cfg = replace(cfg, sections=sections, defaults=replace(cfg.defaults, retry=replace(cfg.defaults.retry, count=2)))
+    pool = providers.ProviderPool([_provider("main"), _provider("fast")])
+    client = LLMClient(pool, cfg)
+    data = {
+        "choices": [
+            {"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps({"summary": "好"})}}]}}
+        ]
+    }
+    calls: list[tuple[str, str]] = []
+    fast_status = [200]
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append((url.split("//")[1].split(".")[0], json["model"]))
+        if "fast" in url:
+            return _FakeResponse(fast_status[0], text="x", json_obj=data)
+        return _FakeResponse(200, text="ok", json_obj=data)
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.time, "sleep", lambda s: None)
+
+    assert client.call_section(section="meta", prompt="P1", output_model=MetaOutput).summary == "好"
+    assert calls == [("fast", "small")]
+
+    fast_status[0] = 503
+    calls.clear()
+    assert client.call_section(section="meta", prompt="P2", output_model=MetaOutput).summary == "好"
+    assert calls == [("fast", "small"), ("main", "m")]
+
+
+def test_section_route_must_name_configured_provider(tmp_path):
+    import shutil
+
+    shutil.copytree(REPO_ROOT / "config", tmp_path / "config")
+    path = tmp_path / "config" / "llm.yaml"
+    text = path.read_text(encoding="utf-8")
+    path.write_text(text.replace("    prompt_file: prompts/meta.j2\n", "    prompt_file: prompts/meta.j2\n    route: [nowhere]\n"), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="sections.meta.route"):
+        load_llm_config(tmp_path)
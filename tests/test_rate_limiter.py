@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import replace
+from email.utils import formatdate
+from pathlib import Path
+import time
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+TESTS_DIR = Path(__file__).resolve().parent
+if str(TESTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TESTS_DIR))
+
+
+from novel_analyzer import rate_limiter
+from novel_analyzer.config_loader import RateLimitConfig
+from novel_analyzer.llm_client import LLMClient, LLMRuntime
+from novel_analyzer.schemas import MetaOutput
+
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def _meta_data() -> dict:
+    args = {"novel_info": None, "summary": "限流"}
+    return {
+        "choices": [{"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}],
+        "usage": {"total_tokens": 10},
+    }
+
+
+def test_retry_after_seconds_parses_provider_headers():
+    assert rate_limiter.retry_after_seconds({"retry-after": "7"}) == 7.0
+    assert rate_limiter.retry_after_seconds({"retry-after-ms": "1500"}) == 1.5
+    assert rate_limiter.retry_after_seconds({"x-ratelimit-reset-tokens": "6m0s"}) == 360.0
+    assert rate_limiter.retry_after_seconds({"x-ratelimit-reset-requests": "20ms"}) == 0.02
+    assert rate_limiter.retry_after_seconds({"retry-after": "soon"}) is None
+    assert rate_limiter.retry_after_seconds(None) is None
+
+    http_date = formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= rate_limiter.retry_after_seconds({"retry-after": http_date}) <= 30
+
+
+def test_limiter_spaces_requests_and_settles_tokens():
+    limiter = rate_limiter.RateLimiter(RateLimitConfig(requests_per_minute=2, tokens_per_minute=1000))
+
+    assert limiter.reserve(100) == 0.0
+    assert limiter.reserve(100) == 0.0
+    assert 29 <= limiter.reserve(100) <= 30
+
+    limiter.settle(800, 100)
+    assert limiter.stats()["waits"] == 1
+
+
+def test_429_honors_retry_after_and_pauses_shared_limiter(monkeypatch):
+    runtime = LLMRuntime(api_url="http://ratelimited.example.com/v1", api_key="sk", model="m")
+    base_cfg = _make_cfg()
+    cfg = replace(
+        base_cfg,
+        defaults=replace(
+            base_cfg.defaults,
+            retry=replace(base_cfg.defaults.retry, count=2, base_wait_seconds=1, max_wait_seconds=1, jitter="full"),
+            rate_limit=RateLimitConfig(requests_per_minute=600),
+        ),
+    )
+    client = LLMClient(runtime, cfg)
+
+    limited = _FakeResponse(429, text="slow down")
+    limited.headers = {"retry-after": "5"}
+    responses = [limited, _FakeResponse(200, text=json.dumps(_meta_data()), json_obj=_meta_data())]
+    sleeps: list[float] = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        return responses.pop(0)
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.time, "sleep", sleeps.append)
+
+    assert client.call_section(section="meta", prompt="PROMPT", output_model=MetaOutput).summary == "限流"
+
+    # 退避至少等满 Retry-After（超过 max_wait_seconds 也照办），期间其它调用方同样被暂停
+    assert sleeps and sleeps[0] >= 5
+    stats = rate_limiter.stats()["http://ratelimited.example.com/v1|m"]
+    assert stats["requests_per_minute"] == 600
@@ -139,7 +139,7 @@ def test_repair_pass_fixes_schema(monkeypatch):
 
     import novel_analyzer.llm_client as llm_client_mod
 
-    monkeypatch.setattr(llm_client_mod.requests, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
 
     out = client.call_section(section="meta", prompt="REQ\n\n## Novel Content\nX", output_model=MetaOutput)
     assert out.summary == "修复后"
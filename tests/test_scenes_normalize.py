@@ -132,7 +132,7 @@ def test_scenes_normalize_parses_stringified_sex_scenes(monkeypatch):
 
     import novel_analyzer.llm_client as llm_client_mod
 
-    monkeypatch.setattr(llm_client_mod.requests, "post", fake_post)
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
 
     out = client.call_section(section="scenes", prompt="REQ\n\n## Novel Content\nX", output_model=ScenesOutput)
     assert out.sex_scenes.total_count == 1
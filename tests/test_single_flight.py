@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import providers, single_flight
+from novel_analyzer.config_loader import SingleFlightConfig
+from novel_analyzer.llm_client import LLMClient, LLMClientError, LLMRuntime
+from novel_analyzer.schemas import MetaOutput
+from test_llm_client_function_calling import _FakeResponse, _make_cfg
+
+
+def _data(summary: str) -> dict:
+    args = {"novel_info": None, "summary": summary}
+    return {"choices": [{"message": {"tool_calls": [{"function": {"name": "extract_meta", "arguments": json.dumps(args)}}]}}]}
+
+
+def _client(**single_flight_kwargs) -> LLMClient:
+    cfg = _make_cfg()
+    cfg = replace(cfg, defaults=replace(cfg.defaults, single_flight=SingleFlightConfig(**single_flight_kwargs)))
+    return LLMClient(LLMRuntime(api_url="http://sf.example.com/v1", api_key="sk", model="m"), cfg)
+
+
+def test_concurrent_identical_calls_share_one_upstream_call(monkeypatch):
+    client = _client()
+    calls: list[str] = []
+
+    async def fake_apost(url, headers=None, json=None, timeout=None):
+        prompt = json["messages"][0]["content"]
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return _FakeResponse(200, text="{}", json_obj=_data(prompt))
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "apost", fake_apost)
+    before = single_flight.stats()["sections"].get("meta", {}).get("coalesced", 0)
+
+    async def run():
+        return await asyncio.gather(
+            *(client.acall_section(section="meta", prompt="SAME", output_model=MetaOutput) for _ in range(3)),
+            client.acall_section(section="meta", prompt="OTHER", output_model=MetaOutput),
+        )
+
+    outs = asyncio.run(run())
+
+    assert sorted(calls) == ["OTHER", "SAME"]
+    assert [o.summary for o in outs] == ["SAME", "SAME", "SAME", "OTHER"]
+    # 每个调用者拿到各自的副本
+    assert outs[0] is not outs[1]
+    stats = single_flight.stats()
+    assert stats["sections"]["meta"]["coalesced"] - before == 2
+    assert stats["in_flight"] == 0
+
+
+def test_calls_routed_to_different_fallback_chains_do_not_coalesce(monkeypatch):
+    def provider(name: str) -> providers.Provider:
+        return providers.Provider(name=name, api_url=f"http://{name}.example.com/v1", api_key="sk", model="m")
+
+    cfg = _make_cfg()
+    # 主 provider 相同、后备不同：任一方故障转移后结果来源不同，不能共享
+    first = LLMClient(providers.ProviderPool([provider("sf-main"), provider("sf-backup-a")]), cfg)
+    second = LLMClient(providers.ProviderPool([provider("sf-main"), provider("sf-backup-b")]), cfg)
+    same = LLMClient(providers.ProviderPool([provider("sf-main"), provider("sf-backup-a")]), cfg)
+    calls: list[str] = []
+
+    async def fake_apost(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        await asyncio.sleep(0.05)
+        return _FakeResponse(200, text="{}", json_obj=_data("路由"))
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "apost", fake_apost)
+
+    async def run():
+        return await asyncio.gather(
+            *(c.acall_section(section="meta", prompt="ROUTED", output_model=MetaOutput) for c in (first, second, same))
+        )
+
+    outs = asyncio.run(run())
+
+    assert [o.summary for o in outs] == ["路由"] * 3
+    assert len(calls) == 2
+
+
+def test_blocking_callers_in_threads_coalesce_and_share_errors(monkeypatch):
+    client = _client()
+    release = threading.Event()
+    calls: list[int] = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls.append(1)
+        release.wait(5)
+        return _FakeResponse(500, text="boom")
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "post", fake_post)
+    errors: list[str] = []
+
+    def worker():
+        try:
+            client.call_section(section="meta", prompt="THREADED", output_model=MetaOutput)
+        except LLMClientError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 给其余线程留出加入在途请求的时间
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert errors == ["meta API错误: 500"] * 3
+
+
+def test_cancelled_leader_hands_over_to_waiting_caller(monkeypatch):
+    client = _client()
+    calls: list[int] = []
+
+    async def fake_apost(url, headers=None, json=None, timeout=None):
+        calls.append(1)
+        await asyncio.sleep(0.1 if len(calls) == 1 else 0)
+        return _FakeResponse(200, text="{}", json_obj=_data("接力"))
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "apost", fake_apost)
+
+    async def run():
+        leader = asyncio.ensure_future(client.acall_section(section="meta", prompt="HANDOVER", output_model=MetaOutput))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(client.acall_section(section="meta", prompt="HANDOVER", output_model=MetaOutput))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    out = asyncio.run(run())
+
+    assert out.summary == "接力"
+    assert len(calls) == 2
+    assert single_flight.stats()["sections"]["meta"]["leader_cancelled"] >= 1
+
+
+def test_disabled_single_flight_calls_upstream_each_time(monkeypatch):
+    client = _client(enabled=False)
+    calls: list[int] = []
+
+    async def fake_apost(url, headers=None, json=None, timeout=None):
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return _FakeResponse(200, text="{}", json_obj=_data("x"))
+
+    import novel_analyzer.llm_client as llm_client_mod
+
+    monkeypatch.setattr(llm_client_mod.http_pool, "apost", fake_apost)
+
+    async def run():
+        return await asyncio.gather(
+            *(client.acall_section(section="meta", prompt="NOSF", output_model=MetaOutput) for _ in range(2))
+        )
+
+    asyncio.run(run())
+    assert len(calls) == 2
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer import pipeline
+from novel_analyzer.config_loader import TokenBudgetConfig, load_llm_config
+from novel_analyzer.content_processor import prepare_content
+from novel_analyzer.llm_client import LLMClient, LLMRuntime
+from novel_analyzer.tokens import context_tokens, estimate_tokens
+from test_full_pipeline import _OUTPUTS
+
+
+def test_estimator_weights_cjk_and_ascii_differently():
+    cfg = TokenBudgetConfig(cjk_tokens_per_char=1.0, ascii_chars_per_token=4.0)
+    assert estimate_tokens("", cfg) == 0
+    assert estimate_tokens("中文字符", cfg) == 4
+    assert estimate_tokens("abcdefgh", cfg) == 2
+    assert estimate_tokens("中文abcd", cfg) == 3
+
+
+def test_context_tokens_matches_model_prefix():
+    cfg = TokenBudgetConfig(default_context_tokens=8000, context_tokens={"gpt-4o": 128000, "gpt-4o-mini": 64000})
+    assert context_tokens(cfg, "gpt-4o-mini-2024") == 64000
+    assert context_tokens(cfg, "gpt-4o") == 128000
+    assert context_tokens(cfg, "other") == 8000
+
+
+def _cfg(window: int):
+    cfg = load_llm_config(REPO_ROOT)
+    tb = TokenBudgetConfig(enabled=True, context_tokens={"m": window}, reserve_output_tokens=500)
+    # 清空 section 覆盖：单独设置 max_chars 的 section 不走 token 预算
+    return replace(cfg, content_processing=replace(cfg.content_processing, token_budget=tb, sections={}))
+
+
+def test_prompt_fills_model_window_after_overheads():
+    cfg = _cfg(6000)
+    text = ("他走进房间。The door was open.\n" * 2000)
+
+    budget = pipeline.content_token_budget(cfg, "meta", model="m", context={"tool_name": "extract_meta"})
+    assert budget is not None and 0 < budget < 6000 - 500
+
+    prompt = pipeline.render_section_prompt(cfg, "meta", text, model="m")
+    template_tokens = estimate_tokens(pipeline.render_section_prompt(cfg, "meta", "", model="m"))
+    content_tokens = estimate_tokens(prompt) - template_tokens
+    assert budget * 0.95 <= content_tokens <= budget
+    assert "内容已截断" in prompt
+
+    # 未配置窗口的模型仍按 max_chars 截断
+    assert pipeline.content_token_budget(cfg, "meta", model="unknown", context={"tool_name": "x"}) is None
+
+
+def test_token_budget_leaves_short_text_untouched():
+    cfg = _cfg(6000)
+    text = "短文本。" * 10
+    assert prepare_content(text, cfg, section="meta", token_budget=1000) == text
+
+
+def test_routed_section_uses_its_own_model_window():
+    cfg = load_llm_config(REPO_ROOT)
+    tb = TokenBudgetConfig(enabled=True, context_tokens={"big": 100000, "small": 4000}, reserve_output_tokens=500)
+    sections = {**cfg.sections, "meta": replace(cfg.sections["meta"], model="small")}
+    cfg = replace(
+        cfg,
+        sections=sections,
+        content_processing=replace(cfg.content_processing, token_budget=tb, sections={}, cleanup=replace(cfg.content_processing.cleanup, enabled=False)),
+    )
+    client = LLMClient(LLMRuntime(api_url="http://route.example.com/v1", api_key="sk", model="big"), cfg)
+    assert (client.model, client.model_for("meta"), client.model_for("core")) == ("big", "small", "big")
+
+    prompts: dict[str, str] = {}
+
+    async def fake_acall_section(*, section, prompt, output_model, bypass_cache=False, on_progress=None):
+        prompts[section] = prompt
+        return output_model.model_validate(_OUTPUTS[section])
+
+    client.acall_section = fake_acall_section
+    text = "他走进房间，窗外下着雨。\n" * 20000
+    asyncio.run(pipeline.run_section(client, cfg, "meta", text))
+
+    small_budget = pipeline.content_token_budget(cfg, "meta", model="small", context={"tool_name": "extract_meta"})
+    content_tokens = estimate_tokens(prompts["meta"]) - estimate_tokens(pipeline.render_section_prompt(cfg, "meta", "", model="small"))
+    assert small_budget is not None and content_tokens <= small_budget
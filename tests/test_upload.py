@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+from novel_analyzer.novel_store import content_id
+from novel_analyzer.upload import IncrementalSpooler, UploadTooLargeError, spool_upload
+
+
+TEXT = "第1章 开始\r\n他说：“你好。”\r\n" + "天气不错，他们走了很久。\n" * 300
+
+
+def _spool(data: bytes, *, chunk: int = 7, **kwargs):
+    spooler = IncrementalSpooler(spool_max_bytes=1024, **kwargs)
+    for i in range(0, len(data), chunk):
+        spooler.feed(data[i : i + chunk])
+    return spooler.finish()
+
+
+@pytest.mark.parametrize(
+    ("data", "encoding"),
+    [
+        (TEXT.encode("utf-8"), "utf-8"),
+        (codecs.BOM_UTF8 + TEXT.encode("utf-8"), "utf-8"),
+        (codecs.BOM_UTF16_LE + TEXT.encode("utf-16-le"), "utf-16-le"),
+        (TEXT.encode("utf-16-le"), "utf-16-le"),
+        (TEXT.encode("utf-16-be"), "utf-16-be"),
+        (TEXT.encode("gb18030"), "gb18030"),
+    ],
+)
+def test_detects_encoding_across_chunk_boundaries(data, encoding):
+    out = _spool(data)
+
+    assert out.encoding == encoding
+    assert out.read_text() == TEXT
+    assert out.chars == len(TEXT)
+    assert out.size_bytes == len(TEXT.encode("utf-8"))
+    assert out.sha256 == content_id(TEXT)
+    assert out.source_bytes == len(data)
+
+
+def test_late_invalid_utf8_restarts_as_gb18030():
+    # 前 8KB 都是合法 UTF-8（ASCII），GBK 字节出现在嗅探窗口之后
+    text = "a" * 8000 + "中文内容。" * 10
+    out = _spool(text.encode("gb18030"), chunk=1000)
+
+    assert out.encoding == "gb18030"
+    assert out.read_text() == text
+    assert out.sha256 == content_id(text)
+
+
+def test_explicit_mode_and_size_limit():
+    assert _spool("中文".encode("gb18030"), mode="gb18030").read_text() == "中文"
+
+    with pytest.raises(UploadTooLargeError):
+        _spool(b"x" * 5000, chunk=1000, max_bytes=4096)
+    with pytest.raises(ValueError):
+        IncrementalSpooler(mode="latin-1")
+
+
+def test_spool_upload_drains_reader():
+    data = TEXT.encode("gb18030")
+    pos = 0
+
+    async def read(n: int) -> bytes:
+        nonlocal pos
+        chunk = data[pos : pos + n]
+        pos += len(chunk)
+        return chunk
+
+    out = asyncio.run(spool_upload(read, chunk_bytes=100))
+    assert (out.encoding, out.read_text()) == ("gb18030", TEXT)